@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应轮询
+==========
+
+固定60秒轮询时，稳定运行的作业被频繁请求，而失败的作业最长要一分钟才能发现。
+- AdaptivePoller: 按作业状态决定下一次检查时间
+    - RESTARTING/INITIALIZING等过渡状态、checkpoint失败时按秒级间隔(fast_interval)检查
+    - 状态刚发生变化或存在其他健康问题时按基础间隔(base_interval)检查
+    - 连续健康的RUNNING作业每次检查后间隔乘以backoff_factor，直到max_interval
+- RequestBudget: 每个JobManager的全局请求预算（令牌桶），所有请求共用，
+  预算不足时可推迟的检查顺延到下一轮
+
+使用示例:
+    poller = AdaptivePoller(fast_interval=2, base_interval=60, max_interval=180)
+    if poller.is_due(job_id):
+        poller.record(job_id, state, degraded=False)
+    time.sleep(poller.sleep_seconds(idle_interval=10))
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+from requests.adapters import HTTPAdapter
+
+# 需要秒级跟踪的过渡状态
+FAST_STATES = {'INITIALIZING', 'CREATED', 'RESTARTING', 'FAILING', 'CANCELLING', 'RECONCILING'}
+
+
+class AdaptivePoller:
+    """每个作业独立的检查间隔"""
+
+    def __init__(self, fast_interval: float = 2, base_interval: float = 60, max_interval: float = 180,
+                 backoff_factor: float = 1.5):
+        """
+        Args:
+            fast_interval: 过渡状态或checkpoint失败时的检查间隔（秒）
+            base_interval: 状态刚变化或有其他健康问题时的检查间隔（秒）
+            max_interval: 稳定健康作业的最大检查间隔（秒）
+            backoff_factor: 稳定健康作业每次检查后间隔的放大倍数
+        """
+        self.fast_interval = fast_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        # 作业key -> (当前间隔, 下一次检查时间)
+        self.schedule: Dict[str, tuple] = {}
+
+    def is_due(self, key: str, now: Optional[float] = None) -> bool:
+        """新作业或已到检查时间"""
+        entry = self.schedule.get(key)
+        return entry is None or (now or time.time()) >= entry[1]
+
+    def mode(self, state: str, degraded: bool = False, watch: bool = False) -> str:
+        if state in FAST_STATES or degraded:
+            return 'fast'
+        if state != 'RUNNING' or watch:
+            return 'base'
+        return 'stable'
+
+    def record(self, key: str, state: str, degraded: bool = False, watch: bool = False,
+               now: Optional[float] = None) -> float:
+        """
+        记录一次检查结果并安排下一次检查，返回下一次检查的间隔
+
+        Args:
+            key: 作业key（作业ID）
+            state: 作业状态
+            degraded: 是否需要秒级跟踪（例如checkpoint失败）
+            watch: 是否需要按基础间隔观察（例如存在反压、积压增长等健康问题）
+        """
+        now = now or time.time()
+        mode = self.mode(state, degraded, watch)
+        if mode == 'fast':
+            interval = self.fast_interval
+        elif mode == 'base':
+            interval = self.base_interval
+        else:
+            previous = self.schedule.get(key, (self.base_interval,))[0]
+            interval = min(max(previous, self.base_interval) * self.backoff_factor, self.max_interval)
+            # 新作业先按基础间隔检查一次
+            if key not in self.schedule:
+                interval = self.base_interval
+        self.schedule[key] = (interval, now + interval)
+        return interval
+
+    def expedite(self, key: str, now: Optional[float] = None):
+        """状态发生变化时立即检查（快速通道）"""
+        now = now or time.time()
+        self.schedule[key] = (self.fast_interval, now)
+
+    def forget(self, key: str):
+        self.schedule.pop(key, None)
+
+    def sleep_seconds(self, idle_interval: float, now: Optional[float] = None) -> float:
+        """
+        到下一个作业检查时间的等待秒数，不超过idle_interval，不小于fast_interval
+
+        Args:
+            idle_interval: 没有作业需要检查时的最长等待（作业概览的轮询间隔）
+        """
+        now = now or time.time()
+        due = [next_time - now for _, next_time in self.schedule.values()]
+        wait = min(due + [idle_interval])
+        return max(wait, self.fast_interval)
+
+
+class RequestBudget:
+    """令牌桶: 限制发往同一个JobManager的请求数（每分钟）"""
+
+    def __init__(self, max_requests_per_minute: int = 120, burst: Optional[int] = None):
+        """
+        Args:
+            max_requests_per_minute: 每分钟最多请求数
+            burst: 令牌桶容量（允许的突发请求数），默认为每分钟请求数的1/4
+        """
+        self.rate = max_requests_per_minute / 60.0
+        self.capacity = burst or max(max_requests_per_minute // 4, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        """当前可用的请求数（用于判断可推迟的检查是否顺延）"""
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+    def acquire(self, cost: float = 1):
+        """等待预算足够后扣除（用于必须发出的请求）"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return
+                wait = (cost - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BudgetedAdapter(HTTPAdapter):
+    """每个请求发出前从RequestBudget扣除一个令牌，挂载到requests.Session后所有请求都受预算限制"""
+
+    def __init__(self, budget: RequestBudget, **kwargs):
+        self.budget = budget
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        self.budget.acquire()
+        return super().send(request, **kwargs)
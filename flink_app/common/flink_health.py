@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flink作业健康趋势
+=================
+
+作业状态为RUNNING并不代表健康: checkpoint可能已经接近超时，Source可能被完全反压。
+这里保存每个作业最近一段时间的checkpoint耗时/大小/对齐时间和各顶点的反压比例，
+在作业真正失败之前按趋势报警:
+- checkpoint耗时与一小时前相比增长超过 growth_pct%
+- checkpoint耗时超过超时时间的 timeout_ratio
+- 新增失败的checkpoint
+- 某个顶点的反压比例持续 sustain_seconds 高于 threshold
+- Kafka消费积压(pendingRecords / records-lag-max)或watermark延迟持续增长（按增长速率报警，而不是绝对值），
+  并按最近的变化速率估算追平时间
+- 各顶点的读写速率（条/秒、字节/秒），Source持续没有输出而源表仍有写入时报警（ThroughputTrend）
+
+使用示例:
+    tracker = JobHealthTracker()
+    issues = tracker.poll(get_json, job_id, vertices)   # get_json(path) -> dict 或 None
+"""
+
+import time
+import logging
+from collections import deque
+from statistics import median
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (报警key, 报警内容)
+Issue = Tuple[str, str]
+
+# 一次性事件（每次发生都报警，没有"恢复"），其余问题持续存在期间只报警一次
+EVENT_ISSUES = {'checkpoint_failed'}
+
+
+class CheckpointTrend:
+    """checkpoint耗时、大小、对齐时间的滚动窗口"""
+
+    def __init__(self, window_seconds: int = 7200, compare_seconds: int = 900,
+                 growth_pct: float = 50, timeout_ratio: float = 0.8, min_samples: int = 3):
+        """
+        Args:
+            window_seconds: 保留的时间窗口（秒）
+            compare_seconds: 对比的时间段长度: 最近compare_seconds 与 一小时前的compare_seconds
+            growth_pct: 耗时增长超过该百分比时报警
+            timeout_ratio: 最近耗时超过超时时间的该比例时报警
+            min_samples: 每个对比时间段至少需要的checkpoint数
+        """
+        self.window_seconds = window_seconds
+        self.compare_seconds = compare_seconds
+        self.growth_pct = growth_pct
+        self.timeout_ratio = timeout_ratio
+        self.min_samples = min_samples
+        # (完成时间秒, 耗时ms, 大小bytes, 对齐时间ms)
+        self.samples: Deque[Tuple[float, int, int, Optional[int]]] = deque()
+        self.last_checkpoint_id = None
+        self.last_failed_count = None
+
+    def add(self, completed_at: float, duration_ms: int, size_bytes: int, alignment_ms: Optional[int]):
+        self.samples.append((completed_at, duration_ms, size_bytes, alignment_ms))
+        while self.samples and self.samples[0][0] < completed_at - self.window_seconds:
+            self.samples.popleft()
+
+    def durations_between(self, start: float, end: float) -> List[int]:
+        return [s[1] for s in self.samples if start <= s[0] < end]
+
+    def evaluate(self, now: float, timeout_ms: Optional[int] = None) -> List[Issue]:
+        issues = []
+        recent = self.durations_between(now - self.compare_seconds, now + 1)
+        base = self.durations_between(now - 3600 - self.compare_seconds, now - 3600)
+        if len(recent) >= self.min_samples and len(base) >= self.min_samples:
+            recent_ms, base_ms = median(recent), median(base)
+            if base_ms > 0 and recent_ms > base_ms * (1 + self.growth_pct / 100):
+                issues.append(('checkpoint_growth',
+                               f"checkpoint耗时一小时内增长{(recent_ms / base_ms - 1) * 100:.0f}%: "
+                               f"{base_ms / 1000:.1f}s -> {recent_ms / 1000:.1f}s"))
+        if recent and timeout_ms:
+            recent_ms = median(recent)
+            if recent_ms > timeout_ms * self.timeout_ratio:
+                issues.append(('checkpoint_timeout',
+                               f"checkpoint耗时{recent_ms / 1000:.1f}s，已达到超时时间{timeout_ms / 1000:.0f}s的"
+                               f"{recent_ms / timeout_ms * 100:.0f}%"))
+        return issues
+
+    def summary(self) -> Dict:
+        """最近一次checkpoint的指标"""
+        if not self.samples:
+            return {}
+        completed_at, duration_ms, size_bytes, alignment_ms = self.samples[-1]
+        return {'duration_ms': duration_ms, 'size_bytes': size_bytes, 'alignment_ms': alignment_ms}
+
+
+class BackpressureTrend:
+    """每个顶点反压比例的滚动窗口"""
+
+    def __init__(self, threshold: float = 0.5, sustain_seconds: int = 600, window_seconds: int = 3600):
+        """
+        Args:
+            threshold: 反压比例(0~1)阈值
+            sustain_seconds: 持续高于阈值多长时间才报警
+            window_seconds: 保留的时间窗口（秒）
+        """
+        self.threshold = threshold
+        self.sustain_seconds = sustain_seconds
+        self.window_seconds = window_seconds
+        # 顶点ID -> (顶点名称, [(时间, 最大反压比例)])
+        self.samples: Dict[str, Tuple[str, Deque[Tuple[float, float]]]] = {}
+
+    def add(self, vertex_id: str, vertex_name: str, ratio: float, now: float):
+        _, samples = self.samples.setdefault(vertex_id, (vertex_name, deque()))
+        samples.append((now, ratio))
+        while samples and samples[0][0] < now - self.window_seconds:
+            samples.popleft()
+
+    def evaluate(self, now: float) -> List[Issue]:
+        issues = []
+        for vertex_id, (vertex_name, samples) in self.samples.items():
+            window = [ratio for ts, ratio in samples if ts >= now - self.sustain_seconds]
+            # 采样需要覆盖整个持续时间段，避免刚启动时一两个样本就报警
+            covered = samples and samples[0][0] <= now - self.sustain_seconds
+            if covered and window and min(window) >= self.threshold:
+                issues.append((f"backpressure:{vertex_id}",
+                               f"顶点 {vertex_name[:80]} 持续{self.sustain_seconds // 60}分钟反压，"
+                               f"反压比例{min(window) * 100:.0f}%~{max(window) * 100:.0f}%"))
+        return issues
+
+
+def linear_rate(points: List[Tuple[float, float]]) -> Optional[float]:
+    """最小二乘拟合的变化速率（每秒），点数不足或时间跨度为0时返回None"""
+    if len(points) < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_v = sum(v for _, v in points) / len(points)
+    var_t = sum((t - mean_t) ** 2 for t, _ in points)
+    if var_t == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / var_t
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    """追平时间的可读形式"""
+    if seconds is None:
+        return "按当前速率无法追平"
+    if seconds < 60:
+        return "预计1分钟内追平"
+    if seconds < 3600:
+        return f"预计{seconds / 60:.0f}分钟后追平"
+    return f"预计{seconds / 3600:.1f}小时后追平"
+
+
+class LagTrend:
+    """Kafka消费积压和watermark延迟的时间序列"""
+
+    def __init__(self, window_seconds: int = 7200, rate_seconds: int = 600,
+                 max_lag_growth: float = 100, max_watermark_growth: float = 0.5, min_samples: int = 5):
+        """
+        Args:
+            window_seconds: 保留的时间窗口（秒）
+            rate_seconds: 计算增长速率使用的最近时间段（秒），采样需要覆盖整个时间段
+            max_lag_growth: 积压增长超过该速率（条/秒）时报警
+            max_watermark_growth: watermark延迟增长超过该速率（秒/秒）时报警，
+                0.5表示事件时间的推进速度不到墙上时间的一半
+            min_samples: 计算增长速率至少需要的采样数
+        """
+        self.window_seconds = window_seconds
+        self.rate_seconds = rate_seconds
+        self.max_lag_growth = max_lag_growth
+        self.max_watermark_growth = max_watermark_growth
+        self.min_samples = min_samples
+        # 指标名称 -> [(时间, 值)]: 'lag' 总积压条数, 'watermark_delay' watermark落后墙上时间的秒数,
+        # 'lag:顶点名称/subtask序号' 每个source subtask（对应其分配的分区）的积压
+        self.series: Dict[str, Deque[Tuple[float, float]]] = {}
+
+    def add(self, name: str, value: float, now: float):
+        samples = self.series.setdefault(name, deque())
+        samples.append((now, value))
+        while samples and samples[0][0] < now - self.window_seconds:
+            samples.popleft()
+
+    def latest(self, name: str) -> Optional[float]:
+        samples = self.series.get(name)
+        return samples[-1][1] if samples else None
+
+    def rate(self, name: str, now: float) -> Optional[float]:
+        """最近rate_seconds内的变化速率（每秒），采样不足时返回None"""
+        samples = self.series.get(name)
+        if not samples or samples[0][0] > now - self.rate_seconds:
+            return None
+        points = [(ts, value) for ts, value in samples if ts >= now - self.rate_seconds]
+        if len(points) < self.min_samples:
+            return None
+        return linear_rate(points)
+
+    def eta_seconds(self, name: str, now: float) -> Optional[float]:
+        """按最近的下降速率估算追平（积压或延迟降到0）需要的秒数，没有在下降时返回None"""
+        current, rate = self.latest(name), self.rate(name, now)
+        if current is None or rate is None or rate >= 0:
+            return None
+        return max(current, 0) / -rate
+
+    def evaluate(self, now: float) -> List[Issue]:
+        issues = []
+        lag_rate = self.rate('lag', now)
+        if lag_rate is not None and lag_rate > self.max_lag_growth:
+            issues.append(('lag_growth',
+                           f"Kafka消费积压{self.rate_seconds // 60}分钟内持续增长{lag_rate:.0f}条/秒，"
+                           f"当前积压{self.latest('lag'):.0f}条，{format_eta(None)}"))
+        delay_rate = self.rate('watermark_delay', now)
+        if delay_rate is not None and delay_rate > self.max_watermark_growth:
+            issues.append(('watermark_growth',
+                           f"watermark延迟{self.rate_seconds // 60}分钟内每秒增长{delay_rate:.2f}秒，"
+                           f"当前落后{self.latest('watermark_delay') / 60:.1f}分钟，{format_eta(None)}"))
+        return issues
+
+    def summary(self, now: float) -> Dict:
+        """当前积压、watermark延迟、变化速率和预计追平时间"""
+        result = {}
+        for name in ('lag', 'watermark_delay'):
+            if self.latest(name) is None:
+                continue
+            result[name] = self.latest(name)
+            result[f'{name}_rate'] = self.rate(name, now)
+            result[f'{name}_eta'] = self.eta_seconds(name, now)
+        return result
+
+
+# 作业详情(/jobs/{id})中每个顶点的累计读写计数
+THROUGHPUT_METRICS = ('read-records', 'read-bytes', 'write-records', 'write-bytes')
+
+
+class ThroughputTrend:
+    """每个顶点累计读写计数的环形缓冲区，按采样差值计算速率，检测Source停滞"""
+
+    def __init__(self, capacity: int = 120, rate_seconds: int = 300, stall_seconds: int = 600):
+        """
+        Args:
+            capacity: 每个顶点保留的采样数（环形缓冲区大小，超出后丢弃最早的采样）
+            rate_seconds: 计算速率使用的最近时间段（秒），时间段内不足两个采样时使用最近两个采样
+            stall_seconds: Source持续没有输出多长时间视为停滞
+        """
+        self.capacity = capacity
+        self.rate_seconds = rate_seconds
+        self.stall_seconds = stall_seconds
+        # 顶点ID -> (顶点名称, [(时间, (read-records, read-bytes, write-records, write-bytes))])
+        self.samples: Dict[str, Tuple[str, Deque[Tuple[float, Tuple[float, ...]]]]] = {}
+
+    def add(self, vertex_id: str, vertex_name: str, counters: Dict, now: float):
+        _, samples = self.samples.setdefault(vertex_id, (vertex_name, deque(maxlen=self.capacity)))
+        values = tuple(float(counters.get(name) or 0) for name in THROUGHPUT_METRICS)
+        # 作业重启后累计计数从0开始，之前的采样不能再用于计算差值
+        if samples and any(new < old for new, old in zip(values, samples[-1][1])):
+            samples.clear()
+        samples.append((now, values))
+
+    def add_vertices(self, vertices: List[Dict], now: float):
+        """采集作业详情中所有顶点的累计计数，作业重新提交后已不存在的顶点被移除"""
+        current = {vertex['id'] for vertex in vertices}
+        for vertex_id in [vertex_id for vertex_id in self.samples if vertex_id not in current]:
+            del self.samples[vertex_id]
+        for vertex in vertices:
+            self.add(vertex['id'], vertex.get('name', vertex['id']), vertex.get('metrics') or {}, now)
+
+    def rates(self, vertex_id: str, now: float) -> Optional[Dict[str, float]]:
+        """顶点最近rate_seconds内每秒的读写记录数和字节数，采样不足两个时返回None"""
+        _, samples = self.samples.get(vertex_id, ('', ()))
+        points = [sample for sample in samples if sample[0] >= now - self.rate_seconds]
+        if len(points) < 2:
+            points = list(samples)[-2:]
+        if len(points) < 2 or points[-1][0] <= points[0][0]:
+            return None
+        (start, first), (end, last) = points[0], points[-1]
+        return {name: (b - a) / (end - start) for name, a, b in zip(THROUGHPUT_METRICS, first, last)}
+
+    def source_ids(self) -> List[str]:
+        return [vertex_id for vertex_id, (name, _) in self.samples.items() if name.startswith('Source')]
+
+    def idle_since(self) -> Optional[float]:
+        """
+        所有Source的输出计数最后一次变化的时间；任一Source仍在输出（或采样不足）时返回None。
+        缓冲区内计数一直没有变化时返回最早的采样时间（实际空闲时间更长）
+        """
+        idle = []
+        for vertex_id in self.source_ids():
+            samples = self.samples[vertex_id][1]
+            if len(samples) < 2:
+                return None
+            latest = samples[-1][1][2]
+            since = samples[-1][0]
+            for ts, values in reversed(samples):
+                if values[2] != latest:
+                    break
+                since = ts
+            if since == samples[-1][0]:
+                return None
+            idle.append(since)
+        return max(idle) if idle else None
+
+    def evaluate(self, now: float, source_written_at: Optional[float]) -> List[Issue]:
+        """
+        Source停滞: 持续stall_seconds没有输出，且源表在空闲开始之后仍有写入
+
+        Args:
+            source_written_at: 源表最近一次写入的时间戳，未知时不报警（可能只是源表没有新数据）
+        """
+        since = self.idle_since()
+        if since is None or now - since < self.stall_seconds or source_written_at is None:
+            return []
+        if source_written_at <= since:
+            return []
+        return [('source_stall', f"Source已{(now - since) / 60:.0f}分钟没有输出，"
+                                 f"源表在{(now - source_written_at) / 60:.0f}分钟前仍有写入")]
+
+    def summary(self, now: float) -> Dict:
+        """Source输出速率、空闲时间和每个顶点的读写速率"""
+        result = {'records_per_second': None, 'bytes_per_second': None, 'vertices': {}}
+        for vertex_id, (name, _) in self.samples.items():
+            rates = self.rates(vertex_id, now)
+            if rates is None:
+                continue
+            result['vertices'][name[:80]] = {
+                'records_in_per_second': round(rates['read-records'], 2),
+                'records_out_per_second': round(rates['write-records'], 2),
+                'bytes_in_per_second': round(rates['read-bytes'], 2),
+                'bytes_out_per_second': round(rates['write-bytes'], 2),
+            }
+            if vertex_id in self.source_ids():
+                result['records_per_second'] = round((result['records_per_second'] or 0) + rates['write-records'], 2)
+                result['bytes_per_second'] = round((result['bytes_per_second'] or 0) + rates['write-bytes'], 2)
+        since = self.idle_since()
+        result['idle_seconds'] = round(now - since) if since is not None else 0
+        return result
+
+    def snapshot(self) -> Dict:
+        """可JSON序列化的缓冲区内容（单次运行的cron模式通过状态文件延续采样）"""
+        return {vertex_id: {'name': name, 'samples': [[ts, *values] for ts, values in samples]}
+                for vertex_id, (name, samples) in self.samples.items()}
+
+    def restore(self, snapshot: Dict):
+        for vertex_id, item in (snapshot or {}).items():
+            samples = deque(((row[0], tuple(row[1:])) for row in item.get('samples', [])), maxlen=self.capacity)
+            self.samples[vertex_id] = (item.get('name', vertex_id), samples)
+
+
+def format_rate(records_per_second: Optional[float], bytes_per_second: Optional[float]) -> str:
+    """吞吐量的可读形式"""
+    if records_per_second is None:
+        return "吞吐量未知（采样不足）"
+    return f"{records_per_second:.1f}条/秒, {(bytes_per_second or 0) / 1024:.1f}KB/秒"
+
+
+class JobHealthTracker:
+    """单个作业的checkpoint和反压健康跟踪"""
+
+    # source顶点上表示消费积压的指标
+    LAG_METRICS = ('.pendingRecords', '.records-lag-max')
+
+    def __init__(self, checkpoint_trend: Optional[CheckpointTrend] = None,
+                 backpressure_trend: Optional[BackpressureTrend] = None,
+                 lag_trend: Optional[LagTrend] = None):
+        self.checkpoints = checkpoint_trend or CheckpointTrend()
+        self.backpressure = backpressure_trend or BackpressureTrend()
+        self.lag = lag_trend or LagTrend()
+        self.checkpoint_timeout_ms = None
+        # source顶点ID -> 积压指标ID列表（指标名称包含算子名称，只在第一次查询时列出）
+        self.lag_metric_ids: Dict[str, List[str]] = {}
+
+    def alignment_ms(self, get_json: Callable[[str], Optional[Dict]], job_id: str,
+                     checkpoint_id: int, vertices: List[Dict]) -> Optional[int]:
+        """checkpoint在所有顶点上的最大对齐时间（非对齐checkpoint或旧版本Flink没有该指标时返回None）"""
+        durations = []
+        for vertex in vertices:
+            detail = get_json(f"/jobs/{job_id}/checkpoints/details/{checkpoint_id}/subtasks/{vertex['id']}")
+            alignment = ((detail or {}).get('summary') or {}).get('alignment') or {}
+            duration = (alignment.get('duration') or {}).get('max')
+            if duration is not None:
+                durations.append(int(duration))
+        return max(durations) if durations else None
+
+    def poll_checkpoints(self, get_json: Callable[[str], Optional[Dict]], job_id: str,
+                         vertices: List[Dict]) -> List[Issue]:
+        issues = []
+        if self.checkpoint_timeout_ms is None:
+            config = get_json(f"/jobs/{job_id}/checkpoints/config") or {}
+            self.checkpoint_timeout_ms = config.get('timeout')
+
+        stats = get_json(f"/jobs/{job_id}/checkpoints")
+        if not stats:
+            return issues
+
+        failed = (stats.get('counts') or {}).get('failed', 0)
+        cp = self.checkpoints
+        if cp.last_failed_count is not None and failed > cp.last_failed_count:
+            issues.append(('checkpoint_failed', f"新增{failed - cp.last_failed_count}次checkpoint失败，累计{failed}次"))
+        cp.last_failed_count = failed
+
+        # history按时间倒序，只处理上次之后新完成的checkpoint
+        new_completed = [
+            c for c in stats.get('history', [])
+            if c.get('status') == 'COMPLETED' and (cp.last_checkpoint_id is None or c['id'] > cp.last_checkpoint_id)
+        ]
+        newest_id = max((c['id'] for c in new_completed), default=None)
+        for checkpoint in sorted(new_completed, key=lambda c: c['id']):
+            # 只对最新一次checkpoint查询对齐时间，控制请求数
+            alignment = None
+            if checkpoint['id'] == newest_id:
+                alignment = self.alignment_ms(get_json, job_id, checkpoint['id'], vertices)
+            cp.add(
+                checkpoint.get('latest_ack_timestamp', time.time() * 1000) / 1000,
+                int(checkpoint.get('end_to_end_duration', 0)),
+                int(checkpoint.get('checkpointed_size', checkpoint.get('state_size', 0))),
+                alignment
+            )
+            cp.last_checkpoint_id = checkpoint['id']
+        return issues
+
+    def poll_backpressure(self, get_json: Callable[[str], Optional[Dict]], job_id: str,
+                          vertices: List[Dict], now: float):
+        for vertex in vertices:
+            data = get_json(f"/jobs/{job_id}/vertices/{vertex['id']}/backpressure")
+            subtasks = (data or {}).get('subtasks') or []
+            if not subtasks or data.get('status') != 'ok':
+                continue
+            ratio = max(float(s.get('ratio', 0)) for s in subtasks)
+            self.backpressure.add(vertex['id'], vertex.get('name', vertex['id']), ratio, now)
+
+    def poll_lag(self, get_json: Callable[[str], Optional[Dict]], job_id: str,
+                 vertices: List[Dict], now: float):
+        """采集source顶点每个subtask的积压和作业的watermark延迟"""
+        total_pending, total_lag_max = None, None
+        for vertex in vertices:
+            if not vertex.get('name', '').startswith('Source'):
+                continue
+            path = f"/jobs/{job_id}/vertices/{vertex['id']}/metrics"
+            if vertex['id'] not in self.lag_metric_ids:
+                available = get_json(path) or []
+                self.lag_metric_ids[vertex['id']] = [
+                    m['id'] for m in available if m.get('id', '').endswith(self.LAG_METRICS)
+                ]
+            metric_ids = self.lag_metric_ids[vertex['id']]
+            if not metric_ids:
+                continue
+            for metric in get_json(f"{path}?get={','.join(metric_ids)}") or []:
+                try:
+                    value = float(metric['value'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if value < 0:
+                    continue
+                # 非聚合接口的指标ID以subtask序号开头: 0.Source__xxx.pendingRecords
+                subtask = metric['id'].split('.', 1)[0]
+                if metric['id'].endswith('.pendingRecords'):
+                    total_pending = (total_pending or 0) + value
+                    self.lag.add(f"lag:{vertex.get('name', vertex['id'])[:80]}/{subtask}", value, now)
+                else:
+                    total_lag_max = (total_lag_max or 0) + value
+        # pendingRecords是新版KafkaSource的标准指标，没有时用每个consumer的records-lag-max之和近似
+        total = total_pending if total_pending is not None else total_lag_max
+        if total is not None:
+            self.lag.add('lag', total, now)
+
+        # 所有顶点输入watermark的最小值；没有watermark的顶点为Long.MIN_VALUE，忽略
+        watermarks = []
+        for vertex in vertices:
+            for item in get_json(f"/jobs/{job_id}/vertices/{vertex['id']}/watermarks") or []:
+                try:
+                    value = int(item['value'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if value > 0:
+                    watermarks.append(value)
+        if watermarks:
+            self.lag.add('watermark_delay', max(now - min(watermarks) / 1000, 0), now)
+
+    def poll(self, get_json: Callable[[str], Optional[Dict]], job_id: str, vertices: List[Dict]) -> List[Issue]:
+        """
+        拉取checkpoint、反压、积压和watermark指标并评估趋势
+
+        Args:
+            get_json: 请求Flink REST路径并返回JSON的函数，失败时返回None
+            job_id: 作业ID
+            vertices: 作业详情中的顶点列表（包含id和name）
+        """
+        now = time.time()
+        issues = self.poll_checkpoints(get_json, job_id, vertices)
+        self.poll_backpressure(get_json, job_id, vertices, now)
+        self.poll_lag(get_json, job_id, vertices, now)
+        issues += self.checkpoints.evaluate(now, self.checkpoint_timeout_ms)
+        issues += self.backpressure.evaluate(now)
+        issues += self.lag.evaluate(now)
+        return issues
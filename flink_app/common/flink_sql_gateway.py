@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Flink SQL Gateway REST客户端
+============================
+
+保持一个长期存活的SQL Gateway会话，通过HTTP提交SQL脚本并立即返回Flink作业ID，
+避免每次提交都启动sql-client.sh（JVM启动 + catalog初始化需要几十秒）。
+
+使用示例:
+    gateway = FlinkSqlGatewayClient("http://localhost:8083")
+    job_ids = gateway.submit_file("scripts/kafka_to_doris_production.sql")
+"""
+
+import re
+import time
+import threading
+import logging
+from typing import Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# CREATE [TEMPORARY] TABLE [IF NOT EXISTS] name
+CREATE_TABLE_PATTERN = re.compile(
+    r'^\s*CREATE\s+(TEMPORARY\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([`\w.]+)',
+    re.IGNORECASE
+)
+# 提交Flink作业的语句
+SUBMIT_PATTERN = re.compile(r'^\s*(INSERT|EXECUTE)\b', re.IGNORECASE)
+
+
+class SqlGatewayError(Exception):
+    """SQL Gateway返回错误"""
+
+
+class SqlGatewaySubmitUnknown(SqlGatewayError):
+    """
+    INSERT已经发送，但没有拿到作业ID（读取超时、结果中没有作业ID等），作业可能已经提交。
+    调用方不能直接用sql-client重新提交，需要先按作业名称确认作业是否存在。
+    """
+
+    def __init__(self, message: str, job_ids: List[str]):
+        super().__init__(message)
+        # 出错之前已经提交成功的作业ID
+        self.job_ids = job_ids
+
+
+class FlinkSqlGatewayClient:
+    """Flink SQL Gateway会话客户端（线程安全，会话自动续期和重建）"""
+
+    def __init__(self,
+                 gateway_url: str = "http://localhost:8083",
+                 session_properties: Optional[Dict[str, str]] = None,
+                 request_timeout: int = 30,
+                 statement_timeout: int = 300):
+        """
+        初始化SQL Gateway客户端
+
+        Args:
+            gateway_url: SQL Gateway REST地址
+            session_properties: 打开会话时设置的配置项
+            request_timeout: 单次HTTP请求超时（秒）
+            statement_timeout: 单条语句等待结果的超时（秒）
+        """
+        self.gateway_url = gateway_url.rstrip('/')
+        self.session_properties = session_properties or {}
+        self.request_timeout = request_timeout
+        self.statement_timeout = statement_timeout
+        self.http = requests.Session()
+        self.session_handle = None
+        self._lock = threading.Lock()
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        """发送请求并解析响应，错误时抛出SqlGatewayError"""
+        response = self.http.request(
+            method, f"{self.gateway_url}{path}", timeout=self.request_timeout, **kwargs
+        )
+        if response.status_code != 200:
+            try:
+                errors = response.json().get('errors', [])
+            except ValueError:
+                errors = [response.text]
+            # 只保留第一行错误，Gateway返回的Java堆栈非常长
+            message = str(errors[0]).splitlines()[0] if errors else ''
+            raise SqlGatewayError(f"{method} {path} 失败: {response.status_code} {message}")
+        return response.json() if response.content else {}
+
+    def open_session(self) -> str:
+        """打开新会话"""
+        body = {'properties': self.session_properties, 'sessionName': 'flink_app'}
+        self.session_handle = self._request('POST', '/v1/sessions', json=body)['sessionHandle']
+        logger.info(f"SQL Gateway会话已打开: {self.session_handle}")
+        return self.session_handle
+
+    def ensure_session(self) -> str:
+        """确保会话可用: 已有会话发送心跳续期，心跳失败（会话过期）则重建"""
+        if self.session_handle:
+            try:
+                self._request('POST', f"/v1/sessions/{self.session_handle}/heartbeat")
+                return self.session_handle
+            except (SqlGatewayError, requests.RequestException) as e:
+                logger.warning(f"SQL Gateway会话失效，重新打开: {e}")
+                self.session_handle = None
+        return self.open_session()
+
+    def close_session(self):
+        """关闭会话"""
+        with self._lock:
+            if not self.session_handle:
+                return
+            try:
+                self._request('DELETE', f"/v1/sessions/{self.session_handle}")
+            except Exception as e:
+                logger.warning(f"关闭SQL Gateway会话失败: {e}")
+            self.session_handle = None
+
+    def execute_statement(self, statement: str) -> Dict:
+        """
+        执行单条语句并返回第一页结果
+
+        INSERT语句在作业提交后即返回，结果中包含Flink作业ID
+        """
+        session = self.session_handle
+        operation = self._request(
+            'POST', f"/v1/sessions/{session}/statements", json={'statement': statement}
+        )['operationHandle']
+
+        deadline = time.time() + self.statement_timeout
+        while True:
+            result = self._request('GET', f"/v1/sessions/{session}/operations/{operation}/result/0")
+            if result.get('resultType') != 'NOT_READY':
+                return result
+            if time.time() > deadline:
+                self._request('DELETE', f"/v1/sessions/{session}/operations/{operation}/close")
+                raise SqlGatewayError(f"语句执行超时({self.statement_timeout}秒): {statement[:100]}")
+            time.sleep(0.2)
+
+    @staticmethod
+    def extract_job_id(result: Dict) -> Optional[str]:
+        """从语句结果中提取作业ID"""
+        if result.get('jobID'):
+            return result['jobID']
+        results = result.get('results') or {}
+        columns = [c.get('name', '').lower() for c in results.get('columns', [])]
+        if 'job id' in columns and results.get('data'):
+            return results['data'][0]['fields'][columns.index('job id')]
+        return None
+
+    @staticmethod
+    def split_statements(sql_text: str) -> List[str]:
+        """按分号拆分SQL脚本，忽略注释以及引号中的分号"""
+        statements = []
+        current = []
+        i = 0
+        length = len(sql_text)
+        quote = None
+        while i < length:
+            ch = sql_text[i]
+            if quote:
+                current.append(ch)
+                if ch == quote:
+                    # 连续两个引号是转义，不是字符串结束
+                    if i + 1 < length and sql_text[i + 1] == quote:
+                        current.append(quote)
+                        i += 1
+                    else:
+                        quote = None
+            elif ch in ("'", '`', '"'):
+                quote = ch
+                current.append(ch)
+            elif sql_text.startswith('--', i):
+                end = sql_text.find('\n', i)
+                i = length if end == -1 else end
+                continue
+            elif sql_text.startswith('/*', i):
+                end = sql_text.find('*/', i + 2)
+                i = length if end == -1 else end + 2
+                continue
+            elif ch == ';':
+                statement = ''.join(current).strip()
+                if statement:
+                    statements.append(statement)
+                current = []
+            else:
+                current.append(ch)
+            i += 1
+
+        statement = ''.join(current).strip()
+        if statement:
+            statements.append(statement)
+        return statements
+
+    def submit_script(self, sql_text: str) -> List[str]:
+        """
+        在共享会话中执行SQL脚本，返回提交的作业ID列表
+
+        每个脚本执行前先RESET会话配置，并在CREATE TABLE前删除同名表，
+        保证前一个脚本的SET和表定义不会影响当前脚本。
+
+        Raises:
+            SqlGatewaySubmitUnknown: INSERT已发送但没有拿到作业ID，作业可能已经提交
+            SqlGatewayError / requests.RequestException: INSERT发送之前失败（会话、SET、建表等），作业没有提交
+        """
+        statements = self.split_statements(sql_text)
+        job_ids = []
+        with self._lock:
+            self.ensure_session()
+            self.execute_statement('RESET')
+            for statement in statements:
+                match = CREATE_TABLE_PATTERN.match(statement)
+                if match:
+                    temporary = 'TEMPORARY ' if match.group(1) else ''
+                    self.execute_statement(f"DROP {temporary}TABLE IF EXISTS {match.group(2)}")
+
+                submits = bool(SUBMIT_PATTERN.match(statement))
+                try:
+                    result = self.execute_statement(statement)
+                except (SqlGatewayError, requests.RequestException) as e:
+                    if submits:
+                        raise SqlGatewaySubmitUnknown(f"INSERT已发送，提交结果未知: {e}", job_ids)
+                    raise
+                job_id = self.extract_job_id(result)
+                if job_id:
+                    logger.info(f"作业已通过SQL Gateway提交: {job_id}")
+                    job_ids.append(job_id)
+                elif submits:
+                    raise SqlGatewaySubmitUnknown("INSERT已执行，但结果中没有作业ID", job_ids)
+        return job_ids
+
+    def submit_file(self, sql_file: str) -> List[str]:
+        """执行SQL文件，返回提交的作业ID列表"""
+        with open(sql_file, 'r', encoding='utf-8') as f:
+            return self.submit_script(f.read())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+作业名称注册表
+==============
+
+作业每次重启或重新提交都会得到新的作业ID，监控中写死作业ID时，重启后只能报告NOT_FOUND。
+监控改为使用逻辑作业名称（pipeline.name），由注册表解析为当前的作业ID:
+- 名称 -> 当前作业ID 缓存在内存中，只在缓存未命中或调用方发现状态变化（404、已结束）时请求 /jobs/overview；
+  已经轮询 /jobs/overview 的监控直接调用 observe() 更新，不产生额外请求
+- 指定names时只跟踪这些名称，集群上其他作业不进入缓存和历史文件
+- 同名的多个实例中优先选择未结束的实例（RUNNING优先），其次是最近启动的实例
+- 每个名称的作业ID历史（首次/最后一次出现时间、最后状态）保存在本地JSON文件中（原子写入），监控重启后仍可查询
+- continuous(): 把按作业实例累计的计数（例如顶点读取记录数）换算为按逻辑作业连续累计的值，
+  新实例的计数从上一个实例的终值继续，指标不会因为作业重启归零；
+  新计数和实例变化立即保存，其余更新由调用方在每轮检查结束时调用flush()保存，
+  cron单次模式下次运行读到的终值不会过期
+
+使用示例:
+    registry = JobRegistry(get_json, state_file='/path/to/job_registry.json',
+                           names={'mysql2doris_user_interests_prod'})
+    job_id = registry.resolve('mysql2doris_user_interests_prod')
+    total = registry.continuous('mysql2doris_user_interests_prod', job_id, 'records_out', records_out)
+"""
+
+import os
+import json
+import time
+import tempfile
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = {'FINISHED', 'FAILED', 'CANCELED'}
+
+
+class JobRegistry:
+    """逻辑作业名称 -> 当前作业ID 的缓存和作业ID历史"""
+
+    def __init__(self, get_json: Optional[Callable[[str], Optional[Dict]]] = None,
+                 state_file: Optional[str] = None, history_limit: int = 20,
+                 names: Optional[Iterable[str]] = None):
+        """
+        Args:
+            get_json: 请求Flink REST路径并返回JSON的函数，失败时返回None；
+                为None时只能通过observe()更新（调用方自己轮询作业概览）
+            state_file: 作业ID历史和连续计数的保存路径，为None时只保存在内存中
+            history_limit: 每个名称保留的历史实例数
+            names: 需要跟踪的作业名称，为None时跟踪作业概览中的所有名称
+        """
+        self.get_json = get_json
+        self.state_file = state_file
+        self.history_limit = history_limit
+        self.names = set(names) if names is not None else None
+        self._lock = threading.Lock()
+        # 名称 -> {'jid', 'state', 'start_time'}
+        self.current: Dict[str, Dict] = {}
+        # 名称 -> [{'jid', 'start_time', 'state', 'first_seen', 'last_seen'}]，按首次出现时间排序
+        self.history: Dict[str, List[Dict]] = {}
+        # 名称 -> 计数名称 -> {'jid', 'base', 'last'}
+        self.counters: Dict[str, Dict[str, Dict]] = {}
+        # 计数有尚未保存的更新
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.history = data.get('history', {})
+            self.counters = data.get('counters', {})
+        except Exception as e:
+            logger.warning(f"加载作业注册表失败: {self.state_file}, 错误: {e}")
+
+    def save(self):
+        """原子写入: 先写唯一的临时文件并fsync，再rename覆盖"""
+        if not self.state_file:
+            return
+        tmp_path = None
+        try:
+            with self._lock:
+                data = {'history': self.history, 'counters': self.counters, 'updated_at': time.time()}
+                self.dirty = False
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.state_file)),
+                                                prefix=f".{os.path.basename(self.state_file)}.")
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            logger.error(f"保存作业注册表失败: {self.state_file}, 错误: {e}")
+
+    def flush(self):
+        """计数有更新时保存（每轮检查结束时调用）"""
+        if self.dirty:
+            self.save()
+
+    @staticmethod
+    def pick(instances: List[Dict]) -> Dict:
+        """同名实例中选择当前实例: 未结束的优先（RUNNING优先），其次最近启动的"""
+        return max(instances, key=lambda j: (j['state'] not in TERMINAL_STATES, j['state'] == 'RUNNING',
+                                             j.get('start_time') or 0))
+
+    def observe(self, jobs: Dict[str, Dict], now: Optional[float] = None):
+        """
+        用一次作业概览更新缓存和历史
+
+        Args:
+            jobs: 作业ID -> {'name', 'state', 'start_time'}
+        """
+        now = now or time.time()
+        by_name: Dict[str, List[Dict]] = {}
+        for jid, job in jobs.items():
+            if self.names is not None and job['name'] not in self.names:
+                continue
+            by_name.setdefault(job['name'], []).append({**job, 'jid': jid})
+
+        changed = False
+        with self._lock:
+            for name, instances in by_name.items():
+                current = self.pick(instances)
+                previous = self.current.get(name)
+                if previous and previous['jid'] != current['jid']:
+                    logger.info(f"作业 {name} 的当前实例变更: {previous['jid']} -> {current['jid']}")
+                self.current[name] = {'jid': current['jid'], 'state': current['state'],
+                                      'start_time': current.get('start_time')}
+
+                history = self.history.setdefault(name, [])
+                known = {entry['jid']: entry for entry in history}
+                for job in instances:
+                    entry = known.get(job['jid'])
+                    if entry is None:
+                        history.append({'jid': job['jid'], 'start_time': job.get('start_time'), 'state': job['state'],
+                                        'first_seen': now, 'last_seen': now})
+                        changed = True
+                    else:
+                        changed = changed or entry['state'] != job['state']
+                        entry.update(state=job['state'], last_seen=now)
+                if len(history) > self.history_limit:
+                    del history[:len(history) - self.history_limit]
+            # 概览中已经没有的名称（作业已被Flink清理），缓存失效
+            for name in [name for name in self.current if name not in by_name]:
+                del self.current[name]
+        if changed:
+            self.save()
+
+    def refresh(self) -> bool:
+        """请求 /jobs/overview 更新缓存，失败返回False"""
+        if self.get_json is None:
+            return False
+        overview = self.get_json("/jobs/overview")
+        if overview is None:
+            return False
+        self.observe({
+            job['jid']: {'name': job['name'], 'state': job['state'], 'start_time': job.get('start-time')}
+            for job in overview.get('jobs', [])
+        })
+        return True
+
+    def resolve(self, name: str, refresh: bool = False) -> Optional[str]:
+        """
+        名称 -> 当前作业ID，缓存未命中或refresh=True时请求作业概览
+
+        Args:
+            refresh: 调用方发现缓存的作业ID已失效（404、状态变化）时强制刷新
+        """
+        if refresh or name not in self.current:
+            self.refresh()
+        entry = self.current.get(name)
+        return entry['jid'] if entry else None
+
+    def invalidate(self, name: str):
+        self.current.pop(name, None)
+
+    def state(self, name: str) -> Optional[str]:
+        entry = self.current.get(name)
+        return entry['state'] if entry else None
+
+    def ids(self, name: str) -> List[str]:
+        """名称对应的所有历史作业ID（按首次出现时间）"""
+        return [entry['jid'] for entry in self.history.get(name, [])]
+
+    def name_of(self, jid: str) -> Optional[str]:
+        for name, history in self.history.items():
+            if any(entry['jid'] == jid for entry in history):
+                return name
+        return None
+
+    def previous_id(self, name: str, jid: str) -> Optional[str]:
+        """jid之前的一个实例ID"""
+        ids = self.ids(name)
+        if jid in ids and ids.index(jid) > 0:
+            return ids[ids.index(jid) - 1]
+        return None
+
+    def continuous(self, name: str, jid: str, key: str, value: float) -> float:
+        """
+        按逻辑作业连续累计的计数: 作业实例变化或计数回退（作业在Flink内部重启）时，
+        之前的终值计入基数，返回 基数 + 当前值
+
+        Args:
+            name: 逻辑作业名称
+            jid: 当前作业ID
+            key: 计数名称（例如 'records_out:顶点名称'）
+            value: 当前实例的累计值
+        """
+        with self._lock:
+            entry = self.counters.setdefault(name, {}).get(key)
+            # 新计数和实例变化立即保存，基数不能丢
+            save = entry is None
+            if entry is None:
+                entry = self.counters[name][key] = {'jid': jid, 'base': 0.0, 'last': 0.0}
+            if entry['jid'] != jid or value < entry['last']:
+                entry['base'] += entry['last']
+                save = save or entry['jid'] != jid
+                entry['jid'] = jid
+            self.dirty = self.dirty or entry['last'] != value
+            entry['last'] = value
+            total = entry['base'] + value
+        if save:
+            self.save()
+        return total
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+飞书告警
+========
+
+各监控脚本共用的飞书告警组件。
+
+- send_lark_alert: 同步发送一条post消息
+- AlertDispatcher: 后台线程异步发送，监控循环只负责入队，飞书接口慢或不可用时不会阻塞监控
+    - 批量: batch_window 秒内的多条告警合并为一条消息
+    - 去重: 相同 dedup_key 的告警在 suppress_seconds 内只发送一次，下一次发送时附上被抑制的次数
+    - 限流: 两次发送之间至少间隔 min_send_interval 秒
+    - 重试: 发送失败按指数退避重试 max_retries 次
+
+使用示例:
+    alerts = AlertDispatcher.shared(webhook_url)
+    alerts.send("Flink作业异常", "作业 xxx 已失败", dedup_key="job_failed:xxx")
+"""
+
+import time
+import queue
+import atexit
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Alert:
+    """一条待发送的告警"""
+    title: str
+    message: str
+    is_error: bool = True
+    dedup_key: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    suppressed: int = 0  # 发送前被抑制的相同告警数
+
+    @property
+    def key(self) -> str:
+        return self.dedup_key or f"{self.title}:{self.message}"
+
+    def text(self) -> str:
+        if self.suppressed:
+            return f"{self.message}（此前{self.suppressed}次相同告警已抑制）"
+        return self.message
+
+
+def build_post_payload(alerts: List[Alert]) -> Dict:
+    """飞书post消息: 单条告警与原send_alert格式相同，多条告警合并为一条消息"""
+    if len(alerts) == 1:
+        title = alerts[0].title
+        lines = [[{"tag": "text", "text": alerts[0].text()}]]
+    else:
+        title = f"{alerts[0].title} 等{len(alerts)}条告警"
+        lines = [[{"tag": "text", "text": f"【{alert.title}】{alert.text()}"}] for alert in alerts]
+    lines.append([{"tag": "text", "text": f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"}])
+    return {
+        "msg_type": "post",
+        "content": {
+            "post": {
+                "zh_cn": {
+                    "title": title,
+                    "content": lines
+                }
+            }
+        }
+    }
+
+
+def post_payload(webhook_url: str, payload: Dict, timeout: int = 10) -> bool:
+    """发送消息到飞书webhook，返回是否发送成功（HTTP 200且返回码为0）"""
+    try:
+        response = requests.post(webhook_url, json=payload, timeout=timeout)
+        if response.status_code != 200:
+            logger.error(f"告警发送失败: {response.status_code}")
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        # 飞书限流等错误也返回HTTP 200，错误码在返回内容中
+        code = body.get('code', body.get('StatusCode', 0))
+        if code:
+            logger.error(f"告警发送失败: code={code} {body.get('msg', '')}")
+            return False
+        return True
+    except Exception as e:
+        logger.error(f"发送告警失败: {str(e)}")
+        return False
+
+
+def send_lark_alert(webhook_url: str, title: str, message: str, is_error: bool = True) -> bool:
+    """同步发送告警到飞书，返回是否发送成功"""
+    if post_payload(webhook_url, build_post_payload([Alert(title, message, is_error)])):
+        logger.info(f"告警发送成功: {title}")
+        return True
+    return False
+
+
+class AlertDispatcher:
+    """后台线程发送飞书告警: 队列 + 批量合并 + 去重抑制 + 限流 + 重试退避"""
+
+    _shared: Dict[str, 'AlertDispatcher'] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, webhook_url: str, batch_window: float = 5.0, suppress_seconds: int = 600,
+                 min_send_interval: float = 1.0, max_retries: int = 5, backoff_base: float = 2.0,
+                 backoff_max: float = 60.0, max_queue: int = 1000, request_timeout: int = 10,
+                 payload_builder: Callable[[List[Alert]], Dict] = build_post_payload):
+        """
+        Args:
+            webhook_url: 飞书机器人webhook地址
+            batch_window: 收到第一条告警后等待合并的时间（秒）
+            suppress_seconds: 相同dedup_key的告警抑制时间（秒）
+            min_send_interval: 两次发送的最小间隔（秒），飞书机器人限制每秒5条、每分钟100条
+            max_retries: 发送失败的最大重试次数
+            backoff_base: 第一次重试前的等待时间（秒），之后每次翻倍
+            backoff_max: 重试等待时间上限（秒）
+            max_queue: 队列长度上限，队列满时丢弃新告警并记录日志
+            request_timeout: 请求飞书的超时时间（秒）
+            payload_builder: 由一批告警生成飞书消息体的函数
+        """
+        self.webhook_url = webhook_url
+        self.batch_window = batch_window
+        self.suppress_seconds = suppress_seconds
+        self.min_send_interval = min_send_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.request_timeout = request_timeout
+        self.payload_builder = payload_builder
+
+        self.queue: 'queue.Queue[Optional[Alert]]' = queue.Queue(maxsize=max_queue)
+        # 以下状态只在发送线程中访问
+        self.last_sent: Dict[str, float] = {}   # dedup_key -> 最近一次发送时间
+        self.suppressed: Dict[str, int] = {}    # dedup_key -> 抑制期间被丢弃的次数
+        self.last_send_time = 0.0
+
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls, webhook_url: str, **kwargs) -> 'AlertDispatcher':
+        """同一进程内同一webhook共用一个发送队列，去重和限流对所有调用方生效"""
+        with cls._shared_lock:
+            dispatcher = cls._shared.get(webhook_url)
+            if dispatcher is None:
+                dispatcher = cls._shared[webhook_url] = cls(webhook_url, **kwargs)
+            return dispatcher
+
+    def send(self, title: str, message: str, is_error: bool = True, dedup_key: Optional[str] = None) -> bool:
+        """告警入队后立即返回，队列已满时返回False"""
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(Alert(title, message, is_error, dedup_key))
+            return True
+        except queue.Full:
+            logger.error(f"告警队列已满，丢弃告警: {title}")
+            return False
+
+    def flush(self, timeout: float = 30) -> bool:
+        """等待队列中的告警发送完成（包括重试），返回是否在超时前完成"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        return not self.queue.unfinished_tasks
+
+    def close(self, timeout: float = 30):
+        """发送剩余告警并停止发送线程（进程退出时自动调用）"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self.flush(timeout)
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            return
+        self._thread.join(timeout=5)
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="lark-alert-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _collect_batch(self, first: Alert) -> List[Optional[Alert]]:
+        """收到第一条告警后，在batch_window内继续收集告警"""
+        batch = [first]
+        deadline = time.time() + self.batch_window
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                alert = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(alert)
+            if alert is None:
+                break
+        return batch
+
+    def _deduplicate(self, batch: List[Alert]) -> List[Alert]:
+        """去掉抑制期内已发送过的告警，批次内相同key只保留第一条"""
+        now = time.time()
+        for key in [k for k, sent in self.last_sent.items() if now - sent >= self.suppress_seconds]:
+            del self.last_sent[key]
+        result = []
+        seen = set()
+        for alert in batch:
+            key = alert.key
+            if key in seen or now - self.last_sent.get(key, 0) < self.suppress_seconds:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                logger.info(f"告警已抑制: {alert.title} (key={key[:80]})")
+                continue
+            seen.add(key)
+            alert.suppressed = self.suppressed.pop(key, 0)
+            result.append(alert)
+        return result
+
+    def _deliver(self, alerts: List[Alert]):
+        """限流后发送，失败时指数退避重试"""
+        payload = self.payload_builder(alerts)
+        titles = ', '.join(alert.title for alert in alerts)
+        for attempt in range(self.max_retries + 1):
+            wait = self.last_send_time + self.min_send_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self.last_send_time = time.time()
+            if post_payload(self.webhook_url, payload, self.request_timeout):
+                logger.info(f"告警发送成功: {titles}")
+                return True
+            if attempt < self.max_retries:
+                delay = min(self.backoff_base * 2 ** attempt, self.backoff_max)
+                logger.warning(f"告警发送失败，{delay:.0f}秒后第{attempt + 1}次重试: {titles}")
+                time.sleep(delay)
+        logger.error(f"告警发送失败，已重试{self.max_retries}次，放弃: {titles}")
+        return False
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                self.queue.task_done()
+                return
+            batch = self._collect_batch(first)
+            stop = batch[-1] is None
+            alerts = [alert for alert in batch if alert is not None]
+            try:
+                to_send = self._deduplicate(alerts)
+                if to_send:
+                    # 发送失败也记录时间，避免重试期间相同告警再次排队发送
+                    now = time.time()
+                    for alert in to_send:
+                        self.last_sent[alert.key] = now
+                    self._deliver(to_send)
+            except Exception as e:
+                logger.error(f"告警发送线程异常: {str(e)}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
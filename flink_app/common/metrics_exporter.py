@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus指标导出
+==================
+
+监控进程内的指标注册表，以Prometheus文本格式(0.0.4)在 /metrics 上提供给Prometheus抓取，
+看板和报警阈值可以在Prometheus/Grafana中配置，不再写死在监控脚本里。
+只依赖标准库（http.server），不需要额外安装prometheus_client。
+
+使用示例:
+    registry = MetricsRegistry()
+    state = registry.gauge('flink_job_up', '作业是否有RUNNING实例', ['job'])
+    state.set(1, job='kafka_to_doris_production')
+    start_metrics_server(registry, 9260)
+"""
+
+import math
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# REST请求耗时等秒级指标的默认分桶
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """一个指标及其所有标签组合的取值"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], lock: threading.Lock):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = lock
+        self.values: Dict[Tuple, float] = {}
+
+    def _key(self, labels: Dict) -> Tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = float(value)
+
+    def remove(self, **labels):
+        """删除一个标签组合（例如作业已从注册表中移除）"""
+        with self._lock:
+            self.values.pop(self._key(labels), None)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+                for key, value in sorted(self.values.items())]
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def inc(self, amount: float = 1, **labels):
+        with self._lock:
+            key = self._key(labels)
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Counter(Metric):
+    """只增不减的计数；set用于镜像Flink中已经是累计值的指标（作业重启后归零，rate()可以处理）"""
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counter只能增加")
+        with self._lock:
+            key = self._key(labels)
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str], lock: threading.Lock,
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names, lock)
+        self.buckets = tuple(sorted(buckets))
+        # 标签组合 -> (各分桶计数, 总和, 总数)
+        self.observations: Dict[Tuple, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        with self._lock:
+            key = self._key(labels)
+            counts, total, count = self.observations.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.observations[key] = (counts, total + value, count + 1)
+
+    def remove(self, **labels):
+        with self._lock:
+            self.observations.pop(self._key(labels), None)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self.observations.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, ('le', format_value(bound)))} "
+                             f"{bucket_count}")
+            lines.append(f"{self.name}_bucket{format_labels(self.label_names, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{format_labels(self.label_names, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，同名指标只注册一次"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, Metric] = {}
+
+    def _register(self, cls, name: str, documentation: str, label_names: Sequence[str], **kwargs) -> Metric:
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, documentation, label_names, self._lock, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, label_names)
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, label_names)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, label_names, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name in sorted(self.metrics):
+                metric = self.metrics[name]
+                lines.append(f"# HELP {name} {metric.documentation.replace(chr(10), ' ')}")
+                lines.append(f"# TYPE {name} {metric.type_name}")
+                lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """在后台线程中提供 /metrics，返回HTTP服务（调用shutdown()停止）"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 抓取请求不写入监控日志
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Prometheus指标已在 http://{host}:{server.server_address[1]}/metrics 提供")
+    return server
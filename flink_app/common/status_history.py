@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控状态历史（SQLite）
+======================
+
+状态文件只保存最近一次检查的结果，历史只能从每天的文本日志中翻找。
+监控每次检查的数值（吞吐量、端到端延迟、作业是否RUNNING等）追加到本地SQLite:
+- samples: 原始采样，保留 raw_days 天
+- rollup_1m / rollup_1h: 写入原始采样时同步累加到1分钟、1小时汇总（采样数、和、最小值、最大值），
+  分别保留 minute_days、hour_days 天，原始采样过期后仍可查询趋势
+- 指标名称只在 metrics 表中保存一次，采样表按 (指标ID, 时间戳) 聚簇存储（WITHOUT ROWID），
+  单个指标的时间范围查询只读取相邻的页
+- 过期数据每小时清理一次（上次清理时间保存在库中，cron单次模式同样适用）
+
+查询按时间范围自动选择精度: 3小时以内用原始采样，24小时以内用1分钟汇总，更长用1小时汇总。
+
+使用示例:
+    history = StatusHistory('/path/to/user_interests_history.db', raw_days=7)
+    history.record('mysql2doris_user_interests_prod', {'records_per_second': 1200.5, 'job_running': 1})
+    points = history.query('mysql2doris_user_interests_prod', 'records_per_second', hours=24)
+
+命令行:
+python3 status_history.py --db ../mysql2doris/logs/user_interests_history.db summary --hours 24
+python3 status_history.py --db ../mysql2doris/logs/user_interests_history.db query --metric records_per_second --hours 24
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 汇总精度 -> 时间桶长度（秒）
+ROLLUPS = {'1m': 60, '1h': 3600}
+# 自动选择精度: 查询范围不超过该秒数时使用对应精度
+AUTO_RESOLUTION = [('raw', 3 * 3600), ('1m', 24 * 3600)]
+PRUNE_INTERVAL = 3600
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class StatusHistory:
+    """监控数值的追加式历史，带保留期和1分钟/1小时降采样"""
+
+    def __init__(self, db_path: str, raw_days: int = 7, minute_days: int = 30, hour_days: int = 365):
+        """
+        Args:
+            db_path: SQLite库文件路径
+            raw_days: 原始采样保留天数
+            minute_days: 1分钟汇总保留天数
+            hour_days: 1小时汇总保留天数
+        """
+        self.db_path = db_path
+        self.retention = {'raw': raw_days * 86400, '1m': minute_days * 86400, '1h': hour_days * 86400}
+        self._lock = threading.Lock()
+        self._metric_ids: Dict[tuple, int] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            # WAL: 守护进程写入时命令行查询不被阻塞
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    series TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    UNIQUE (series, name)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS samples (
+                    metric_id INTEGER NOT NULL,
+                    ts INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (metric_id, ts)
+                ) WITHOUT ROWID
+            """)
+            for resolution in ROLLUPS:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS rollup_{resolution} (
+                        metric_id INTEGER NOT NULL,
+                        bucket INTEGER NOT NULL,
+                        samples INTEGER NOT NULL,
+                        total REAL NOT NULL,
+                        minimum REAL NOT NULL,
+                        maximum REAL NOT NULL,
+                        PRIMARY KEY (metric_id, bucket)
+                    ) WITHOUT ROWID
+                """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 守护进程和cron单次检查可能同时写入，每次操作使用独立连接
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _metric_id(self, conn: sqlite3.Connection, series: str, name: str, create: bool = True) -> Optional[int]:
+        key = (series, name)
+        if key not in self._metric_ids:
+            row = conn.execute("SELECT id FROM metrics WHERE series = ? AND name = ?", key).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                row = (conn.execute("INSERT INTO metrics (series, name) VALUES (?, ?)", key).lastrowid,)
+            self._metric_ids[key] = row[0]
+        return self._metric_ids[key]
+
+    def record(self, series: str, values: Dict[str, Optional[float]], ts: Optional[float] = None):
+        """
+        追加一次采样，同时累加到1分钟、1小时汇总
+
+        Args:
+            series: 序列名称（通常是逻辑作业名称）
+            values: 指标名称 -> 数值，None的指标跳过；同一指标同一秒内只保留第一次采样
+            ts: 采样时间戳，默认当前时间
+        """
+        ts = int(ts if ts is not None else time.time())
+        with self._lock, self._connect() as conn:
+            for name, value in values.items():
+                if value is None:
+                    continue
+                value = float(value)
+                metric_id = self._metric_id(conn, series, name)
+                inserted = conn.execute("INSERT OR IGNORE INTO samples (metric_id, ts, value) VALUES (?, ?, ?)",
+                                        (metric_id, ts, value)).rowcount
+                if not inserted:
+                    continue
+                for resolution, step in ROLLUPS.items():
+                    bucket = ts - ts % step
+                    updated = conn.execute(
+                        f"""UPDATE rollup_{resolution}
+                            SET samples = samples + 1, total = total + ?,
+                                minimum = MIN(minimum, ?), maximum = MAX(maximum, ?)
+                            WHERE metric_id = ? AND bucket = ?""",
+                        (value, value, value, metric_id, bucket)).rowcount
+                    if not updated:
+                        conn.execute(f"INSERT INTO rollup_{resolution} VALUES (?, ?, 1, ?, ?, ?)",
+                                     (metric_id, bucket, value, value, value))
+            self._prune_if_due(conn, ts)
+
+    def _prune_if_due(self, conn: sqlite3.Connection, now: int):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'pruned_at'").fetchone()
+        if row is not None and now - int(row[0]) < PRUNE_INTERVAL:
+            return
+        deleted = 0
+        metric_ids = [r[0] for r in conn.execute("SELECT id FROM metrics")]
+        for table, resolution in [('samples', 'raw'), ('rollup_1m', '1m'), ('rollup_1h', '1h')]:
+            column = 'ts' if table == 'samples' else 'bucket'
+            cutoff = now - self.retention[resolution]
+            # 按指标逐个删除，使用主键范围而不是全表扫描
+            for metric_id in metric_ids:
+                deleted += conn.execute(f"DELETE FROM {table} WHERE metric_id = ? AND {column} < ?",
+                                        (metric_id, cutoff)).rowcount
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('pruned_at', ?)", (str(now),))
+        if deleted:
+            logger.info(f"状态历史清理过期数据: {deleted}行")
+
+    def pick_resolution(self, since: float, until: float) -> str:
+        """按查询范围选择精度，起点超出该精度保留期时改用更粗的精度"""
+        now = time.time()
+        for resolution, max_span in AUTO_RESOLUTION:
+            if until - since <= max_span and since >= now - self.retention[resolution]:
+                return resolution
+        return '1h'
+
+    def query(self, series: str, metric: str, hours: float = 24, since: Optional[float] = None,
+              until: Optional[float] = None, resolution: Optional[str] = None) -> List[Dict]:
+        """
+        查询一个指标的时间序列
+
+        Args:
+            hours: 最近多少小时（未指定since时使用）
+            since / until: 时间范围（时间戳），until默认当前时间
+            resolution: 'raw'、'1m'、'1h'，默认按范围自动选择
+
+        Returns:
+            [{'ts', 'avg', 'min', 'max', 'samples'}]，按时间排序；汇总精度下ts为时间桶起点
+        """
+        until = until if until is not None else time.time()
+        since = since if since is not None else until - hours * 3600
+        resolution = resolution or self.pick_resolution(since, until)
+        with self._connect() as conn:
+            metric_id = self._metric_id(conn, series, metric, create=False)
+            if metric_id is None:
+                return []
+            if resolution == 'raw':
+                rows = conn.execute("SELECT ts, value, value, value, 1 FROM samples "
+                                    "WHERE metric_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                                    (metric_id, int(since), int(until))).fetchall()
+            else:
+                step = ROLLUPS[resolution]
+                rows = conn.execute(f"SELECT bucket, total / samples, minimum, maximum, samples FROM rollup_{resolution} "
+                                    f"WHERE metric_id = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket",
+                                    (metric_id, int(since) - int(since) % step, int(until))).fetchall()
+        return [{'ts': r[0], 'avg': r[1], 'min': r[2], 'max': r[3], 'samples': r[4]} for r in rows]
+
+    def summary(self, series: str, hours: float = 24) -> List[Dict]:
+        """
+        序列中每个指标最近hours小时的汇总（平均值按采样数加权）
+
+        Returns:
+            [{'metric', 'avg', 'min', 'max', 'last', 'last_ts', 'samples', 'resolution'}]
+        """
+        until = time.time()
+        since = until - hours * 3600
+        # 汇总只需要和、最小值、最大值，1分钟汇总已足够精确，超出其保留期时使用1小时汇总
+        resolution = '1m' if since >= until - self.retention['1m'] else '1h'
+        step = ROLLUPS[resolution]
+        with self._connect() as conn:
+            metrics = conn.execute("SELECT id, name FROM metrics WHERE series = ? ORDER BY name", (series,)).fetchall()
+            result = []
+            for metric_id, name in metrics:
+                samples, total, minimum, maximum = conn.execute(
+                    f"SELECT SUM(samples), SUM(total), MIN(minimum), MAX(maximum) FROM rollup_{resolution} "
+                    f"WHERE metric_id = ? AND bucket >= ?",
+                    (metric_id, int(since) - int(since) % step)).fetchone()
+                if not samples:
+                    continue
+                last = conn.execute("SELECT ts, value FROM samples WHERE metric_id = ? ORDER BY ts DESC LIMIT 1",
+                                    (metric_id,)).fetchone()
+                result.append({'metric': name, 'avg': total / samples, 'min': minimum, 'max': maximum,
+                               'last': last[1] if last else None, 'last_ts': last[0] if last else None,
+                               'samples': samples, 'resolution': resolution})
+        return result
+
+    def series(self) -> List[str]:
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT DISTINCT series FROM metrics ORDER BY series")]
+
+
+def fmt(value, digits=1):
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def fmt_time(ts):
+    return '-' if ts is None else datetime.fromtimestamp(ts).strftime(TIME_FORMAT)
+
+
+def print_summary(series: str, summary: List[Dict], hours: float):
+    print(f"{series} 最近{hours:g}小时")
+    header = f"{'指标':<32}{'平均':>14}{'最小':>14}{'最大':>14}{'最新':>14}  {'最新时间':<20}{'采样数':>8}"
+    print(header)
+    print('-' * len(header))
+    for s in summary:
+        print(f"{s['metric']:<32}{fmt(s['avg']):>14}{fmt(s['min']):>14}{fmt(s['max']):>14}{fmt(s['last']):>14}  "
+              f"{fmt_time(s['last_ts']):<20}{s['samples']:>8}")
+
+
+def print_points(points: List[Dict]):
+    header = f"{'时间':<20}{'平均':>14}{'最小':>14}{'最大':>14}{'采样数':>8}"
+    print(header)
+    print('-' * len(header))
+    for p in points:
+        print(f"{fmt_time(p['ts']):<20}{fmt(p['avg']):>14}{fmt(p['min']):>14}{fmt(p['max']):>14}{p['samples']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='监控状态历史查询')
+    parser.add_argument('--db', required=True, help='状态历史库路径')
+    parser.add_argument('--series', help='序列名称（作业名称），库中只有一个序列时可省略')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summary', help='每个指标的平均/最小/最大/最新值')
+    summary_parser.add_argument('--hours', type=float, default=24, help='统计最近N小时')
+    query_parser = subparsers.add_parser('query', help='输出一个指标的时间序列')
+    query_parser.add_argument('--metric', required=True, help='指标名称，例如 records_per_second')
+    query_parser.add_argument('--hours', type=float, default=24, help='查询最近N小时')
+    query_parser.add_argument('--resolution', choices=['raw', '1m', '1h'], help='精度，默认按时间范围自动选择')
+    args = parser.parse_args()
+
+    history = StatusHistory(args.db)
+    series = args.series
+    if series is None:
+        names = history.series()
+        if len(names) != 1:
+            parser.error(f"请用 --series 指定序列: {', '.join(names) or '（库中没有数据）'}")
+        series = names[0]
+
+    if args.command == 'summary':
+        print_summary(series, history.summary(series, hours=args.hours), args.hours)
+    else:
+        print_points(history.query(series, args.metric, hours=args.hours, resolution=args.resolution))
@@ -109,6 +109,7 @@ class FlinkConfigGenerator:
         job = job_config['job']
         
         settings = f"""-- Flink执行配置
+SET 'pipeline.name' = '{job['name']}';
 SET 'parallelism.default' = '{job['parallelism']}';
 
 -- 检查点配置
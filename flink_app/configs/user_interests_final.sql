@@ -6,6 +6,7 @@
 -- 目标表: xme_dw_ods.xme_ods_user_rds_user_interests_di
 -- =====================================================
 -- Flink执行配置
+SET 'pipeline.name' = 'mysql2doris_user_interests_prod';
 SET 'parallelism.default' = '8';
 
 -- 检查点配置
@@ -2,13 +2,27 @@
 # -*- coding: utf-8 -*-
 
 import requests
-import json
 import time
 import logging
+import re
 import subprocess
+import tempfile
 import os
-from datetime import datetime
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+# 共享组件目录 flink_app/common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from flink_sql_gateway import FlinkSqlGatewayClient, SqlGatewaySubmitUnknown
+from lark_alert import AlertDispatcher
+from metrics_exporter import MetricsRegistry, start_metrics_server
+from adaptive_poll import AdaptivePoller, RequestBudget, BudgetedAdapter
+from flink_health import JobHealthTracker, CheckpointTrend, BackpressureTrend, LagTrend, EVENT_ISSUES, format_eta
+from job_registry import JobRegistry
 
 class FlinkMonitor:
     def __init__(self, 
@@ -16,7 +30,24 @@ class FlinkMonitor:
                  webhook_url: str = "https://open.larksuite.com/open-apis/bot/v2/hook/3bb8fac6-6a02-498e-804f-48b1b38a6089",
                  flink_sql_path: str = "/home/ubuntu/work/script/kafka_to_doris_production.sql",
                  flink_bin_path: str = "/home/ubuntu/work/script/flink/bin/sql-client.sh",
-                 check_interval: int = 60):
+                 check_interval: int = 60,
+                 fast_check_interval: int = 2,
+                 max_check_interval: int = 180,
+                 overview_interval: int = 10,
+                 max_requests_per_minute: int = 120,
+                 submit_backend: str = "sql-client",
+                 sql_gateway_url: str = "http://localhost:8083",
+                 max_detail_workers: int = 8,
+                 job_registry: Optional[Dict[str, str]] = None,
+                 checkpoint_growth_pct: float = 50,
+                 backpressure_threshold: float = 0.5,
+                 backpressure_sustain_seconds: int = 600,
+                 lag_growth_rate: float = 100,
+                 watermark_growth_rate: float = 0.5,
+                 savepoint_dir: str = "file:///home/ubuntu/work/script/savepoints",
+                 metrics_port: Optional[int] = None,
+                 job_id_history_file: Optional[str] = '/home/ubuntu/work/script/flink_job_ids.json',
+                 log_file: str = '/home/ubuntu/work/script/flink_monitor.log'):
         """
         初始化Flink监控器
         
@@ -25,80 +56,146 @@ class FlinkMonitor:
             webhook_url: 飞书机器人webhook地址
             flink_sql_path: 生产环境SQL文件路径
             flink_bin_path: Flink SQL客户端路径
-            check_interval: 检查间隔（秒）
+            check_interval: 作业健康检查的基础间隔（秒），稳定健康的作业从该间隔逐步放大到max_check_interval
+            fast_check_interval: 作业处于RESTARTING/INITIALIZING等过渡状态或checkpoint失败时的检查间隔（秒）
+            max_check_interval: 稳定健康作业的最大检查间隔（秒）
+            overview_interval: 没有作业需要检查时轮询 /jobs/overview 的间隔（秒），决定发现状态变化的速度
+            max_requests_per_minute: 发往JobManager的请求预算（每分钟），预算不足时健康检查顺延
+            submit_backend: 作业提交方式，sql-client 或 gateway（复用SQL Gateway会话）
+            sql_gateway_url: SQL Gateway REST地址
+            max_detail_workers: 并发执行健康检查（作业详情、checkpoint、反压）的最大作业数
+            job_registry: 需要保持运行的作业，作业名称(pipeline.name) -> SQL文件路径，
+                          默认只包含生产环境Kafka to Doris作业
+            checkpoint_growth_pct: checkpoint耗时一小时内增长超过该百分比时报警
+            backpressure_threshold: 反压比例(0~1)报警阈值
+            backpressure_sustain_seconds: 反压持续超过阈值多长时间才报警
+            lag_growth_rate: Kafka消费积压10分钟内持续增长超过该速率（条/秒）时报警
+            watermark_growth_rate: watermark延迟10分钟内增长超过该速率（秒/秒）时报警
+            savepoint_dir: 重启作业时stop-with-savepoint的目标目录
+            metrics_port: Prometheus指标端口，设置后在 /metrics 上提供作业和监控自身的指标
+            job_id_history_file: 每个作业名称的作业ID历史和跨实例连续计数的保存路径
+            log_file: 日志文件路径
         """
         self.flink_rest_url = flink_rest_url
         self.webhook_url = webhook_url
+        self.alerts = AlertDispatcher.shared(webhook_url)
         self.flink_sql_path = flink_sql_path
         self.flink_bin_path = flink_bin_path
+        self.savepoint_dir = savepoint_dir
         self.check_interval = check_interval
+        self.overview_interval = overview_interval
+        self.poller = AdaptivePoller(fast_check_interval, check_interval, max_check_interval)
+        self.gateway = FlinkSqlGatewayClient(sql_gateway_url) if submit_backend == "gateway" else None
+        
+        # 复用keep-alive连接访问Flink REST API，连接池大小与并发数一致，所有请求共用每分钟的请求预算
+        self.max_detail_workers = max_detail_workers
+        self.budget = RequestBudget(max_requests_per_minute)
+        self.http = requests.Session()
+        self.http.mount("http://", BudgetedAdapter(self.budget, pool_connections=1, pool_maxsize=max_detail_workers))
+        self.http.mount("https://", BudgetedAdapter(self.budget, pool_connections=1, pool_maxsize=max_detail_workers))
+        # 每个作业最近一次健康检查发出的请求数，用于判断预算是否足够；
+        # 健康检查并发执行，按线程分别计数
+        self.request_count = 0
+        self.thread_requests = threading.local()
+        self.health_check_cost: Dict[str, int] = {}
+        self.terminal_states = {'FINISHED', 'FAILED', 'CANCELED'}
+        
+        # 作业注册表: 按作业名称精确匹配，不再按名称是否包含kafka过滤
+        self.job_registry = job_registry or {"kafka_to_doris_production": flink_sql_path}
+        # 最近一次 /jobs/overview 的作业表: 作业ID -> {name, state, start_time}
+        self.job_table: Dict[str, Dict] = {}
+        # 作业名称 -> 当前作业ID和历史作业ID（由每轮的作业概览更新，不额外请求）
+        self.job_ids = JobRegistry(state_file=job_id_history_file, names=self.job_registry)
+        # 作业名称 -> (当前重试间隔, 下一次允许重新提交的时间)。重新提交失败后间隔从check_interval
+        # 翻倍到max_check_interval，避免每轮作业概览都启动一次sql-client
+        self.resubmit_backoff: Dict[str, tuple] = {}
+        # 集群或REST API连续检查失败次数，达到max_failed_checks次时报警
+        self.failed_checks = 0
+        self.max_failed_checks = 3
+        
+        # 运行中作业的checkpoint、反压、消费积压和watermark趋势跟踪
+        self.checkpoint_growth_pct = checkpoint_growth_pct
+        self.backpressure_threshold = backpressure_threshold
+        self.backpressure_sustain_seconds = backpressure_sustain_seconds
+        self.lag_growth_rate = lag_growth_rate
+        self.watermark_growth_rate = watermark_growth_rate
+        self.health_trackers: Dict[str, JobHealthTracker] = {}
+        self.health_alerted: Dict[str, str] = {}  # 报警key -> 作业名称
+        self.health_lock = threading.Lock()
+        
+        # Prometheus指标
+        self.metrics_port = metrics_port
+        self.init_metrics()
+        self.http.hooks['response'].append(self.observe_response)
         
         # 设置日志
         logging.basicConfig(
             level=logging.INFO,
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler('/home/ubuntu/work/script/flink_monitor.log'),
+                logging.FileHandler(log_file),
                 logging.StreamHandler()
             ]
         )
         self.logger = logging.getLogger(__name__)
         
-    def send_alert(self, title: str, message: str, is_error: bool = True):
-        """发送告警到飞书"""
-        try:
-            color = "red" if is_error else "green"
-            payload = {
-                "msg_type": "post",
-                "content": {
-                    "post": {
-                        "zh_cn": {
-                            "title": title,
-                            "content": [
-                                [
-                                    {
-                                        "tag": "text",
-                                        "text": message
-                                    }
-                                ],
-                                [
-                                    {
-                                        "tag": "text",
-                                        "text": f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                                    }
-                                ]
-                            ]
-                        }
-                    }
-                }
-            }
-            
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            if response.status_code == 200:
-                self.logger.info(f"告警发送成功: {title}")
-            else:
-                self.logger.error(f"告警发送失败: {response.status_code}")
-                
-        except Exception as e:
-            self.logger.error(f"发送告警失败: {str(e)}")
+    def send_alert(self, title: str, message: str, is_error: bool = True, dedup_key: Optional[str] = None):
+        """告警入队，由后台线程批量发送到飞书，相同告警在抑制时间内只发送一次"""
+        self.alerts.send(title, message, is_error, dedup_key)
     
-    def get_flink_jobs(self) -> Optional[List[Dict]]:
-        """获取Flink作业列表"""
+    def get_jobs_overview(self) -> Optional[Dict[str, Dict]]:
+        """一次请求获取所有作业的名称、状态和开始时间"""
         try:
-            response = requests.get(f"{self.flink_rest_url}/jobs", timeout=10)
+            response = self.http.get(f"{self.flink_rest_url}/jobs/overview", timeout=10)
             if response.status_code == 200:
-                return response.json().get('jobs', [])
+                return {
+                    job['jid']: {'name': job['name'], 'state': job['state'], 'start_time': job.get('start-time')}
+                    for job in response.json().get('jobs', [])
+                }
             else:
-                self.logger.error(f"获取Flink作业列表失败: {response.status_code}")
+                self.logger.error(f"获取Flink作业概览失败: {response.status_code}")
                 return None
         except Exception as e:
             self.logger.error(f"连接Flink REST API失败: {str(e)}")
             return None
     
+    @staticmethod
+    def diff_jobs(old: Dict[str, Dict], new: Dict[str, Dict]) -> List[Dict]:
+        """对比两次作业表，返回新增、状态变化和消失的作业"""
+        changes = []
+        for job_id, job in new.items():
+            previous = old.get(job_id)
+            if previous is None or previous['state'] != job['state']:
+                changes.append({'jid': job_id, 'name': job['name'],
+                                'old_state': previous['state'] if previous else None, 'new_state': job['state']})
+        for job_id, job in old.items():
+            if job_id not in new:
+                changes.append({'jid': job_id, 'name': job['name'], 'old_state': job['state'], 'new_state': None})
+        return changes
+    
+    def active_jobs_by_name(self) -> Dict[str, List[str]]:
+        """作业名称 -> 未结束的作业ID列表"""
+        index: Dict[str, List[str]] = {}
+        for job_id, job in self.job_table.items():
+            if job['state'] not in self.terminal_states:
+                index.setdefault(job['name'], []).append(job_id)
+        return index
+    
+    def find_active_job(self, job_name: str, attempts: int = 5, interval: float = 2) -> Optional[str]:
+        """按作业名称在作业概览中查找未结束的作业，作业提交后可能要稍后才出现"""
+        for attempt in range(attempts):
+            snapshot = self.get_jobs_overview() or {}
+            for job_id, job in snapshot.items():
+                if job['name'] == job_name and job['state'] not in self.terminal_states:
+                    return job_id
+            if attempt < attempts - 1:
+                time.sleep(interval)
+        return None
+    
     def get_job_details(self, job_id: str) -> Optional[Dict]:
         """获取作业详细信息"""
         try:
-            response = requests.get(f"{self.flink_rest_url}/jobs/{job_id}", timeout=10)
+            response = self.http.get(f"{self.flink_rest_url}/jobs/{job_id}", timeout=10)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -108,46 +205,325 @@ class FlinkMonitor:
             self.logger.error(f"获取作业详情异常: {str(e)}")
             return None
     
-    def restart_flink_job(self, job_id: str) -> bool:
-        """重启Flink作业"""
+    def get_rest_json(self, path: str) -> Optional[Dict]:
+        """请求Flink REST API，失败返回None"""
         try:
-            # 先停止作业
-            stop_response = requests.patch(
-                f"{self.flink_rest_url}/jobs/{job_id}",
-                json={"type": "cancel"},
+            response = self.http.get(f"{self.flink_rest_url}{path}", timeout=10)
+            if response.status_code == 200:
+                return response.json()
+            self.logger.warning(f"请求 {path} 失败: {response.status_code}")
+        except Exception as e:
+            self.logger.warning(f"请求 {path} 异常: {str(e)}")
+        return None
+    
+    # Flink作业的所有状态，作业状态指标对每个状态输出0/1
+    JOB_STATES = ['INITIALIZING', 'CREATED', 'RUNNING', 'FAILING', 'FAILED', 'CANCELLING', 'CANCELED',
+                  'FINISHED', 'RESTARTING', 'SUSPENDED', 'RECONCILING']
+    
+    def init_metrics(self):
+        """注册Prometheus指标"""
+        self.metrics = MetricsRegistry()
+        m = self.metrics
+        self.metric_rest_latency = m.histogram('flink_monitor_rest_request_duration_seconds',
+                                               '监控请求Flink REST API的耗时', ['endpoint'])
+        self.metric_rest_requests = m.counter('flink_monitor_rest_requests_total',
+                                              '监控请求Flink REST API的次数', ['endpoint', 'status'])
+        self.metric_cycle = m.histogram('flink_monitor_cycle_duration_seconds', '一轮监控检查的耗时',
+                                        buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+        self.metric_cluster_up = m.gauge('flink_cluster_up', 'Flink集群是否可访问且有可用的TaskManager')
+        self.metric_job_state = m.gauge('flink_job_state', '注册作业当前实例的状态（当前状态为1）', ['job', 'state'])
+        self.metric_job_uptime = m.gauge('flink_job_uptime_seconds', '注册作业当前RUNNING实例的运行时长', ['job'])
+        self.metric_job_restarts = m.gauge('flink_job_num_restarts', '当前实例在Flink内部的重启次数', ['job'])
+        self.metric_job_resubmits = m.counter('flink_job_resubmits_total', '监控重新提交作业的次数',
+                                              ['job', 'result'])
+        self.metric_records_in = m.counter('flink_vertex_records_in_total', '顶点读取的记录数', ['job', 'vertex'])
+        self.metric_records_out = m.counter('flink_vertex_records_out_total', '顶点输出的记录数', ['job', 'vertex'])
+        self.metric_checkpoint_duration = m.histogram('flink_job_checkpoint_duration_seconds', '完成的checkpoint耗时',
+                                                      ['job'], buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+        self.metric_checkpoint_size = m.gauge('flink_job_last_checkpoint_size_bytes', '最近一次checkpoint大小', ['job'])
+        self.metric_lag = m.gauge('flink_job_kafka_lag_records', 'Kafka消费积压条数', ['job'])
+        self.metric_watermark_delay = m.gauge('flink_job_watermark_delay_seconds', 'watermark落后当前时间的秒数', ['job'])
+        # 作业ID -> 已计入直方图的最近一次checkpoint完成时间
+        self.metric_checkpoint_seen: Dict[str, float] = {}
+    
+    @staticmethod
+    def metric_endpoint(url: str) -> str:
+        """REST路径中的作业/顶点ID和checkpoint序号替换为占位符，控制标签数量"""
+        path = re.sub(r'[0-9a-f]{32}', '{id}', urlparse(url).path)
+        return re.sub(r'/\d+(?=/|$)', '/{n}', path)
+    
+    def observe_response(self, response, *args, **kwargs):
+        """requests响应钩子: 记录每次REST请求的耗时和状态码"""
+        endpoint = self.metric_endpoint(response.url)
+        self.metric_rest_latency.observe(response.elapsed.total_seconds(), endpoint=endpoint)
+        self.metric_rest_requests.inc(endpoint=endpoint, status=str(response.status_code))
+        self.request_count += 1
+        self.thread_requests.count = getattr(self.thread_requests, 'count', 0) + 1
+    
+    def update_job_metrics(self):
+        """根据最近一次作业表更新注册作业的状态和运行时长"""
+        now_ms = time.time() * 1000
+        for job_name in self.job_registry:
+            instances = [j for j in self.job_table.values() if j['name'] == job_name]
+            active = [j for j in instances if j['state'] not in self.terminal_states]
+            current = max(active or instances, key=lambda j: j.get('start_time') or 0) if instances else None
+            for state in self.JOB_STATES:
+                self.metric_job_state.set(1 if current and current['state'] == state else 0, job=job_name, state=state)
+            uptime = 0
+            if current and current['state'] == 'RUNNING' and current.get('start_time'):
+                uptime = max(now_ms - current['start_time'], 0) / 1000
+            self.metric_job_uptime.set(uptime, job=job_name)
+    
+    def update_health_metrics(self, job_id: str, job_name: str, details: Dict, tracker: JobHealthTracker):
+        """运行中作业的记录数、重启次数、checkpoint和积压指标"""
+        for vertex in details.get('vertices', []):
+            vertex_metrics = vertex.get('metrics', {})
+            vertex_name = vertex.get('name', vertex['id'])[:80]
+            # 作业重启后从上一个实例的终值继续累计
+            records_in = self.job_ids.continuous(job_name, job_id, f"records_in:{vertex_name}",
+                                                 vertex_metrics.get('read-records', 0))
+            records_out = self.job_ids.continuous(job_name, job_id, f"records_out:{vertex_name}",
+                                                  vertex_metrics.get('write-records', 0))
+            self.metric_records_in.set(records_in, job=job_name, vertex=vertex_name)
+            self.metric_records_out.set(records_out, job=job_name, vertex=vertex_name)
+        
+        for metric in self.get_rest_json(f"/jobs/{job_id}/metrics?get=numRestarts") or []:
+            if metric.get('id') == 'numRestarts':
+                self.metric_job_restarts.set(float(metric.get('value', 0)), job=job_name)
+        
+        seen = self.metric_checkpoint_seen.get(job_id, 0)
+        for completed_at, duration_ms, size_bytes, _ in tracker.checkpoints.samples:
+            if completed_at > seen:
+                self.metric_checkpoint_duration.observe(duration_ms / 1000, job=job_name)
+                self.metric_checkpoint_size.set(size_bytes, job=job_name)
+                self.metric_checkpoint_seen[job_id] = completed_at
+        
+        lag = tracker.lag.summary(time.time())
+        if 'lag' in lag:
+            self.metric_lag.set(lag['lag'], job=job_name)
+        if 'watermark_delay' in lag:
+            self.metric_watermark_delay.set(lag['watermark_delay'], job=job_name)
+    
+    def run_health_check(self, job_id: str, job: Dict) -> set:
+        """在线程池中执行一个作业的健康检查，记录本次检查发出的请求数"""
+        requests_before = getattr(self.thread_requests, 'count', 0)
+        try:
+            return self.check_job_health(job_id, job['name']) or set()
+        except Exception as e:
+            self.logger.error(f"作业 {job['name']} 健康检查异常: {str(e)}")
+            return set()
+        finally:
+            self.health_check_cost[job_id] = getattr(self.thread_requests, 'count', 0) - requests_before
+    
+    def check_job_health(self, job_id: str, job_name: str) -> Optional[set]:
+        """
+        检查运行中作业的checkpoint和反压趋势，问题出现时报警一次，消失后发送恢复通知
+        
+        Returns:
+            本次检查发现的问题key集合，获取作业详情失败时返回None
+        """
+        details = self.get_job_details(job_id)
+        if not details:
+            return None
+        tracker = self.health_trackers.get(job_id)
+        if tracker is None:
+            tracker = JobHealthTracker(
+                CheckpointTrend(growth_pct=self.checkpoint_growth_pct),
+                BackpressureTrend(threshold=self.backpressure_threshold,
+                                  sustain_seconds=self.backpressure_sustain_seconds),
+                # 稳定作业的检查间隔放大后，10分钟内的采样数减少
+                LagTrend(max_lag_growth=self.lag_growth_rate, max_watermark_growth=self.watermark_growth_rate,
+                         min_samples=3)
+            )
+            self.health_trackers[job_id] = tracker
+        issues = tracker.poll(self.get_rest_json, job_id, details.get('vertices', []))
+        self.update_health_metrics(job_id, job_name, details, tracker)
+        
+        latest = tracker.checkpoints.summary()
+        if latest:
+            self.logger.info(f"作业 {job_name} 最近checkpoint: 耗时{latest['duration_ms'] / 1000:.1f}s, "
+                             f"大小{latest['size_bytes'] / 1024 / 1024:.1f}MB, "
+                             f"对齐{latest['alignment_ms'] if latest['alignment_ms'] is not None else '-'}ms")
+        lag = tracker.lag.summary(time.time())
+        if 'lag' in lag:
+            rate = f"{lag['lag_rate']:+.0f}条/秒" if lag['lag_rate'] is not None else "-"
+            eta = f", {format_eta(lag['lag_eta'])}" if lag['lag_eta'] is not None else ""
+            self.logger.info(f"作业 {job_name} Kafka积压: {lag['lag']:.0f}条, 变化{rate}{eta}")
+        if 'watermark_delay' in lag:
+            self.logger.info(f"作业 {job_name} watermark落后: {lag['watermark_delay']:.0f}秒")
+        
+        current = set()
+        recovered = []
+        # 多个作业的健康检查并发执行，报警状态的读写需要加锁
+        with self.health_lock:
+            for key, message in issues:
+                alert_key = f"{job_id}:{key}"
+                if key in EVENT_ISSUES:
+                    self.send_alert("Flink作业checkpoint失败", f"作业 {job_name}: {message}")
+                    continue
+                current.add(alert_key)
+                if alert_key not in self.health_alerted:
+                    self.health_alerted[alert_key] = job_name
+                    self.logger.warning(f"作业 {job_name} 健康异常: {message}")
+                    self.send_alert("Flink作业健康预警", f"作业 {job_name}: {message}")
+            for alert_key in [k for k in self.health_alerted if k.startswith(f"{job_id}:") and k not in current]:
+                del self.health_alerted[alert_key]
+                recovered.append(alert_key)
+        
+        for alert_key in recovered:
+            key = alert_key.split(':', 1)[1]
+            message = f"作业 {job_name}: {key} 已恢复正常"
+            # 积压/watermark停止增长后附上追平时间
+            series = {'lag_growth': 'lag', 'watermark_growth': 'watermark_delay'}.get(key)
+            if series and tracker.lag.eta_seconds(series, time.time()) is not None:
+                message += f"，{format_eta(tracker.lag.eta_seconds(series, time.time()))}"
+            self.send_alert("Flink作业健康恢复", message, is_error=False)
+        return {key for key, _ in issues}
+    
+    def stop_with_savepoint(self, job_id: str, timeout: int = 600) -> Optional[str]:
+        """停止作业并生成savepoint，返回savepoint路径，失败返回None"""
+        try:
+            response = self.http.post(
+                f"{self.flink_rest_url}/jobs/{job_id}/stop",
+                json={"targetDirectory": self.savepoint_dir, "drain": False},
                 timeout=30
             )
+            if response.status_code not in [200, 202]:
+                self.logger.error(f"触发stop-with-savepoint失败: {response.status_code} {response.text[:200]}")
+                return None
+            trigger_id = response.json()['request-id']
             
-            if stop_response.status_code in [200, 202]:
-                self.logger.info(f"作业 {job_id} 停止成功")
-                
-                # 等待作业完全停止
-                time.sleep(10)
-                
-                # 重新提交作业
-                if self.submit_flink_job():
-                    self.logger.info("作业重新提交成功")
-                    return True
-                else:
-                    self.logger.error("作业重新提交失败")
-                    return False
+            deadline = time.time() + timeout
+            while time.time() < deadline:
+                status = self.get_rest_json(f"/jobs/{job_id}/savepoints/{trigger_id}") or {}
+                if (status.get('status') or {}).get('id') == 'COMPLETED':
+                    operation = status.get('operation') or {}
+                    if operation.get('location'):
+                        self.logger.info(f"作业 {job_id} 已停止，savepoint: {operation['location']}")
+                        return operation['location']
+                    self.logger.error(f"savepoint失败: {str(operation.get('failure-cause', ''))[:200]}")
+                    return None
+                time.sleep(2)
+            self.logger.error(f"savepoint超时({timeout}秒): {job_id}")
+        except Exception as e:
+            self.logger.error(f"stop-with-savepoint异常: {str(e)}")
+        return None
+    
+    def get_latest_checkpoint_path(self, job_id: str) -> Optional[str]:
+        """作业最近一次完成的checkpoint或savepoint路径"""
+        stats = self.get_rest_json(f"/jobs/{job_id}/checkpoints") or {}
+        latest = stats.get('latest') or {}
+        candidates = [c for c in (latest.get('completed'), latest.get('savepoint')) if c and c.get('external_path')]
+        if not candidates:
+            return None
+        newest = max(candidates, key=lambda c: c.get('latest_ack_timestamp', 0))
+        path = newest['external_path']
+        # 本地文件系统上的checkpoint可能已被清理
+        if path.startswith('file:') and not os.path.exists(path[len('file:'):]):
+            self.logger.warning(f"checkpoint目录不存在: {path}")
+            return None
+        return path
+    
+    def wait_for_terminal(self, job_id: str, timeout: int = 60) -> bool:
+        """等待作业进入结束状态"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            state = (self.get_rest_json(f"/jobs/{job_id}") or {}).get('state')
+            if state in self.terminal_states:
+                return True
+            time.sleep(2)
+        return False
+    
+    def restart_flink_job(self, job_id: str, sql_path: Optional[str] = None, job_name: Optional[str] = None) -> bool:
+        """
+        保留状态重启Flink作业
+        
+        作业仍在运行时stop-with-savepoint；savepoint失败或作业已结束时使用最近一次完成的checkpoint；
+        以 execution.savepoint.path 重新提交，只需追赶停止期间的数据。
+        没有可用的savepoint/checkpoint时从头提交。
+        """
+        try:
+            restore_path = None
+            state = (self.get_rest_json(f"/jobs/{job_id}") or {}).get('state')
+            if state and state not in self.terminal_states:
+                restore_path = self.stop_with_savepoint(job_id)
+                if not restore_path:
+                    # savepoint失败时取消作业，改用最近的checkpoint
+                    stop_response = self.http.patch(f"{self.flink_rest_url}/jobs/{job_id}?mode=cancel", timeout=30)
+                    if stop_response.status_code not in [200, 202]:
+                        self.logger.error(f"停止作业失败: {stop_response.status_code}")
+                        return False
+                    self.logger.info(f"作业 {job_id} 停止成功")
+                    if not self.wait_for_terminal(job_id):
+                        self.logger.error(f"作业 {job_id} 未能在60秒内停止")
+                        return False
+            
+            if not restore_path:
+                restore_path = self.get_latest_checkpoint_path(job_id)
+            if restore_path:
+                self.logger.info(f"从 {restore_path} 恢复作业")
             else:
-                self.logger.error(f"停止作业失败: {stop_response.status_code}")
+                self.logger.warning(f"作业 {job_id} 没有可用的savepoint/checkpoint，从头提交")
+            
+            # 重新提交作业
+            if self.submit_flink_job(sql_path, savepoint_path=restore_path, job_name=job_name):
+                self.logger.info("作业重新提交成功")
+                return True
+            else:
+                self.logger.error("作业重新提交失败")
                 return False
                 
         except Exception as e:
             self.logger.error(f"重启作业异常: {str(e)}")
             return False
     
-    def submit_flink_job(self) -> bool:
-        """提交Flink作业"""
+    def submit_flink_job(self, sql_path: Optional[str] = None, savepoint_path: Optional[str] = None,
+                         job_name: Optional[str] = None) -> bool:
+        """
+        提交Flink作业，默认提交生产环境SQL文件
+        
+        指定savepoint_path时在SQL前加上 SET 'execution.savepoint.path'，从该savepoint/checkpoint恢复；
+        job_name为SQL中的pipeline.name，SQL Gateway提交结果未知时按该名称确认作业是否已经提交
+        """
+        sql_path = sql_path or self.flink_sql_path
+        if savepoint_path and os.path.exists(sql_path):
+            with open(sql_path, 'r', encoding='utf-8') as f:
+                sql_content = f.read()
+            fd, restore_sql_path = tempfile.mkstemp(prefix='flink_restore_', suffix='.sql', dir='/tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(f"SET 'execution.savepoint.path' = '{savepoint_path}';\n\n{sql_content}")
+            try:
+                return self.submit_flink_job(restore_sql_path, job_name=job_name)
+            finally:
+                os.remove(restore_sql_path)
+        
         try:
-            if not os.path.exists(self.flink_sql_path):
-                self.logger.error(f"SQL文件不存在: {self.flink_sql_path}")
+            if not os.path.exists(sql_path):
+                self.logger.error(f"SQL文件不存在: {sql_path}")
                 return False
             
+            # 优先通过SQL Gateway会话提交，失败时回退到sql-client
+            if self.gateway:
+                try:
+                    job_ids = self.gateway.submit_file(sql_path)
+                    if job_ids:
+                        self.logger.info(f"Flink作业通过SQL Gateway提交成功: {', '.join(job_ids)}")
+                        return True
+                    self.logger.warning("SQL Gateway未返回作业ID，回退到sql-client")
+                except SqlGatewaySubmitUnknown as e:
+                    # INSERT可能已经被接受，再用sql-client提交会产生同一消费组的两个作业
+                    active = self.find_active_job(job_name) if job_name else None
+                    if active:
+                        self.logger.warning(f"SQL Gateway提交结果未知，作业 {job_name} 已在运行: {active}")
+                        return True
+                    self.logger.error(f"SQL Gateway提交结果未知，且未找到运行中的作业 {job_name}，不重复提交: {str(e)}")
+                    return False
+                except Exception as e:
+                    # INSERT发送之前失败（会话、SET、建表），作业没有提交
+                    self.logger.warning(f"SQL Gateway提交失败，回退到sql-client: {str(e)}")
+            
             # 执行SQL文件
-            cmd = f"{self.flink_bin_path} -f {self.flink_sql_path}"
+            cmd = f"{self.flink_bin_path} -f {sql_path}"
             result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=300)
             
             if result.returncode == 0:
@@ -167,7 +543,7 @@ class FlinkMonitor:
     def check_flink_cluster_health(self) -> bool:
         """检查Flink集群健康状态"""
         try:
-            response = requests.get(f"{self.flink_rest_url}/overview", timeout=10)
+            response = self.http.get(f"{self.flink_rest_url}/overview", timeout=10)
             if response.status_code == 200:
                 overview = response.json()
                 if overview.get('taskmanagers', 0) > 0:
@@ -182,95 +558,180 @@ class FlinkMonitor:
             self.logger.error(f"检查Flink集群健康状态异常: {str(e)}")
             return False
     
+    def schedule_resubmit(self, job_name: str, submitted: bool, backoff: float):
+        """
+        安排下一次允许重新提交的时间: 提交成功后等待check_interval让作业出现在概览中；
+        失败后间隔从check_interval开始翻倍，最长max_check_interval
+        """
+        if submitted:
+            interval = self.check_interval
+        else:
+            interval = min(backoff * 2, self.poller.max_interval) if backoff else self.check_interval
+            self.logger.warning(f"作业 {job_name} 重新提交失败，{interval:.0f}秒后重试")
+        # 成功时不保留翻倍后的间隔
+        self.resubmit_backoff[job_name] = (0 if submitted else interval, time.time() + interval)
+    
+    def run_cycle(self) -> float:
+        """
+        执行一轮监控检查
+        
+        Returns:
+            到下一轮检查需要等待的秒数
+        """
+        cycle_started = time.time()
+        # 检查集群健康状态
+        cluster_ok = self.check_flink_cluster_health()
+        self.metric_cluster_up.set(1 if cluster_ok else 0)
+        if not cluster_ok:
+            self.failed_checks += 1
+            if self.failed_checks >= self.max_failed_checks:
+                self.send_alert(
+                    "Flink集群异常", 
+                    f"Flink集群连续{self.failed_checks}次检查失败，请检查集群状态"
+                )
+                self.failed_checks = 0
+            return self.overview_interval
+        
+        # 一次请求获取所有作业概览
+        snapshot = self.get_jobs_overview()
+        if snapshot is None:
+            self.failed_checks += 1
+            if self.failed_checks >= self.max_failed_checks:
+                self.send_alert(
+                    "Flink API异常", 
+                    f"Flink REST API连续{self.failed_checks}次无法访问"
+                )
+                self.failed_checks = 0
+            return self.overview_interval
+        self.failed_checks = 0
+        
+        # 只处理与上一次相比发生变化的作业
+        changes = self.diff_jobs(self.job_table, snapshot)
+        self.job_table = snapshot
+        self.job_ids.observe(snapshot)
+        self.update_job_metrics()
+        failed_names = set()
+        for change in changes:
+            if change['name'] not in self.job_registry:
+                continue
+            # 状态变化的作业立即检查（快速通道）
+            self.poller.expedite(change['jid'])
+            self.logger.info(f"作业 {change['name']}({change['jid']}) 状态变化: "
+                             f"{change['old_state'] or '-'} -> {change['new_state'] or '已清理'}")
+            if change['new_state'] in ['FAILED', 'CANCELED']:
+                self.logger.warning(f"作业 {change['name']} 状态异常: {change['new_state']}")
+                failed_names.add(change['name'])
+        
+        # 到期的作业检查checkpoint和反压趋势，并按状态安排下一次检查；
+        # 已结束的作业不再请求详情
+        due = []
+        reserved = 0
+        for job_id, job in self.job_table.items():
+            if job['name'] not in self.job_registry or job['state'] in self.terminal_states:
+                self.poller.forget(job_id)
+                continue
+            if not self.poller.is_due(job_id):
+                continue
+            if job['state'] == 'RUNNING':
+                # 预算不足时顺延一个基础间隔，作业概览的轮询不受影响；本轮已提交的检查预先占用预算。
+                # 顶点多的作业检查成本可能超过令牌桶容量，最多等到令牌桶满
+                required = min(self.health_check_cost.get(job_id, 10), self.budget.capacity)
+                if self.budget.available() - reserved < required:
+                    interval = self.poller.record(job_id, job['state'], watch=True)
+                    self.logger.info(f"请求预算不足，作业 {job['name']} 的健康检查顺延{interval:.0f}秒")
+                    continue
+                reserved += required
+            due.append((job_id, job))
+        
+        # 到期的健康检查在有界线程池中并发执行
+        running = [(job_id, job) for job_id, job in due if job['state'] == 'RUNNING']
+        results: Dict[str, set] = {}
+        if running:
+            with ThreadPoolExecutor(max_workers=self.max_detail_workers, thread_name_prefix='health') as executor:
+                issues = executor.map(lambda item: self.run_health_check(*item), running)
+                results = dict(zip([job_id for job_id, _ in running], issues))
+        for job_id, job in due:
+            issue_keys = results.get(job_id, set())
+            interval = self.poller.record(
+                job_id, job['state'],
+                degraded=bool(issue_keys & {'checkpoint_failed', 'checkpoint_timeout'}),
+                watch=bool(issue_keys)
+            )
+            self.logger.debug(f"作业 {job['name']} 状态 {job['state']}，{interval:.0f}秒后再次检查")
+        for job_id in [j for j in self.health_trackers if self.job_table.get(j, {}).get('state') != 'RUNNING']:
+            del self.health_trackers[job_id]
+            self.metric_checkpoint_seen.pop(job_id, None)
+            self.health_check_cost.pop(job_id, None)
+            for alert_key in [k for k in self.health_alerted if k.startswith(f"{job_id}:")]:
+                del self.health_alerted[alert_key]
+        # 本轮健康检查更新的连续计数终值
+        self.job_ids.flush()
+        
+        # 注册表中没有运行实例的作业重新提交
+        active = self.active_jobs_by_name()
+        for job_name, sql_path in self.job_registry.items():
+            if active.get(job_name):
+                self.resubmit_backoff.pop(job_name, None)
+                continue
+            backoff, next_attempt = self.resubmit_backoff.get(job_name, (0, 0))
+            if time.time() < next_attempt:
+                continue
+            # 从该作业最近一次运行实例的checkpoint恢复
+            instances = [(jid, j) for jid, j in self.job_table.items() if j['name'] == job_name]
+            last_job_id = max(instances, key=lambda item: item[1].get('start_time') or 0)[0] if instances else None
+            if job_name in failed_names:
+                restarted = self.restart_flink_job(last_job_id, sql_path, job_name=job_name)
+                self.schedule_resubmit(job_name, restarted, backoff)
+                self.metric_job_resubmits.inc(job=job_name, result='success' if restarted else 'failure')
+                if restarted:
+                    self.send_alert(
+                        "Flink作业自动恢复", 
+                        f"作业 {job_name} 已自动重启", 
+                        is_error=False
+                    )
+                else:
+                    self.send_alert(
+                        "Flink作业重启失败", 
+                        f"作业 {job_name} 重启失败，需要手动处理"
+                    )
+            else:
+                self.logger.warning(f"没有找到运行中的作业 {job_name}，尝试重新提交")
+                resubmitted = (self.restart_flink_job(last_job_id, sql_path, job_name=job_name) if last_job_id
+                               else self.submit_flink_job(sql_path, job_name=job_name))
+                self.schedule_resubmit(job_name, resubmitted, backoff)
+                self.metric_job_resubmits.inc(job=job_name, result='success' if resubmitted else 'failure')
+                if resubmitted:
+                    self.send_alert(
+                        "Flink作业恢复", 
+                        f"作业 {job_name} 已重新提交", 
+                        is_error=False
+                    )
+                else:
+                    self.send_alert(
+                        "Flink作业提交失败", 
+                        f"无法重新提交作业 {job_name}"
+                    )
+        
+        self.metric_cycle.observe(time.time() - cycle_started)
+        # 有作业处于过渡状态时秒级轮询，否则等到下一个作业到期或概览轮询间隔
+        return self.poller.sleep_seconds(self.overview_interval)
+    
     def monitor_jobs(self):
         """监控Flink作业"""
         self.logger.info("开始监控Flink作业...")
         
-        failed_checks = 0
-        max_failed_checks = 3
+        if self.metrics_port:
+            start_metrics_server(self.metrics, self.metrics_port)
         
         while True:
             try:
-                # 检查集群健康状态
-                if not self.check_flink_cluster_health():
-                    failed_checks += 1
-                    if failed_checks >= max_failed_checks:
-                        self.send_alert(
-                            "Flink集群异常", 
-                            f"Flink集群连续{failed_checks}次检查失败，请检查集群状态"
-                        )
-                        failed_checks = 0
-                    time.sleep(self.check_interval)
-                    continue
-                
-                # 获取作业列表
-                jobs = self.get_flink_jobs()
-                if jobs is None:
-                    failed_checks += 1
-                    if failed_checks >= max_failed_checks:
-                        self.send_alert(
-                            "Flink API异常", 
-                            f"Flink REST API连续{failed_checks}次无法访问"
-                        )
-                        failed_checks = 0
-                    time.sleep(self.check_interval)
-                    continue
-                
-                # 检查是否有运行中的Kafka to Doris作业
-                kafka_doris_jobs = []
-                for job in jobs:
-                    job_details = self.get_job_details(job['id'])
-                    if job_details and 'kafka' in job_details.get('name', '').lower():
-                        kafka_doris_jobs.append(job_details)
-                
-                if not kafka_doris_jobs:
-                    self.logger.warning("没有找到Kafka to Doris作业，尝试重新提交")
-                    if self.submit_flink_job():
-                        self.send_alert(
-                            "Flink作业恢复", 
-                            "Kafka to Doris作业已重新提交", 
-                            is_error=False
-                        )
-                    else:
-                        self.send_alert(
-                            "Flink作业提交失败", 
-                            "无法重新提交Kafka to Doris作业"
-                        )
-                else:
-                    # 检查作业状态
-                    for job in kafka_doris_jobs:
-                        job_id = job['jid']
-                        job_name = job['name']
-                        job_state = job['state']
-                        
-                        if job_state in ['FAILED', 'CANCELED']:
-                            self.logger.warning(f"作业 {job_name} 状态异常: {job_state}")
-                            
-                            # 尝试重启作业
-                            if self.restart_flink_job(job_id):
-                                self.send_alert(
-                                    "Flink作业自动恢复", 
-                                    f"作业 {job_name} 已自动重启", 
-                                    is_error=False
-                                )
-                            else:
-                                self.send_alert(
-                                    "Flink作业重启失败", 
-                                    f"作业 {job_name} 重启失败，需要手动处理"
-                                )
-                        
-                        elif job_state == 'RUNNING':
-                            self.logger.info(f"作业 {job_name} 运行正常")
-                            failed_checks = 0
-                
-                time.sleep(self.check_interval)
-                
+                time.sleep(self.run_cycle())
             except KeyboardInterrupt:
                 self.logger.info("监控程序被手动停止")
                 break
             except Exception as e:
                 self.logger.error(f"监控过程中发生异常: {str(e)}")
-                time.sleep(self.check_interval)
+                time.sleep(self.overview_interval)
 
 if __name__ == "__main__":
     # 配置参数
@@ -279,7 +740,9 @@ if __name__ == "__main__":
         webhook_url="https://open.larksuite.com/open-apis/bot/v2/hook/3bb8fac6-6a02-498e-804f-48b1b38a6089",
         flink_sql_path="/home/ubuntu/work/script/kafka_to_doris_production.sql",
         flink_bin_path="/opt/flink/bin/sql-client.sh",  # 根据实际路径调整
-        check_interval=60  # 每60秒检查一次
+        check_interval=60,  # 健康作业从60秒开始，稳定后放大到180秒；过渡状态下每2秒检查
+        submit_backend="sql-client",  # 部署SQL Gateway后可改为 "gateway"
+        metrics_port=9260  # Prometheus抓取 http://<host>:9260/metrics
     )
     
     # 启动监控
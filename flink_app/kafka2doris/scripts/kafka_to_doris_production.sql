@@ -1,9 +1,13 @@
+-- 作业名称: flink_monitor.py 按名称在作业注册表中查找该作业
+SET 'pipeline.name' = 'kafka_to_doris_production';
+
 -- 设置生产环境 checkpoint 配置
 SET 'execution.checkpointing.interval' = '60s';
 SET 'execution.checkpointing.mode' = 'EXACTLY_ONCE';
 SET 'execution.checkpointing.timeout' = '600s';
 SET 'state.backend' = 'filesystem';
 SET 'state.checkpoints.dir' = 'file://./flink_app/kafka2doris/checkpoints';
+SET 'execution.checkpointing.externalized-checkpoint-retention' = 'RETAIN_ON_CANCELLATION';
 SET 'restart-strategy' = 'fixed-delay';
 SET 'restart-strategy.fixed-delay.attempts' = '3';
 SET 'restart-strategy.fixed-delay.delay' = '30s';
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟Flink REST服务
+==================
+
+不需要真实集群即可运行 flink_monitor.py、monitor_user_interests.py 和 flink_monitor_daemon.py:
+- 按场景文件生成任意数量的作业（顶点、checkpoint、反压、watermark、积压指标）
+- 回放从真实集群录制的响应（record 子命令录制）
+- 按时间脚本切换作业状态，也可以运行时通过 /_fake/jobs/{name}/state 切换、通过 /_fake/jobs 添加作业
+- 按接口注入延迟和错误
+- /_fake/webhook 代替飞书机器人接收告警，/_fake/stats 统计每个接口的请求数
+
+场景文件示例 (YAML):
+    jobs:
+      count: 100                    # 生成 bench_job_0000 ... bench_job_0099
+      name_prefix: "bench_job_"
+      vertices: 3
+      extra:                        # 额外的作业，可以指定作业ID
+        - name: "kafka_to_doris_production"
+          state: "RUNNING"
+          lag: 5000                 # source的pendingRecords
+    transitions:                    # 相对服务启动的秒数
+      - {at: 30, job: "kafka_to_doris_production", state: "RESTARTING"}
+      - {at: 40, job: "kafka_to_doris_production", state: "RUNNING"}
+    latency:
+      default_ms: 5
+      jitter_ms: 5
+      endpoints:                    # 作业/顶点ID写作{id}，数字写作{n}
+        "/jobs/{id}/vertices/{id}/backpressure": 200
+    errors:
+      - {endpoint: "/jobs/overview", rate: 0.05, status: 503}
+    recorded: "recorded_responses.json"
+
+使用示例:
+python3 fake_flink_server.py --port 18081 --jobs 500
+python3 fake_flink_server.py --port 18081 --scenario scenario.yaml
+python3 fake_flink_server.py record --from http://localhost:8081 --out recorded_responses.json
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import requests
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Long.MIN_VALUE，没有watermark的顶点
+NO_WATERMARK = -9223372036854775808
+
+
+def normalize_path(path: str) -> str:
+    """作业/顶点ID替换为{id}，数字替换为{n}，与监控的接口指标标签一致"""
+    path = re.sub(r'[0-9a-f]{32}', '{id}', path)
+    return re.sub(r'/\d+(?=/|$)', '/{n}', path)
+
+
+def make_id(*parts) -> str:
+    """由名称生成固定的32位十六进制ID，同一场景每次运行的ID相同"""
+    return hashlib.md5('/'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
+
+
+class FakeJob:
+    """一个模拟作业"""
+
+    def __init__(self, name: str, jid: Optional[str] = None, state: str = 'RUNNING', vertices: int = 3,
+                 lag: float = 0, records_per_second: float = 1000, checkpoint_interval: int = 60,
+                 checkpoint_duration_ms: int = 2000):
+        self.name = name
+        self.jid = jid or make_id('job', name)
+        self.state = state
+        self.start_time = int(time.time() * 1000)
+        self.lag = lag
+        self.records_per_second = records_per_second
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_duration_ms = checkpoint_duration_ms
+        self.num_restarts = 0
+        vertex_names = ['Source: kafka_source'] + [f'Operator_{i}' for i in range(1, vertices - 1)]
+        if vertices > 1:
+            vertex_names.append('Sink: doris_sink')
+        self.vertices = [{'id': make_id('vertex', name, i), 'name': vertex_name, 'parallelism': 1}
+                         for i, vertex_name in enumerate(vertex_names)]
+
+    def uptime_seconds(self) -> float:
+        return max(time.time() * 1000 - self.start_time, 0) / 1000 if self.state == 'RUNNING' else 0
+
+    def overview(self) -> Dict:
+        return {'jid': self.jid, 'name': self.name, 'state': self.state, 'start-time': self.start_time,
+                'end-time': -1, 'duration': int(self.uptime_seconds() * 1000)}
+
+    def details(self) -> Dict:
+        records = int(self.uptime_seconds() * self.records_per_second)
+        vertices = []
+        for i, vertex in enumerate(self.vertices):
+            vertices.append({
+                **vertex,
+                'status': self.state,
+                'metrics': {
+                    'read-records': records if i > 0 else 0,
+                    'write-records': records if i < len(self.vertices) - 1 else 0,
+                    'read-bytes': records * 100 if i > 0 else 0,
+                    'write-bytes': records * 100 if i < len(self.vertices) - 1 else 0,
+                }
+            })
+        return {'jid': self.jid, 'name': self.name, 'state': self.state, 'start-time': self.start_time,
+                'vertices': vertices}
+
+    def checkpoints(self) -> Dict:
+        completed = int(self.uptime_seconds() // self.checkpoint_interval)
+        history = []
+        for checkpoint_id in range(completed, max(completed - 10, 0), -1):
+            ack = self.start_time + checkpoint_id * self.checkpoint_interval * 1000
+            history.append({
+                'id': checkpoint_id, 'status': 'COMPLETED', 'is_savepoint': False,
+                'latest_ack_timestamp': ack, 'end_to_end_duration': self.checkpoint_duration_ms,
+                'checkpointed_size': 10 * 1024 * 1024, 'state_size': 10 * 1024 * 1024,
+                'external_path': f'file:/tmp/fake-checkpoints/{self.jid}/chk-{checkpoint_id}'
+            })
+        latest = {'completed': history[0] if history else None, 'savepoint': None}
+        return {'counts': {'completed': completed, 'failed': 0, 'in_progress': 0},
+                'latest': latest, 'history': history}
+
+
+class FakeFlinkCluster:
+    """模拟集群的状态，所有方法线程安全"""
+
+    def __init__(self, scenario: Optional[Dict] = None):
+        scenario = scenario or {}
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.jobs: Dict[str, FakeJob] = {}
+        self.transitions: List[Dict] = sorted(scenario.get('transitions', []), key=lambda t: t['at'])
+        self.latency = scenario.get('latency', {})
+        self.errors = scenario.get('errors', [])
+        self.recorded: Dict[str, object] = {}
+        self.request_counts: Dict[str, int] = {}
+        self.alerts: List[Dict] = []
+        self.savepoints: Dict[str, Dict] = {}
+        self.random = random.Random(scenario.get('seed', 0))
+
+        jobs = scenario.get('jobs', {})
+        for i in range(jobs.get('count', 0)):
+            self.add_job(FakeJob(f"{jobs.get('name_prefix', 'bench_job_')}{i:04d}",
+                                 state=jobs.get('state', 'RUNNING'), vertices=jobs.get('vertices', 3)))
+        for job in jobs.get('extra', []):
+            self.add_job(FakeJob(job['name'], jid=job.get('jid'), state=job.get('state', 'RUNNING'),
+                                 vertices=job.get('vertices', jobs.get('vertices', 3)), lag=job.get('lag', 0)))
+        if scenario.get('recorded'):
+            with open(scenario['recorded'], 'r', encoding='utf-8') as f:
+                self.recorded = json.load(f)
+
+    def add_job(self, job: FakeJob):
+        with self.lock:
+            self.jobs[job.jid] = job
+
+    def find_job(self, name_or_id: str) -> Optional[FakeJob]:
+        job = self.jobs.get(name_or_id)
+        if job:
+            return job
+        matches = [j for j in self.jobs.values() if j.name == name_or_id and j.state not in ('FAILED', 'CANCELED', 'FINISHED')]
+        return matches[0] if matches else next((j for j in self.jobs.values() if j.name == name_or_id), None)
+
+    def set_state(self, name_or_id: str, state: str) -> bool:
+        with self.lock:
+            job = self.find_job(name_or_id)
+            if not job:
+                return False
+            if state == 'RUNNING' and job.state != 'RUNNING':
+                job.start_time = int(time.time() * 1000)
+            if state == 'RESTARTING':
+                job.num_restarts += 1
+            logger.info(f"作业 {job.name} 状态: {job.state} -> {state}")
+            job.state = state
+            return True
+
+    def apply_transitions(self):
+        """执行已到时间的状态切换"""
+        elapsed = time.time() - self.started
+        while self.transitions and self.transitions[0]['at'] <= elapsed:
+            transition = self.transitions.pop(0)
+            self.set_state(transition['job'], transition['state'])
+
+    def delay_seconds(self, endpoint: str) -> float:
+        base = self.latency.get('endpoints', {}).get(endpoint, self.latency.get('default_ms', 0))
+        return (base + self.random.uniform(0, self.latency.get('jitter_ms', 0))) / 1000
+
+    def injected_error(self, endpoint: str) -> Optional[int]:
+        for error in self.errors:
+            if error.get('endpoint', endpoint) == endpoint and self.random.random() < error.get('rate', 0):
+                return error.get('status', 500)
+        return None
+
+    def count(self, endpoint: str):
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {'requests_total': sum(self.request_counts.values()), 'by_endpoint': dict(self.request_counts),
+                    'alerts': len(self.alerts), 'jobs': len(self.jobs)}
+
+    def reset_stats(self):
+        with self.lock:
+            self.request_counts.clear()
+            self.alerts.clear()
+
+    # ---------------- Flink REST接口 ----------------
+
+    def handle_get(self, path: str, query: Dict) -> Tuple[int, object]:
+        if path in self.recorded:
+            return 200, self.recorded[path]
+        parts = path.strip('/').split('/')
+        with self.lock:
+            if path == '/overview':
+                running = sum(1 for j in self.jobs.values() if j.state == 'RUNNING')
+                return 200, {'taskmanagers': 1, 'slots-total': 1000, 'slots-available': 1000 - running,
+                             'jobs-running': running, 'flink-version': '1.17.2'}
+            if path == '/jobs/overview':
+                return 200, {'jobs': [job.overview() for job in self.jobs.values()]}
+            if path == '/jobs':
+                return 200, {'jobs': [{'id': job.jid, 'status': job.state} for job in self.jobs.values()]}
+            if len(parts) < 2 or parts[0] != 'jobs' or parts[1] not in self.jobs:
+                return 404, {'errors': ['Not Found']}
+            job = self.jobs[parts[1]]
+            rest = parts[2:]
+            if not rest:
+                return 200, job.details()
+            if rest == ['checkpoints']:
+                return 200, job.checkpoints()
+            if rest == ['checkpoints', 'config']:
+                return 200, {'mode': 'exactly_once', 'interval': job.checkpoint_interval * 1000, 'timeout': 600000}
+            if rest[0] == 'checkpoints' and len(rest) == 5 and rest[1] == 'details':
+                return 200, {'id': int(rest[2]), 'status': 'COMPLETED',
+                             'summary': {'alignment': {'duration': {'max': 0}}}}
+            if rest == ['metrics']:
+                return 200, self.metric_values({'numRestarts': job.num_restarts}, query)
+            if rest[0] == 'savepoints' and len(rest) == 2:
+                savepoint = self.savepoints.get(rest[1])
+                return (200, savepoint) if savepoint else (404, {'errors': ['Not Found']})
+            if rest[0] == 'vertices' and len(rest) >= 3:
+                vertex = next((v for v in job.vertices if v['id'] == rest[1]), None)
+                if vertex is None:
+                    return 404, {'errors': ['Not Found']}
+                is_source = vertex['name'].startswith('Source')
+                if rest[2] == 'backpressure':
+                    return 200, {'status': 'ok', 'backpressureLevel': 'ok', 'end-timestamp': int(time.time() * 1000),
+                                 'subtasks': [{'subtask': 0, 'ratio': 0.0, 'backpressureLevel': 'ok'}]}
+                if rest[2] == 'watermarks':
+                    value = NO_WATERMARK if is_source else int((time.time() - 5) * 1000)
+                    return 200, [{'id': '0.currentInputWatermark', 'value': str(value)}]
+                if rest[2] == 'metrics':
+                    values = {}
+                    if is_source:
+                        values = {'0.Source__kafka_source.pendingRecords': job.lag,
+                                  '0.Source__kafka_source.KafkaSourceReader.KafkaConsumer.records-lag-max': job.lag}
+                    return 200, self.metric_values(values, query)
+        return 404, {'errors': ['Not Found']}
+
+    @staticmethod
+    def metric_values(values: Dict[str, float], query: Dict):
+        """Flink指标接口: 不带get参数时列出指标名称，带get参数时返回取值"""
+        if 'get' not in query:
+            return [{'id': name} for name in values]
+        names = query['get'][0].split(',')
+        return [{'id': name, 'value': str(values[name])} for name in names if name in values]
+
+    def handle_patch(self, path: str, query: Dict) -> Tuple[int, object]:
+        parts = path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'jobs' and parts[1] in self.jobs:
+            self.set_state(parts[1], 'CANCELED')
+            return 202, {}
+        return 404, {'errors': ['Not Found']}
+
+    def handle_post(self, path: str, body: Dict) -> Tuple[int, object]:
+        parts = path.strip('/').split('/')
+        if path == '/_fake/webhook':
+            with self.lock:
+                self.alerts.append(body)
+            return 200, {'code': 0, 'msg': 'success'}
+        if path == '/_fake/jobs':
+            job = FakeJob(body['name'], jid=body.get('jid'), state=body.get('state', 'RUNNING'),
+                          vertices=body.get('vertices', 3), lag=body.get('lag', 0))
+            self.add_job(job)
+            return 200, {'jid': job.jid}
+        if path == '/_fake/reset':
+            self.reset_stats()
+            return 200, {}
+        if len(parts) == 4 and parts[:2] == ['_fake', 'jobs'] and parts[3] == 'state':
+            return (200, {}) if self.set_state(parts[2], body.get('state', 'RUNNING')) else (404, {})
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'stop' and parts[1] in self.jobs:
+            request_id = make_id('savepoint', parts[1], time.time())
+            location = f"{body.get('targetDirectory', 'file:/tmp/fake-savepoints')}/savepoint-{parts[1][:6]}"
+            with self.lock:
+                self.savepoints[request_id] = {'status': {'id': 'COMPLETED'}, 'operation': {'location': location}}
+            self.set_state(parts[1], 'FINISHED')
+            return 202, {'request-id': request_id}
+        return 404, {'errors': ['Not Found']}
+
+
+class FakeFlinkServer:
+    """在后台线程中运行的模拟Flink REST服务"""
+
+    def __init__(self, cluster: FakeFlinkCluster, host: str = '127.0.0.1', port: int = 0):
+        self.cluster = cluster
+        self.httpd = ThreadingHTTPServer((host, port), self.make_handler(cluster))
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def make_handler(cluster: FakeFlinkCluster):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # keep-alive连接上头部和内容分两次写出，关闭Nagle避免每个请求多等待40ms的延迟确认
+            disable_nagle_algorithm = True
+
+            def reply(self, status: int, body):
+                data = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def dispatch(self, method: str):
+                parsed = urlparse(self.path)
+                if parsed.path == '/_fake/stats':
+                    return self.reply(200, cluster.stats())
+                if parsed.path == '/_fake/alerts':
+                    return self.reply(200, cluster.alerts)
+                body = {}
+                if method in ('POST', 'PATCH'):
+                    length = int(self.headers.get('Content-Length') or 0)
+                    raw = self.rfile.read(length) if length else b''
+                    try:
+                        body = json.loads(raw) if raw else {}
+                    except ValueError:
+                        body = {}
+                if parsed.path.startswith('/_fake/'):
+                    return self.reply(*cluster.handle_post(parsed.path, body))
+
+                endpoint = normalize_path(parsed.path)
+                cluster.count(endpoint)
+                cluster.apply_transitions()
+                delay = cluster.delay_seconds(endpoint)
+                if delay > 0:
+                    time.sleep(delay)
+                error = cluster.injected_error(endpoint)
+                if error:
+                    return self.reply(error, {'errors': ['injected error']})
+                query = parse_qs(parsed.query)
+                if method == 'GET':
+                    return self.reply(*cluster.handle_get(parsed.path, query))
+                if method == 'PATCH':
+                    return self.reply(*cluster.handle_patch(parsed.path, query))
+                return self.reply(*cluster.handle_post(parsed.path, body))
+
+            def do_GET(self):
+                self.dispatch('GET')
+
+            def do_POST(self):
+                self.dispatch('POST')
+
+            def do_PATCH(self):
+                self.dispatch('PATCH')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeFlinkServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-flink', daemon=True)
+        self.thread.start()
+        logger.info(f"模拟Flink REST服务已启动: {self.url}，作业{len(self.cluster.jobs)}个")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def record_responses(rest_url: str, output: str, max_jobs: int = 20):
+    """从真实集群录制GET响应，供场景文件的 recorded 回放"""
+    rest_url = rest_url.rstrip('/')
+    http = requests.Session()
+    recorded = {}
+
+    def fetch(path: str):
+        try:
+            response = http.get(f"{rest_url}{path}", timeout=10)
+            if response.status_code == 200:
+                recorded[path] = response.json()
+                return recorded[path]
+            logger.warning(f"录制 {path} 失败: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"录制 {path} 异常: {str(e)}")
+        return None
+
+    fetch('/overview')
+    overview = fetch('/jobs/overview') or {}
+    for job in overview.get('jobs', [])[:max_jobs]:
+        job_id = job['jid']
+        details = fetch(f"/jobs/{job_id}") or {}
+        for path in ('checkpoints', 'checkpoints/config', 'metrics'):
+            fetch(f"/jobs/{job_id}/{path}")
+        for vertex in details.get('vertices', []):
+            for path in ('backpressure', 'watermarks', 'metrics'):
+                fetch(f"/jobs/{job_id}/vertices/{vertex['id']}/{path}")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(recorded, f, ensure_ascii=False, indent=2)
+    logger.info(f"已录制{len(recorded)}个响应: {output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) > 1 and sys.argv[1] == 'record':
+        parser = argparse.ArgumentParser(description='从真实Flink集群录制REST响应')
+        parser.add_argument('command')
+        parser.add_argument('--from', dest='rest_url', default='http://localhost:8081', help='Flink REST地址')
+        parser.add_argument('--out', default='recorded_responses.json', help='输出文件')
+        parser.add_argument('--max-jobs', type=int, default=20, help='最多录制的作业数')
+        args = parser.parse_args()
+        record_responses(args.rest_url, args.out, args.max_jobs)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description='模拟Flink REST服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18081)
+    parser.add_argument('--scenario', help='场景文件(YAML)')
+    parser.add_argument('--jobs', type=int, help='生成的作业数（覆盖场景文件中的jobs.count）')
+    parser.add_argument('--latency-ms', type=float, help='每个请求的固定延迟（覆盖场景文件）')
+    args = parser.parse_args()
+
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario, 'r', encoding='utf-8') as f:
+            scenario = yaml.safe_load(f) or {}
+    if args.jobs is not None:
+        scenario.setdefault('jobs', {})['count'] = args.jobs
+    if args.latency_ms is not None:
+        scenario.setdefault('latency', {})['default_ms'] = args.latency_ms
+
+    server = FakeFlinkServer(FakeFlinkCluster(scenario), args.host, args.port).start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
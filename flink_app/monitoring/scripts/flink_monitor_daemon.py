@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多集群Flink作业监控守护进程
+============================
+
+一个进程、一个asyncio事件循环同时监控多个Flink集群上的多个作业，
+集群和作业列表来自 configs/environments/{env}.yaml 的 monitoring 配置，
+新增作业只需要在配置中追加一项，不再为每个作业启动一个监控进程。
+
+- 每个集群每轮只请求 /overview 和 /jobs/overview，按作业名称(pipeline.name)匹配配置的作业
+- 每个集群独立限制并发请求数和请求间隔，一个集群响应慢不影响其他集群
+- 作业缺失、状态异常、集群不可达连续达到 max_failures 次后报警，恢复后发送恢复通知
+
+使用示例:
+python3 flink_monitor_daemon.py --env prod
+python3 flink_monitor_daemon.py --env prod --env test
+"""
+
+import os
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import requests
+import yaml
+from requests.adapters import HTTPAdapter
+
+# 共享组件目录 flink_app/common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from lark_alert import AlertDispatcher
+from metrics_exporter import MetricsRegistry, start_metrics_server
+from adaptive_poll import RequestBudget, FAST_STATES
+
+# 环境配置目录 flink_app/configs/environments
+ENVIRONMENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'configs', 'environments')
+
+TERMINAL_STATES = {'FINISHED', 'FAILED', 'CANCELED'}
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ClusterConfig:
+    """被监控的Flink集群"""
+    name: str
+    rest_url: str
+    max_concurrent_requests: int = 4
+    min_request_interval: float = 0.2
+    check_interval: int = 60
+    fast_check_interval: int = 2
+    max_requests_per_minute: int = 120
+
+
+@dataclass
+class MonitoredJob:
+    """需要保持运行的作业（按pipeline.name匹配）"""
+    name: str
+    cluster: str
+    project: str = ''
+
+
+class ClusterClient:
+    """单个集群的REST客户端: keep-alive连接池 + 并发数限制 + 请求间隔限制"""
+
+    def __init__(self, config: ClusterConfig, request_timeout: int = 10, metrics: Optional[MetricsRegistry] = None):
+        self.config = config
+        self.metrics = metrics or MetricsRegistry()
+        self.metric_latency = self.metrics.histogram('flink_monitor_rest_request_duration_seconds',
+                                                     '监控请求Flink REST API的耗时', ['cluster', 'endpoint'])
+        self.request_timeout = request_timeout
+        self.http = requests.Session()
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=config.max_concurrent_requests))
+        self.semaphore = asyncio.Semaphore(config.max_concurrent_requests)
+        self._interval_lock = asyncio.Lock()
+        self._last_request = 0.0
+        self.budget = RequestBudget(config.max_requests_per_minute)
+
+    async def get(self, path: str) -> Optional[Dict]:
+        """GET请求，失败返回None（requests为阻塞调用，在线程池中执行）"""
+        async with self.semaphore:
+            await asyncio.to_thread(self.budget.acquire)
+            async with self._interval_lock:
+                wait = self._last_request + self.config.min_request_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_request = time.monotonic()
+            try:
+                started = time.monotonic()
+                response = await asyncio.to_thread(
+                    self.http.get, f"{self.config.rest_url}{path}", timeout=self.request_timeout
+                )
+                self.metric_latency.observe(time.monotonic() - started, cluster=self.config.name,
+                                            endpoint=path.split('?', 1)[0])
+                if response.status_code == 200:
+                    return response.json()
+                logger.error(f"[{self.config.name}] GET {path} 失败: {response.status_code}")
+            except Exception as e:
+                logger.error(f"[{self.config.name}] GET {path} 异常: {str(e)}")
+            return None
+
+
+class FlinkMonitorDaemon:
+    """多集群、多作业监控守护进程"""
+
+    def __init__(self, envs: List[str], metrics_port: Optional[int] = None):
+        """
+        初始化监控守护进程
+
+        Args:
+            envs: 环境名称列表 (prod, test, dev)，合并各环境monitoring配置中的集群和作业
+            metrics_port: Prometheus指标端口，设置后在 /metrics 上提供集群和作业状态
+        """
+        self.clusters: Dict[str, ClusterConfig] = {}
+        self.jobs: List[MonitoredJob] = []
+        self.webhook_url = None
+        self.max_failures = 3
+        for env in envs:
+            self.load_env(env)
+
+        # 每个集群的作业表和连续失败计数
+        self.job_tables: Dict[str, Dict[str, Dict]] = {name: {} for name in self.clusters}
+        self.failures: Dict[str, int] = {}
+        self.alerted: set = set()
+
+        # Prometheus指标
+        self.metrics_port = metrics_port
+        self.metrics = MetricsRegistry()
+        self.metric_cluster_up = self.metrics.gauge('flink_cluster_up', 'Flink集群是否可访问且有可用的TaskManager',
+                                                    ['cluster'])
+        self.metric_job_running = self.metrics.gauge('flink_job_running', '配置的作业是否有RUNNING实例',
+                                                     ['cluster', 'job'])
+        self.metric_job_uptime = self.metrics.gauge('flink_job_uptime_seconds', '作业RUNNING实例的运行时长',
+                                                    ['cluster', 'job'])
+
+    def load_env(self, env: str):
+        """加载一个环境的monitoring配置"""
+        with open(os.path.join(ENVIRONMENTS_DIR, f'{env}.yaml'), 'r', encoding='utf-8') as f:
+            monitoring = (yaml.safe_load(f) or {}).get('monitoring', {})
+        self.webhook_url = self.webhook_url or monitoring.get('webhook_url')
+        self.max_failures = monitoring.get('max_failures', self.max_failures)
+        check_interval = monitoring.get('check_interval', 60)
+
+        for cluster in monitoring.get('clusters', []):
+            if cluster['name'] in self.clusters:
+                continue
+            self.clusters[cluster['name']] = ClusterConfig(
+                name=cluster['name'],
+                rest_url=cluster['rest_url'].rstrip('/'),
+                max_concurrent_requests=cluster.get('max_concurrent_requests', 4),
+                min_request_interval=cluster.get('min_request_interval', 0.2),
+                check_interval=cluster.get('check_interval', check_interval),
+                fast_check_interval=cluster.get('fast_check_interval', 2),
+                max_requests_per_minute=cluster.get('max_requests_per_minute', 120)
+            )
+        for job in monitoring.get('jobs', []):
+            if job['cluster'] not in self.clusters:
+                logger.error(f"作业 {job['name']} 配置的集群 {job['cluster']} 不存在，跳过")
+                continue
+            self.jobs.append(MonitoredJob(name=job['name'], cluster=job['cluster'], project=job.get('project', '')))
+        logger.info(f"已加载环境 {env}: 集群{len(self.clusters)}个, 作业{len(self.jobs)}个")
+
+    def send_alert(self, title: str, message: str, is_error: bool = True, dedup_key: Optional[str] = None):
+        """告警入队，由后台线程发送（所有集群和作业共用同一个飞书机器人），不阻塞事件循环"""
+        if self.webhook_url:
+            AlertDispatcher.shared(self.webhook_url).send(title, message, is_error, dedup_key)
+
+    def record_check(self, key: str, ok: bool, title: str, message: str, recovered_message: str):
+        """
+        记录一次检查结果: 连续失败达到max_failures次时报警一次，恢复后发送恢复通知
+        """
+        if ok:
+            self.failures[key] = 0
+            if key in self.alerted:
+                self.alerted.discard(key)
+                self.send_alert(f"{title}已恢复", recovered_message, is_error=False, dedup_key=f"{key}:recovered")
+            return
+        self.failures[key] = self.failures.get(key, 0) + 1
+        if self.failures[key] >= self.max_failures and key not in self.alerted:
+            self.alerted.add(key)
+            self.send_alert(title, f"{message}（连续{self.failures[key]}次）", dedup_key=key)
+
+    async def check_cluster(self, client: ClusterClient) -> bool:
+        """
+        检查一个集群及其上配置的所有作业
+
+        Returns:
+            是否有配置的作业处于RESTARTING/INITIALIZING等过渡状态（需要秒级轮询）
+        """
+        name = client.config.name
+        overview, jobs_overview = await asyncio.gather(client.get('/overview'), client.get('/jobs/overview'))
+        cluster_ok = overview is not None and jobs_overview is not None and overview.get('taskmanagers', 0) > 0
+        self.metric_cluster_up.set(1 if cluster_ok else 0, cluster=name)
+        self.record_check(
+            f"cluster:{name}", cluster_ok, "Flink集群异常",
+            f"集群 {name} ({client.config.rest_url}) 不可访问或没有可用的TaskManager",
+            f"集群 {name} 已恢复"
+        )
+        if jobs_overview is None:
+            return False
+
+        snapshot = {
+            job['jid']: {'name': job['name'], 'state': job['state'], 'start_time': job.get('start-time')}
+            for job in jobs_overview.get('jobs', [])
+        }
+        previous = self.job_tables[name]
+        self.job_tables[name] = snapshot
+        for job_id, job in snapshot.items():
+            old = previous.get(job_id)
+            if old and old['state'] != job['state']:
+                logger.info(f"[{name}] 作业 {job['name']}({job_id}) 状态变化: {old['state']} -> {job['state']}")
+
+        transitioning = False
+        for job in (j for j in self.jobs if j.cluster == name):
+            instances = [(job_id, j) for job_id, j in snapshot.items() if j['name'] == job.name]
+            active = [(job_id, j) for job_id, j in instances if j['state'] not in TERMINAL_STATES]
+            running = [job_id for job_id, j in active if j['state'] == 'RUNNING']
+            transitioning = transitioning or any(j['state'] in FAST_STATES for _, j in active)
+            self.metric_job_running.set(1 if running else 0, cluster=name, job=job.name)
+            start_times = [snapshot[job_id].get('start_time') or 0 for job_id in running]
+            self.metric_job_uptime.set(max(time.time() - max(start_times) / 1000, 0) if running else 0,
+                                       cluster=name, job=job.name)
+            if active and not running:
+                detail = f"状态: {', '.join(j['state'] for _, j in active)}"
+            elif instances and not active:
+                latest = max(instances, key=lambda item: item[1].get('start_time') or 0)
+                detail = f"最近一次运行已结束，状态: {latest[1]['state']}"
+            else:
+                detail = "集群中没有该作业"
+            self.record_check(
+                f"job:{name}:{job.name}", bool(running), "Flink作业异常",
+                f"[{job.project or name}] 作业 {job.name} 未在运行，{detail}",
+                f"[{job.project or name}] 作业 {job.name} 已恢复运行 ({', '.join(running)})"
+            )
+        return transitioning
+
+    async def cluster_loop(self, config: ClusterConfig):
+        """单个集群的监控循环: 有作业处于过渡状态时按秒级间隔轮询，否则按集群自己的检查间隔"""
+        client = ClusterClient(config, metrics=self.metrics)
+        while True:
+            started = time.monotonic()
+            interval = config.check_interval
+            try:
+                if await self.check_cluster(client):
+                    interval = config.fast_check_interval
+            except Exception as e:
+                logger.error(f"[{config.name}] 监控过程中发生异常: {str(e)}")
+            await asyncio.sleep(max(interval - (time.monotonic() - started), 0))
+
+    async def run(self):
+        """并发监控所有集群"""
+        logger.info(f"开始监控: {', '.join(f'{c.name}({c.rest_url})' for c in self.clusters.values())}")
+        if self.metrics_port:
+            start_metrics_server(self.metrics, self.metrics_port)
+        await asyncio.gather(*(self.cluster_loop(config) for config in self.clusters.values()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多集群Flink作业监控守护进程')
+    parser.add_argument('--env', action='append', choices=['prod', 'test', 'dev'],
+                        help='加载的环境配置，可重复指定，默认prod')
+    parser.add_argument('--metrics-port', type=int, default=9261, help='Prometheus指标端口，0表示不提供')
+    parser.add_argument('--log-file', default='/home/ubuntu/work/script/flink_monitor_daemon.log', help='日志文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(args.log_file),
+            logging.StreamHandler()
+        ]
+    )
+
+    daemon = FlinkMonitorDaemon(args.env or ['prod'], metrics_port=args.metrics_port or None)
+    try:
+        asyncio.run(daemon.run())
+    except KeyboardInterrupt:
+        logger.info("监控程序被手动停止")
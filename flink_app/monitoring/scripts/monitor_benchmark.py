@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控脚本压测
+============
+
+在模拟Flink REST服务（fake_flink_server.py，独立子进程）上运行监控，
+测量作业数增加时每轮检查的耗时、请求数和内存:
+- flink_monitor: FlinkMonitor.run_cycle()，所有作业加入作业注册表。
+  第一轮所有作业都到期做健康检查（冷启动），之后几轮只轮询作业概览（稳定状态）
+- user_interests: UserInterestsMonitor.run_monitor()，单个作业的一次检查，作业数只影响集群规模
+
+告警发往模拟服务的 /_fake/webhook，不会发到飞书。监控的状态文件、作业注册表和状态历史写入临时目录，
+不影响正在运行的监控；user_interests不做MySQL/Doris端到端延迟探测（不连接环境配置中的数据库）。
+
+使用示例:
+python3 monitor_benchmark.py --jobs 10 50 100 500
+python3 monitor_benchmark.py --target user_interests --jobs 10 500 --latency-ms 20
+python3 monitor_benchmark.py --jobs 500 --output ../logs/monitor_benchmark.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import argparse
+import tempfile
+import resource
+import importlib
+import subprocess
+import tracemalloc
+from typing import Dict, List
+
+import requests
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FLINK_APP_DIR = os.path.join(SCRIPTS_DIR, '..', '..')
+sys.path.insert(0, os.path.join(FLINK_APP_DIR, 'kafka2doris', 'scripts'))
+sys.path.insert(0, os.path.join(FLINK_APP_DIR, 'mysql2doris', 'scripts'))
+
+logger = logging.getLogger(__name__)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class FakeServerProcess:
+    """在子进程中运行模拟Flink REST服务，服务端的CPU和内存不计入监控"""
+
+    def __init__(self, jobs: int, latency_ms: float, scenario: str = None):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        cmd = [sys.executable, os.path.join(SCRIPTS_DIR, 'fake_flink_server.py'),
+               '--port', str(self.port), '--jobs', str(jobs), '--latency-ms', str(latency_ms)]
+        if scenario:
+            cmd += ['--scenario', scenario]
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def __enter__(self) -> 'FakeServerProcess':
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if requests.get(f"{self.url}/_fake/stats", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                time.sleep(0.1)
+        self.process.kill()
+        raise RuntimeError("模拟Flink REST服务启动超时")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+    def reset(self):
+        requests.post(f"{self.url}/_fake/reset", timeout=5)
+
+    def stats(self) -> Dict:
+        return requests.get(f"{self.url}/_fake/stats", timeout=5).json()
+
+    def add_job(self, name: str, jid: str = None):
+        requests.post(f"{self.url}/_fake/jobs", json={'name': name, 'jid': jid}, timeout=5)
+
+    def job_names(self) -> List[str]:
+        return [job['name'] for job in requests.get(f"{self.url}/jobs/overview", timeout=30).json()['jobs']]
+
+
+def measure(server: FakeServerProcess, run) -> Dict:
+    """执行一次run()，返回耗时、请求数和Python内存峰值"""
+    server.reset()
+    tracemalloc.start()
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = server.stats()
+    return {'seconds': round(elapsed, 3), 'requests': stats['requests_total'],
+            'peak_mb': round(peak / 1024 / 1024, 2), 'by_endpoint': stats['by_endpoint']}
+
+
+def bench_flink_monitor(server: FakeServerProcess, cycles: int, log_file: str) -> Dict:
+    flink_monitor = importlib.import_module('flink_monitor')
+    names = server.job_names()
+    monitor = flink_monitor.FlinkMonitor(
+        flink_rest_url=server.url,
+        webhook_url=f"{server.url}/_fake/webhook",
+        job_registry={name: '/dev/null' for name in names},
+        max_requests_per_minute=10 ** 9,  # 压测不限制请求预算
+        job_id_history_file=os.path.join(tempfile.gettempdir(), 'flink_job_ids_benchmark.json'),
+        log_file=log_file
+    )
+    results = {'cold': measure(server, monitor.run_cycle)}
+    results['steady'] = [measure(server, monitor.run_cycle) for _ in range(cycles)]
+    # 模拟服务退出前发送完剩余的告警
+    monitor.alerts.close()
+    return results
+
+
+def bench_user_interests(server: FakeServerProcess, cycles: int) -> Dict:
+    monitor_module = importlib.import_module('monitor_user_interests')
+    # 指向模拟服务（模块级配置）
+    monitor_module.FLINK_REST_URL = server.url
+    monitor_module.WEBHOOK_URL = f"{server.url}/_fake/webhook"
+    # 状态文件写入临时目录，不混入正在运行的监控的状态
+    state_dir = tempfile.mkdtemp(prefix='user_interests_benchmark_')
+    monitor_module.STATUS_FILE = os.path.join(state_dir, 'user_interests_status.json')
+    monitor_module.REGISTRY_FILE = os.path.join(state_dir, 'job_registry.json')
+    monitor_module.HISTORY_FILE = os.path.join(state_dir, 'user_interests_history.db')
+    # 不连接环境配置中的MySQL/Doris
+    monitor_module.load_freshness_probe = lambda env: None
+    server.add_job(monitor_module.JOB_NAME)
+    monitor = monitor_module.UserInterestsMonitor()
+    results = {'runs': [measure(server, monitor.run_monitor) for _ in range(cycles)]}
+    monitor.alerts.close()
+    shutil.rmtree(state_dir, ignore_errors=True)
+    return results
+
+
+def print_summary(results: List[Dict]):
+    print(f"\n{'作业数':>8} {'阶段':>8} {'耗时(s)':>10} {'请求数':>8} {'内存峰值(MB)':>14}")
+    for result in results:
+        for phase, runs in result['phases'].items():
+            runs = runs if isinstance(runs, list) else [runs]
+            for run in runs:
+                print(f"{result['jobs']:>8} {phase:>8} {run['seconds']:>10.3f} {run['requests']:>8} {run['peak_mb']:>14.2f}")
+    print(f"\n进程最大RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='监控脚本压测')
+    parser.add_argument('--target', choices=['flink_monitor', 'user_interests'], default='flink_monitor')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[10, 50, 100, 500], help='作业数')
+    parser.add_argument('--cycles', type=int, default=3, help='稳定状态测量的轮数')
+    parser.add_argument('--latency-ms', type=float, default=2, help='模拟服务每个请求的延迟')
+    parser.add_argument('--scenario', help='模拟服务的场景文件，作业数由--jobs覆盖')
+    parser.add_argument('--output', help='结果输出JSON文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    log_file = os.path.join(tempfile.gettempdir(), 'flink_monitor_benchmark.log')
+
+    results = []
+    for job_count in args.jobs:
+        with FakeServerProcess(job_count, args.latency_ms, args.scenario) as server:
+            if args.target == 'flink_monitor':
+                phases = bench_flink_monitor(server, args.cycles, log_file)
+            else:
+                phases = bench_user_interests(server, args.cycles)
+        results.append({'target': args.target, 'jobs': job_count, 'latency_ms': args.latency_ms, 'phases': phases})
+        print(f"作业数 {job_count} 完成")
+
+    print_summary(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存: {args.output}")
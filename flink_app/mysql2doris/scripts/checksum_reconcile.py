@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL与Doris分桶校验和对账
+==========================
+
+按主键范围分桶，在MySQL和Doris两侧并行计算每个桶的 行数 + 行哈希之和，
+只对不一致的桶继续细分，桶足够小时逐行比较哈希，输出具体不一致的主键:
+- missing_in_doris: MySQL有、Doris没有
+- extra_in_doris: Doris有、MySQL没有（通常是MySQL物理删除）
+- different: 两侧都有但字段值不同
+
+只比较 cursor_column < 截止时间 的数据，截止时间之后更新的行视为同步中，不计入差异。
+
+使用示例:
+python3 checksum_reconcile.py --env prod --table content_audit_record
+python3 checksum_reconcile.py --env prod --table content_audit_record --buckets 128 --leaf-rows 2000
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pymysql
+
+from mysql_incremental_sync import MySQLIncrementalSync, content_audit_record_table
+
+# 对账结果默认存放在项目logs目录
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs', 'reconcile')
+
+NULL_MARKER = '<NULL>'
+
+logger = logging.getLogger(__name__)
+
+
+class ChecksumReconciler:
+    """按主键范围分桶的MySQL/Doris校验和对账"""
+
+    # 两侧SQL方言差异: 转字符串和转整数的类型名
+    DIALECTS = {
+        'mysql': {'string': 'CHAR', 'integer': 'UNSIGNED'},
+        'doris': {'string': 'STRING', 'integer': 'BIGINT'},
+    }
+
+    def __init__(self, sync: MySQLIncrementalSync, buckets: int = 64, leaf_rows: int = 5000,
+                 max_workers: int = 4, max_keys: int = 10000, columns: Optional[List[str]] = None):
+        """
+        初始化对账器
+
+        Args:
+            sync: 目标表的同步器（提供表定义和连接配置）
+            buckets: 每一层把范围切分成的桶数
+            leaf_rows: 桶内行数不超过该值时逐行比较
+            max_workers: 并行下钻的桶数
+            max_keys: 最多输出的不一致主键数，超过后停止下钻，结果标记为不完整（truncated）
+            columns: 参与哈希的字段，默认表定义中的全部字段
+        """
+        self.sync = sync
+        self.table = sync.table
+        self.buckets = buckets
+        self.leaf_rows = leaf_rows
+        self.max_workers = max_workers
+        self.max_keys = max_keys
+        self.columns = [f for f in self.table.fields if not columns or f['name'] in columns]
+        # 已发现的不一致主键数，所有下钻线程共享
+        self._lock = threading.Lock()
+        self.found_keys = 0
+        self.truncated = False
+
+    def budget_exhausted(self) -> bool:
+        """不一致主键数已达上限时停止下钻"""
+        with self._lock:
+            if self.found_keys < self.max_keys:
+                return False
+            self.truncated = True
+            return True
+
+    def get_connection(self, side: str):
+        """获取MySQL或Doris（FE查询端口）连接"""
+        if side == 'mysql':
+            return self.sync.get_mysql_connection()
+        doris = self.table.doris_config
+        database, table = self.table.target_table.split('.', 1)
+        return pymysql.connect(
+            host=doris['fenodes'].split(',')[0].split(':')[0],
+            port=int(doris.get('query_port', 9030)),
+            user=doris['username'],
+            password=doris['password'],
+            database=database,
+            charset='utf8mb4',
+            connect_timeout=30,
+            read_timeout=600
+        )
+
+    def table_ref(self, side: str) -> str:
+        if side == 'mysql':
+            return f"`{self.table.name}`"
+        return '.'.join(f"`{part}`" for part in self.table.target_table.split('.', 1))
+
+    def column_expr(self, field: Dict, side: str) -> str:
+        """字段转成两侧格式一致的字符串"""
+        name = f"`{field['name']}`"
+        flink_type = field['flink_type'].upper()
+        string_type = self.DIALECTS[side]['string']
+        # SQL带参数执行，pymysql会把%当作占位符，格式串中的%写成%%
+        if flink_type.startswith('TIMESTAMP'):
+            expr = f"DATE_FORMAT({name}, '%%Y-%%m-%%d %%H:%%i:%%s')"
+        elif flink_type == 'DATE':
+            expr = f"DATE_FORMAT({name}, '%%Y-%%m-%%d')"
+        elif flink_type in ('FLOAT', 'DOUBLE'):
+            expr = f"CAST(CAST(ROUND({name}, 6) AS DECIMAL(38, 6)) AS {string_type})"
+        else:
+            expr = f"CAST({name} AS {string_type})"
+        return f"IFNULL({expr}, '{NULL_MARKER}')"
+
+    def hash_exprs(self, side: str) -> Tuple[str, str]:
+        """
+        行哈希: 对所有字段拼接后的MD5取前后两段各32位作为两个独立哈希
+
+        Doris没有CRC32，两侧统一使用MD5
+        """
+        row = f"CONCAT_WS('|', {', '.join(self.column_expr(f, side) for f in self.columns)})"
+        integer_type = self.DIALECTS[side]['integer']
+        return tuple(
+            f"CAST(CONV(SUBSTR(MD5({row}), {start}, 8), 16, 10) AS {integer_type})"
+            for start in (1, 9)
+        )
+
+    def query(self, side: str, sql: str, params: Tuple = ()) -> List[Tuple]:
+        connection = self.get_connection(side)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        finally:
+            connection.close()
+
+    def key_range(self, until: datetime) -> Optional[Tuple[int, int]]:
+        """两侧主键范围的并集"""
+        key, ts = f"`{self.table.key_column}`", f"`{self.table.cursor_column}`"
+        bounds = []
+        for side in ('mysql', 'doris'):
+            rows = self.query(side, f"SELECT MIN({key}), MAX({key}) FROM {self.table_ref(side)} WHERE {ts} < %s",
+                              (until,))
+            if rows and rows[0][0] is not None:
+                bounds.append((int(rows[0][0]), int(rows[0][1])))
+        if not bounds:
+            return None
+        return min(b[0] for b in bounds), max(b[1] for b in bounds)
+
+    def bucket_checksums(self, side: str, low: int, high: int, width: int, until: datetime) -> Dict[int, Tuple]:
+        """[low, high] 按width分桶，返回 桶号 -> (行数, 哈希1之和, 哈希2之和)"""
+        key, ts = f"`{self.table.key_column}`", f"`{self.table.cursor_column}`"
+        h1, h2 = self.hash_exprs(side)
+        sql = (f"SELECT ({key} - %s) DIV %s AS bucket, COUNT(*), SUM({h1}), SUM({h2}) "
+               f"FROM {self.table_ref(side)} WHERE {key} BETWEEN %s AND %s AND {ts} < %s GROUP BY bucket")
+        return {
+            int(bucket): (int(count), int(sum1 or 0), int(sum2 or 0))
+            for bucket, count, sum1, sum2 in self.query(side, sql, (low, width, low, high, until))
+        }
+
+    def row_hashes(self, side: str, low: int, high: int) -> Dict[int, Tuple]:
+        """[low, high] 内逐行哈希，返回 主键 -> (哈希1, 哈希2, cursor_column)"""
+        key, ts = f"`{self.table.key_column}`", f"`{self.table.cursor_column}`"
+        h1, h2 = self.hash_exprs(side)
+        sql = f"SELECT {key}, {h1}, {h2}, {ts} FROM {self.table_ref(side)} WHERE {key} BETWEEN %s AND %s"
+        return {int(row[0]): (int(row[1]), int(row[2]), row[3]) for row in self.query(side, sql, (low, high))}
+
+    def compare_rows(self, low: int, high: int, until: datetime) -> Dict[str, List[int]]:
+        """逐行比较，截止时间之后更新的行（任一侧）视为同步中，不计入差异"""
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            mysql_future = executor.submit(self.row_hashes, 'mysql', low, high)
+            doris_rows = self.row_hashes('doris', low, high)
+            mysql_rows = mysql_future.result()
+
+        def in_flight(row: Optional[Tuple]) -> bool:
+            return row is not None and row[2] is not None and row[2] >= until
+
+        result = {'missing_in_doris': [], 'extra_in_doris': [], 'different': []}
+        for key in sorted(set(mysql_rows) | set(doris_rows)):
+            mysql_row, doris_row = mysql_rows.get(key), doris_rows.get(key)
+            if in_flight(mysql_row) or in_flight(doris_row):
+                continue
+            if doris_row is None:
+                result['missing_in_doris'].append(key)
+            elif mysql_row is None:
+                result['extra_in_doris'].append(key)
+            elif mysql_row[:2] != doris_row[:2]:
+                result['different'].append(key)
+        return result
+
+    def reconcile_range(self, low: int, high: int, until: datetime, depth: int = 0) -> Dict[str, List[int]]:
+        """对 [low, high] 分桶比较，只对不一致的桶递归下钻"""
+        width = max((high - low) // self.buckets + 1, 1)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            mysql_future = executor.submit(self.bucket_checksums, 'mysql', low, high, width, until)
+            doris_buckets = self.bucket_checksums('doris', low, high, width, until)
+            mysql_buckets = mysql_future.result()
+
+        mismatched = sorted(b for b in set(mysql_buckets) | set(doris_buckets)
+                            if mysql_buckets.get(b) != doris_buckets.get(b))
+        logger.info(f"第{depth}层 [{low}, {high}] 桶宽{width}: {len(mismatched)}/{len(set(mysql_buckets) | set(doris_buckets))}个桶不一致")
+
+        result = {'missing_in_doris': [], 'extra_in_doris': [], 'different': []}
+
+        def row_diff(bucket: int) -> int:
+            """桶内两侧行数之差，不一致主键数的下限"""
+            return abs(mysql_buckets.get(bucket, (0,))[0] - doris_buckets.get(bucket, (0,))[0])
+
+        def drill(bucket: int) -> Dict[str, List[int]]:
+            # 并行下钻时其他桶可能已经用完主键数上限
+            if self.budget_exhausted():
+                return {}
+            bucket_low = low + bucket * width
+            bucket_high = min(bucket_low + width - 1, high)
+            rows = max(mysql_buckets.get(bucket, (0,))[0], doris_buckets.get(bucket, (0,))[0])
+            if rows <= self.leaf_rows or width == 1:
+                partial = self.compare_rows(bucket_low, bucket_high, until)
+                with self._lock:
+                    self.found_keys += sum(len(keys) for keys in partial.values())
+                return partial
+            return self.reconcile_range(bucket_low, bucket_high, until, depth + 1)
+
+        # 只在最外层并行下钻，避免递归时线程数成倍增长
+        if depth == 0:
+            # 提交前按行数差估算: 大范围缺失（例如整个分区没有写入）时不逐行拉取整个范围
+            selected, estimated = [], 0
+            for bucket in mismatched:
+                if estimated >= self.max_keys:
+                    break
+                selected.append(bucket)
+                estimated += max(row_diff(bucket), 1)
+            if len(selected) < len(mismatched):
+                self.truncated = True
+                logger.warning(f"按行数差估算不一致主键超过{self.max_keys}个，只下钻前{len(selected)}/{len(mismatched)}个桶")
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='reconcile') as executor:
+                partials = executor.map(drill, selected)
+                for partial in partials:
+                    for kind, keys in partial.items():
+                        result[kind].extend(keys)
+        else:
+            for bucket in mismatched:
+                if self.budget_exhausted():
+                    break
+                for kind, keys in drill(bucket).items():
+                    result[kind].extend(keys)
+        if depth == 0 and self.truncated:
+            logger.warning(f"不一致主键超过{self.max_keys}个，已停止下钻，结果不完整")
+        return result
+
+    def run(self, lag_minutes: int = 10, output_dir: str = DEFAULT_OUTPUT_DIR) -> Dict:
+        """执行全表对账，结果写入JSON文件，有差异时发送报警"""
+        until = datetime.now().replace(microsecond=0) - timedelta(minutes=lag_minutes)
+        started = datetime.now()
+        logger.info(f"开始对账: {self.table.name} -> {self.table.target_table}, 截止时间{until}")
+
+        self.found_keys, self.truncated = 0, False
+        key_range = self.key_range(until)
+        if key_range is None:
+            result = {'missing_in_doris': [], 'extra_in_doris': [], 'different': []}
+        else:
+            result = self.reconcile_range(key_range[0], key_range[1], until)
+
+        report = {
+            'table': self.table.name,
+            'target_table': self.table.target_table,
+            'until': until.strftime('%Y-%m-%d %H:%M:%S'),
+            'key_range': key_range,
+            'duration_seconds': round((datetime.now() - started).total_seconds(), 1),
+            'truncated': self.truncated,
+            **{kind: keys[:self.max_keys] for kind, keys in result.items()}
+        }
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"{self.table.name}_{started.strftime('%Y%m%d%H%M%S')}.json")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        counts = {kind: len(result[kind]) for kind in result}
+        message = (f"{self.table.name} -> {self.table.target_table} (截止{report['until']}): "
+                   f"Doris缺失{counts['missing_in_doris']}行, Doris多出{counts['extra_in_doris']}行, "
+                   f"字段不一致{counts['different']}行, 耗时{report['duration_seconds']}秒"
+                   f"{f'（超过{self.max_keys}个主键，已停止下钻，结果不完整）' if self.truncated else ''}\n结果: {output_path}")
+        if any(counts.values()):
+            logger.error(f"对账发现差异: {message}")
+            self.sync.send_alert("MySQL/Doris数据不一致", message)
+        else:
+            logger.info(f"对账一致: {message}")
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MySQL与Doris分桶校验和对账')
+    parser.add_argument('--env', choices=['prod', 'test', 'dev'],
+                        help='从环境配置的incremental_sync.tables加载表定义；不指定时使用content_audit_record默认定义')
+    parser.add_argument('--table', default='content_audit_record', help='对账的源表')
+    parser.add_argument('--buckets', type=int, default=64, help='每一层切分的桶数')
+    parser.add_argument('--leaf-rows', type=int, default=5000, help='桶内行数不超过该值时逐行比较')
+    parser.add_argument('--workers', type=int, default=4, help='并行下钻的桶数')
+    parser.add_argument('--max-keys', type=int, default=10000, help='最多输出的不一致主键数')
+    parser.add_argument('--lag-minutes', type=int, default=10, help='只比较N分钟之前更新的数据')
+    parser.add_argument('--columns', help='参与比较的字段，逗号分隔，默认全部字段')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='对账结果目录')
+    args = parser.parse_args()
+
+    if args.env:
+        from multi_table_sync import MultiTableSyncEngine
+        syncs = MultiTableSyncEngine(env=args.env, table_names=[args.table]).get_syncs()
+        if not syncs:
+            print(f"错误: 环境配置中没有可用的同步表 {args.table}")
+            sys.exit(1)
+        sync = syncs[0]
+    elif args.table == 'content_audit_record':
+        sync = MySQLIncrementalSync(table=content_audit_record_table())
+    else:
+        print("错误: 非默认表需要通过 --env 从环境配置加载表定义")
+        sys.exit(1)
+
+    reconciler = ChecksumReconciler(
+        sync,
+        buckets=args.buckets,
+        leaf_rows=args.leaf_rows,
+        max_workers=args.workers,
+        max_keys=args.max_keys,
+        columns=args.columns.split(',') if args.columns else None
+    )
+    report = reconciler.run(lag_minutes=args.lag_minutes, output_dir=args.output_dir)
+    sys.exit(0 if not any(report[k] for k in ('missing_in_doris', 'extra_in_doris', 'different')) else 1)
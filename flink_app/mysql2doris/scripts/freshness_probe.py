@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL到Doris端到端数据新鲜度探测
+================================
+
+作业状态为RUNNING不代表Doris中的数据是新的。定期对比MySQL源表和Doris目标表:
+- 高水位: 两侧的 MAX(cursor_column)，端到端延迟 = MySQL高水位 - Doris高水位（秒）
+- 行数: 最近 tail_rows 个主键范围内两侧的行数，差值为尚未写入Doris的新增行
+- 源表最近写入时间: information_schema.TABLES.UPDATE_TIME（Source停滞检测使用）
+
+所有查询都有界，不对生产只读实例做全表扫描:
+- MySQL的 MAX(cursor_column) 只在该字段是某个索引的第一列时直接查询（从索引一端读取一行）；
+  没有索引时改为在主键最近 tail_rows 行的范围内查询（只能发现新增行的延迟）
+- 行数按主键范围统计（主键范围扫描，最多 tail_rows 行）
+- Doris的 MAX(cursor_column) 限定在最近 lookback_hours 内，利用分区和ZoneMap裁剪
+两侧查询在两个线程中并发执行，每一侧复用同一个连接（断开后自动重连）。
+
+使用示例:
+    probe = FreshnessProbe(mysql_config, doris_config, 'user_interests',
+                           'xme_dw_ods.xme_ods_user_rds_user_interests_di')
+    result = probe.probe()   # {'delay_seconds': 12.0, 'mysql_rows': 10000, 'doris_rows': 9990, ...}
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+
+def table_ref(name: str) -> str:
+    return '.'.join(f"`{part}`" for part in name.split('.'))
+
+
+class FreshnessProbe:
+    """MySQL源表和Doris目标表的高水位、行数对比"""
+
+    def __init__(self, mysql_config: Dict, doris_config: Dict, source_table: str, target_table: str,
+                 key_column: str = 'id', cursor_column: str = 'updated_at', tail_rows: int = 10000,
+                 lookback_hours: int = 24):
+        """
+        Args:
+            mysql_config: MySQL连接 {'host', 'port', 'user', 'password', 'database'}
+            doris_config: Doris FE查询端口连接 {'host', 'port', 'user', 'password'}
+            source_table: MySQL源表名（mysql_config['database']中）
+            target_table: Doris目标表 database.table
+            key_column: 自增主键字段，两侧行数按该字段的范围统计
+            cursor_column: 更新时间字段，两侧高水位按该字段比较
+            tail_rows: 行数对比和无索引时高水位查询使用的最近主键范围大小
+            lookback_hours: Doris高水位查询的时间范围（小时）
+        """
+        self.configs = {'mysql': mysql_config, 'doris': doris_config}
+        self.database = mysql_config['database']
+        self.source_table = source_table
+        self.source_ref = table_ref(f"{self.database}.{source_table}")
+        self.target_ref = table_ref(target_table)
+        self.key = f"`{key_column}`"
+        self.cursor_column = cursor_column
+        self.cursor = f"`{cursor_column}`"
+        self.tail_rows = tail_rows
+        self.lookback_hours = lookback_hours
+        # 每一侧一个连接，同一侧的查询串行执行
+        self.connections: Dict[str, Optional[pymysql.connections.Connection]] = {'mysql': None, 'doris': None}
+        self.locks = {side: threading.Lock() for side in self.connections}
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='freshness')
+        # cursor_column是否是某个索引的第一列（首次探测时查询）
+        self.cursor_indexed: Optional[bool] = None
+
+    def connect(self, side: str):
+        connection = self.connections[side]
+        if connection is not None:
+            connection.ping(reconnect=True)
+            return connection
+        config = self.configs[side]
+        # autocommit: 不开启长事务，否则可重复读隔离级别下每次查询看到的都是同一个快照
+        connection = pymysql.connect(host=config['host'], port=int(config.get('port', 3306)),
+                                     user=config['user'], password=config['password'], charset='utf8mb4',
+                                     connect_timeout=10, read_timeout=60, autocommit=True)
+        if side == 'mysql':
+            with connection.cursor() as cursor:
+                try:
+                    # MySQL 8默认缓存information_schema统计信息24小时，需要实时的UPDATE_TIME
+                    cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+                except pymysql.MySQLError:
+                    pass
+        self.connections[side] = connection
+        return connection
+
+    def query(self, side: str, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self.locks[side]:
+            try:
+                with self.connect(side).cursor() as cursor:
+                    cursor.execute(sql, params)
+                    return cursor.fetchall()
+            except Exception:
+                # 连接状态未知，下次重新建立
+                self.close_connection(side)
+                raise
+
+    def close_connection(self, side: str):
+        connection, self.connections[side] = self.connections[side], None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def close(self):
+        for side in self.connections:
+            self.close_connection(side)
+        self.executor.shutdown(wait=False)
+
+    def check_cursor_index(self) -> bool:
+        rows = self.query('mysql',
+                          "SELECT COUNT(*) FROM information_schema.STATISTICS "
+                          "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s AND SEQ_IN_INDEX = 1",
+                          (self.database, self.source_table, self.cursor_column))
+        indexed = bool(rows and rows[0][0])
+        if not indexed:
+            logger.warning(f"MySQL源表 {self.source_table}.{self.cursor_column} 没有索引，"
+                           f"高水位只在最近{self.tail_rows}个主键范围内查询")
+        return indexed
+
+    def last_write_time(self) -> Optional[float]:
+        """源表最近一次写入的时间戳（information_schema.TABLES.UPDATE_TIME），查询失败或未知时返回None"""
+        try:
+            rows = self.query('mysql',
+                              "SELECT UNIX_TIMESTAMP(UPDATE_TIME) FROM information_schema.TABLES "
+                              "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                              (self.database, self.source_table))
+            return float(rows[0][0]) if rows and rows[0][0] is not None else None
+        except Exception as e:
+            logger.warning(f"查询MySQL源表写入时间失败: {e}")
+            return None
+
+    def mysql_high_water(self) -> Dict:
+        """MySQL最大主键和高水位"""
+        if self.cursor_indexed is None:
+            self.cursor_indexed = self.check_cursor_index()
+        max_key = self.query('mysql', f"SELECT MAX({self.key}) FROM {self.source_ref}")[0][0]
+        if max_key is None:
+            return {'max_key': None, 'high_water': None}
+        if self.cursor_indexed:
+            high_water = self.query('mysql', f"SELECT MAX({self.cursor}) FROM {self.source_ref}")[0][0]
+        else:
+            high_water = self.query('mysql', f"SELECT MAX({self.cursor}) FROM {self.source_ref} WHERE {self.key} > %s",
+                                    (int(max_key) - self.tail_rows,))[0][0]
+        return {'max_key': int(max_key), 'high_water': high_water}
+
+    def doris_high_water(self):
+        rows = self.query('doris',
+                          f"SELECT MAX({self.cursor}) FROM {self.target_ref} "
+                          f"WHERE {self.cursor} >= DATE_SUB(NOW(), INTERVAL {int(self.lookback_hours)} HOUR)")
+        return rows[0][0] if rows else None
+
+    def count_range(self, side: str, start_key: int, end_key: int) -> int:
+        ref = self.source_ref if side == 'mysql' else self.target_ref
+        rows = self.query(side, f"SELECT COUNT(*) FROM {ref} WHERE {self.key} > %s AND {self.key} <= %s",
+                          (start_key, end_key))
+        return int(rows[0][0])
+
+    def probe(self) -> Dict:
+        """
+        探测一次，两侧查询并发执行
+
+        Returns:
+            {'mysql_high_water', 'doris_high_water', 'delay_seconds', 'key_range', 'mysql_rows', 'doris_rows',
+             'missing_rows', 'probe_seconds', 'cursor_indexed'}，
+            delay_seconds为None表示无法计算（源表为空，或两侧在lookback_hours内都没有数据）
+        """
+        started = time.monotonic()
+        mysql_future = self.executor.submit(self.mysql_high_water)
+        doris_future = self.executor.submit(self.doris_high_water)
+        mysql, doris_high_water = mysql_future.result(), doris_future.result()
+
+        result = {
+            'mysql_high_water': mysql['high_water'].isoformat() if mysql['high_water'] else None,
+            'doris_high_water': doris_high_water.isoformat() if doris_high_water else None,
+            'delay_seconds': None,
+            'cursor_indexed': self.cursor_indexed,
+        }
+        if mysql['high_water'] and doris_high_water:
+            result['delay_seconds'] = max((mysql['high_water'] - doris_high_water).total_seconds(), 0)
+        elif mysql['high_water'] and (time.time() - mysql['high_water'].timestamp()) < self.lookback_hours * 3600:
+            # MySQL最近有写入而Doris在lookback_hours内没有数据: 延迟至少为lookback_hours
+            result['delay_seconds'] = float(self.lookback_hours * 3600)
+
+        if mysql['max_key'] is not None:
+            start_key, end_key = mysql['max_key'] - self.tail_rows, mysql['max_key']
+            mysql_rows = self.executor.submit(self.count_range, 'mysql', start_key, end_key)
+            doris_rows = self.executor.submit(self.count_range, 'doris', start_key, end_key)
+            result.update({
+                'key_range': [start_key, end_key],
+                'mysql_rows': mysql_rows.result(),
+                'doris_rows': doris_rows.result(),
+            })
+            result['missing_rows'] = max(result['mysql_rows'] - result['doris_rows'], 0)
+
+        result['probe_seconds'] = round(time.monotonic() - started, 3)
+        return result
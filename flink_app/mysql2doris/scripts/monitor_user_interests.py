@@ -2,48 +2,207 @@
 # -*- coding: utf-8 -*-
 """
 user_interests表MySQL CDC到Doris同步监控脚本
-作业ID: 275a6f22da1f5bdf896b9341028b2de0
-监控内容: 作业状态、数据同步延迟、错误告警
+作业名称: mysql2doris_user_interests_prod（pipeline.name），当前作业ID通过作业名称注册表解析，
+作业重启或重新提交后自动跟踪新的作业ID，历史作业ID记录在 logs/job_registry.json
+监控内容: 作业状态、数据同步延迟、吞吐量、错误告警
+- 吞吐量: 每个顶点累计读写计数的环形缓冲区，按差值计算条/秒和字节/秒，写入状态文件和告警
+- Source停滞: Source持续 --stall-minutes 没有输出而MySQL源表仍有写入时告警
+  （源表写入时间来自information_schema.TABLES.UPDATE_TIME，不扫描源表）
+- 端到端延迟: 每 --freshness-interval 秒对比MySQL源表和Doris目标表的 MAX(updated_at) 和最近主键范围的行数
+  （freshness_probe.py），延迟超过 --max-delay-minutes 时告警
+- Source停滞和端到端延迟需要pymysql和PyYAML，连接配置来自环境配置（--env）
+- 守护进程在 --metrics-port 上提供Prometheus指标（端到端延迟、未同步行数、吞吐量、作业状态）
+- 每次检查的数值追加到状态历史库 logs/user_interests_history.db（common/status_history.py），
+  原始采样保留 --history-days 天，并降采样为1分钟/1小时汇总，用 status_history.py summary/query 查询
+
+运行方式:
+- 单次检查（cron调用，默认）: python3 monitor_user_interests.py
+- 守护进程: python3 monitor_user_interests.py --daemon
+    - 状态保存在内存中，作业状态变化时立即、其他时候按 --snapshot-interval 写入状态文件（原子替换）
+    - 复用HTTP连接，检查间隔按作业状态自适应（过渡状态按秒级，稳定运行时逐步放宽到 --max-interval）
+    - 跨天运行时日志自动切换到当天的 user_interests_monitor_YYYYMMDD.log
+    - 收到SIGTERM/SIGINT后保存状态、发送完剩余告警再退出
 """
 
 import requests
 import json
 import time
+import signal
 import logging
+import argparse
 import datetime
+import tempfile
+import threading
 import os
 import sys
 
-# 日志配置
+from requests.adapters import HTTPAdapter
+
+try:
+    import yaml
+    from freshness_probe import FreshnessProbe
+except ImportError:
+    # 源表和Doris查询的可选依赖（pymysql、PyYAML），未安装时只检查作业状态和吞吐量
+    FreshnessProbe = None
+
+# 共享组件目录 flink_app/common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from lark_alert import AlertDispatcher
+from adaptive_poll import AdaptivePoller
+from flink_health import ThroughputTrend, format_rate
+from metrics_exporter import MetricsRegistry, start_metrics_server
+from job_registry import JobRegistry, TERMINAL_STATES
+from status_history import StatusHistory
+
+# 日志目录
 log_dir = os.path.join(os.path.dirname(__file__), '..', 'logs')
 os.makedirs(log_dir, exist_ok=True)
 
-# 按天切割日志
-log_file = os.path.join(log_dir, f"user_interests_monitor_{datetime.datetime.now().strftime('%Y%m%d')}.log")
+logger = logging.getLogger(__name__)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file, encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 
-logger = logging.getLogger(__name__)
+class DailyFileHandler(logging.FileHandler):
+    """按天切割日志: 写入当天的 {prefix}_YYYYMMDD.log，守护进程跨天后切换到新文件"""
+
+    def __init__(self, directory, prefix):
+        self.directory = directory
+        self.prefix = prefix
+        self.day = datetime.date.today().strftime('%Y%m%d')
+        super().__init__(self.path_for(self.day), encoding='utf-8')
+
+    def path_for(self, day):
+        return os.path.join(self.directory, f"{self.prefix}_{day}.log")
+
+    def emit(self, record):
+        day = datetime.date.today().strftime('%Y%m%d')
+        if day != self.day:
+            self.day = day
+            if self.stream:
+                self.stream.close()
+                self.stream = None
+            self.baseFilename = os.path.abspath(self.path_for(day))
+        super().emit(record)
+
+
+def setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            DailyFileHandler(log_dir, 'user_interests_monitor'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
 
 # 配置参数
 FLINK_REST_URL = "http://localhost:8081"
-JOB_ID = "275a6f22da1f5bdf896b9341028b2de0"
-JOB_NAME = "user_interests_mysql_cdc"
+JOB_NAME = "mysql2doris_user_interests_prod"
 WEBHOOK_URL = "https://open.larksuite.com/open-apis/bot/v2/hook/3bb8fac6-6a02-498e-804f-48b1b38a6089"
 
 # 状态文件
 STATUS_FILE = os.path.join(log_dir, "user_interests_status.json")
+# 作业名称注册表（作业ID历史和跨实例连续的计数）
+REGISTRY_FILE = os.path.join(log_dir, "job_registry.json")
+# 状态历史（每次检查的吞吐量、延迟等数值，带降采样）
+HISTORY_FILE = os.path.join(log_dir, "user_interests_history.db")
+
+# 环境配置目录 flink_app/configs/environments
+# MySQL源表连接使用 sources.mysql.user_interests，Doris使用 sinks.doris
+ENVIRONMENTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'configs', 'environments')
+SOURCE_TABLE = "user_interests"
+TARGET_TABLE = "xme_dw_ods.xme_ods_user_rds_user_interests_di"
+
+
+def load_freshness_probe(env='prod'):
+    """按环境配置创建MySQL/Doris新鲜度探测"""
+    with open(os.path.join(ENVIRONMENTS_DIR, f'{env}.yaml'), 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    mysql = config['sources']['mysql']['user_interests']
+    doris = config['sinks']['doris']
+    return FreshnessProbe(
+        mysql_config={'host': mysql['host'], 'port': mysql.get('port', 3306), 'user': mysql['username'],
+                      'password': mysql['password'], 'database': mysql['database']},
+        doris_config={'host': doris['fenodes'].split(',')[0].split(':')[0], 'port': doris.get('query_port', 9030),
+                      'user': doris['username'], 'password': doris['password']},
+        source_table=SOURCE_TABLE,
+        target_table=TARGET_TABLE
+    )
+
+def build_card_payload(alerts):
+    """飞书卡片消息，多条告警合并到同一张卡片"""
+    is_error = any(alert.is_error for alert in alerts)
+    messages = '\n'.join(f"**消息**: {alert.text()}" for alert in alerts)
+    return {
+        "msg_type": "interactive",
+        "card": {
+            "config": {"wide_screen_mode": True},
+            "header": {
+                "title": {
+                    "tag": "plain_text",
+                    "content": f"🔍 user_interests CDC监控 {'❌' if is_error else '✅'}"
+                },
+                "template": "red" if is_error else "green"
+            },
+            "elements": [
+                {
+                    "tag": "div",
+                    "text": {
+                        "tag": "lark_md",
+                        "content": f"**作业**: {JOB_NAME}\n**时间**: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n{messages}"
+                    }
+                }
+            ]
+        }
+    }
 
 class UserInterestsMonitor:
-    def __init__(self):
+    def __init__(self, fast_interval=5, check_interval=60, max_interval=180, stall_minutes=10, env='prod',
+                 freshness_interval=300, max_delay_minutes=15, history_days=7):
+        """
+        Args:
+            fast_interval: 守护进程中作业处于过渡状态（RESTARTING等）时的检查间隔（秒）
+            check_interval: 守护进程的基础检查间隔（秒）
+            max_interval: 守护进程中作业稳定运行时的最大检查间隔（秒）
+            stall_minutes: Source持续没有输出多少分钟且源表仍有写入时告警
+            env: MySQL源表和Doris连接使用的环境配置 (prod, test, dev)
+            freshness_interval: MySQL/Doris端到端延迟的探测间隔（秒）
+            max_delay_minutes: 端到端延迟超过多少分钟时告警
+            history_days: 状态历史中原始采样的保留天数
+        """
         self.last_status = self.load_last_status()
+        # 顶点计数的环形缓冲区，cron模式下从状态文件中恢复上次的采样
+        self.throughput = ThroughputTrend(stall_seconds=stall_minutes * 60)
+        self.throughput.restore(self.last_status.get('throughput_samples'))
+        self.stalled = self.last_status.get('stalled', False)
+        self.job_vertices = []
+        # Source顶点ID -> 算子级numRecordsOut指标ID列表（首次查询时列出）
+        self.source_metric_ids = {}
+        self.freshness_interval = freshness_interval
+        self.max_delay_seconds = max_delay_minutes * 60
+        self.freshness_probe = None
+        if FreshnessProbe is not None:
+            try:
+                self.freshness_probe = load_freshness_probe(env)
+            except Exception as e:
+                logger.warning(f"加载MySQL/Doris连接配置失败，不做Source停滞检测和端到端延迟探测: {e}")
+        else:
+            logger.warning("未安装pymysql/PyYAML，不做Source停滞检测和端到端延迟探测")
+        self.init_metrics()
+        self.alerts = AlertDispatcher(WEBHOOK_URL, payload_builder=build_card_payload)
+        # 复用keep-alive连接，守护进程中每次检查不再重新建立连接
+        self.http = requests.Session()
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.poller = AdaptivePoller(fast_interval=fast_interval, base_interval=check_interval,
+                                     max_interval=max_interval)
+        self.stop_event = threading.Event()
+        # 作业名称 -> 当前作业ID，缓存未命中或状态变化时才请求 /jobs/overview
+        self.registry = JobRegistry(self.get_rest_json, state_file=REGISTRY_FILE, names={JOB_NAME})
+        self.job_id = self.last_status.get('job_id')
+        try:
+            self.history = StatusHistory(HISTORY_FILE, raw_days=history_days)
+        except Exception as e:
+            logger.warning(f"打开状态历史库失败，不记录历史: {e}")
+            self.history = None
         
     def load_last_status(self):
         """加载上次状态，避免重复告警"""
@@ -56,59 +215,30 @@ class UserInterestsMonitor:
         return {}
     
     def save_status(self, status):
-        """保存当前状态"""
+        """保存当前状态: 先写临时文件再原子替换，进程中途退出也不会留下不完整的状态文件"""
+        tmp_path = None
         try:
             status['timestamp'] = time.time()
-            with open(STATUS_FILE, 'w', encoding='utf-8') as f:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(STATUS_FILE),
+                                             prefix='.user_interests_status.', delete=False) as f:
+                tmp_path = f.name
                 json.dump(status, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, STATUS_FILE)
         except Exception as e:
             logger.error(f"保存状态文件失败: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
     
     def send_alert(self, message, is_error=False):
-        """发送飞书告警"""
-        try:
-            color = "red" if is_error else "green"
-            payload = {
-                "msg_type": "interactive",
-                "card": {
-                    "config": {"wide_screen_mode": True},
-                    "header": {
-                        "title": {
-                            "tag": "plain_text",
-                            "content": f"🔍 user_interests CDC监控 {'❌' if is_error else '✅'}"
-                        },
-                        "template": color
-                    },
-                    "elements": [
-                        {
-                            "tag": "div",
-                            "text": {
-                                "tag": "lark_md",
-                                "content": f"**作业**: {JOB_NAME}\n**时间**: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n**消息**: {message}"
-                            }
-                        }
-                    ]
-                }
-            }
-            
-            response = requests.post(
-                WEBHOOK_URL,
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                logger.info("告警发送成功")
-            else:
-                logger.error(f"告警发送失败: {response.status_code} - {response.text}")
-                
-        except Exception as e:
-            logger.error(f"发送告警异常: {e}")
+        """告警入队，由后台线程发送飞书卡片消息，相同告警在抑制时间内只发送一次"""
+        self.alerts.send("user_interests CDC监控", message, is_error)
     
     def check_flink_cluster(self):
         """检查Flink集群状态"""
         try:
-            response = requests.get(f"{FLINK_REST_URL}/overview", timeout=30)
+            response = self.http.get(f"{FLINK_REST_URL}/overview", timeout=30)
             if response.status_code == 200:
                 data = response.json()
                 logger.info(f"Flink集群状态: TaskManagers={data.get('taskmanagers', 0)}, "
@@ -122,110 +252,361 @@ class UserInterestsMonitor:
             logger.error(f"Flink集群连接异常: {e}")
             return False
     
+    def get_rest_json(self, path):
+        """请求Flink REST API，失败返回None"""
+        try:
+            response = self.http.get(f"{FLINK_REST_URL}{path}", timeout=30)
+            if response.status_code == 200:
+                return response.json()
+            logger.warning(f"请求 {path} 失败: {response.status_code}")
+        except Exception as e:
+            logger.warning(f"请求 {path} 异常: {e}")
+        return None
+    
+    def get_job(self):
+        """
+        按作业名称获取当前实例的详情。缓存的作业ID已被清理(404)、实例已结束（可能已重新提交）
+        或状态与缓存不同时，刷新一次作业概览后重新解析
+        """
+        job_id = self.registry.resolve(JOB_NAME)
+        job_data = self.get_rest_json(f"/jobs/{job_id}") if job_id else None
+        stale = job_data is None or job_data.get('state') != self.registry.state(JOB_NAME)
+        if job_id and (stale or job_data.get('state') in TERMINAL_STATES):
+            resolved = self.registry.resolve(JOB_NAME, refresh=True)
+            if resolved and resolved != job_id:
+                job_id = resolved
+                job_data = self.get_rest_json(f"/jobs/{job_id}")
+        return job_id, job_data
+    
     def check_job_status(self):
         """检查作业状态"""
         try:
-            response = requests.get(f"{FLINK_REST_URL}/jobs/{JOB_ID}", timeout=30)
-            if response.status_code == 200:
-                job_data = response.json()
+            job_id, job_data = self.get_job()
+            if job_data is not None:
                 current_state = job_data.get('state', 'UNKNOWN')
                 job_name = job_data.get('name', JOB_NAME)
                 duration = job_data.get('duration', 0)
+                self.job_vertices = job_data.get('vertices', [])
                 
-                logger.info(f"作业状态: {current_state}, 运行时长: {duration}ms")
+                logger.info(f"作业状态: {current_state}, 运行时长: {duration}ms, 作业ID: {job_id}")
+                
+                # 作业重启或重新提交后的新实例
+                if self.job_id and job_id != self.job_id:
+                    self.send_alert(f"user_interests CDC作业实例已变更\n作业名称: {job_name}\n"
+                                    f"作业ID: {self.job_id} -> {job_id}", is_error=False)
+                self.job_id = job_id
                 
                 # 检查状态变化
                 last_state = self.last_status.get('job_state')
                 if last_state != current_state:
                     if current_state == 'RUNNING':
-                        message = f"user_interests CDC作业已启动\n作业名称: {job_name}\n作业ID: {JOB_ID}"
+                        message = f"user_interests CDC作业已启动\n作业名称: {job_name}\n作业ID: {job_id}"
                         self.send_alert(message, is_error=False)
                     elif current_state in ['FAILED', 'CANCELED']:
-                        message = f"user_interests CDC作业异常\n状态: {current_state}\n作业ID: {JOB_ID}"
+                        last_rate = self.last_status.get('throughput') or {}
+                        message = (f"user_interests CDC作业异常\n状态: {current_state}\n作业ID: {job_id}\n"
+                                   f"异常前吞吐量: {format_rate(last_rate.get('records_per_second'), last_rate.get('bytes_per_second'))}")
                         self.send_alert(message, is_error=True)
                 
                 return {
                     'status': 'ok',
                     'job_state': current_state,
                     'duration': duration,
-                    'job_name': job_name
+                    'job_name': job_name,
+                    'job_id': job_id,
+                    'job_id_history': self.registry.ids(JOB_NAME)
                 }
             else:
-                logger.error(f"作业状态检查失败: {response.status_code}")
-                if response.status_code == 404:
-                    message = f"user_interests CDC作业未找到\n作业ID: {JOB_ID}\n可能已停止或失败"
+                self.job_vertices = []
+                logger.error(f"作业状态检查失败: 没有找到作业 {JOB_NAME}")
+                if self.last_status.get('job_state') != 'NOT_FOUND':
+                    message = (f"user_interests CDC作业未找到\n作业名称: {JOB_NAME}\n"
+                               f"最近的作业ID: {self.job_id or '无'}\n可能已停止或失败")
                     self.send_alert(message, is_error=True)
-                return {'status': 'error', 'job_state': 'NOT_FOUND'}
+                return {'status': 'error', 'job_state': 'NOT_FOUND', 'job_id': self.job_id}
                 
         except Exception as e:
             logger.error(f"作业状态检查异常: {e}")
-            return {'status': 'error', 'job_state': 'ERROR'}
+            return {'status': 'error', 'job_state': 'ERROR', 'job_id': self.job_id}
+    
+    def source_records_out(self, vertex):
+        """
+        Source算子级的累计输出记录数（各subtask之和）。Source和Sink链接在同一个顶点时，
+        顶点的write-records只统计发往下游顶点的记录，始终为0；没有该指标或请求失败时返回None
+        （顶点刚被重新调度时指标可能暂时不可用，本次只跳过该采样）
+        """
+        path = f"/jobs/{self.job_id}/vertices/{vertex['id']}/metrics"
+        try:
+            if vertex['id'] not in self.source_metric_ids:
+                available = self.get_rest_json(path)
+                if available is None:
+                    return None
+                self.source_metric_ids[vertex['id']] = [
+                    m['id'] for m in available
+                    if m.get('id', '').endswith('.numRecordsOut') and '.Source__' in m['id']
+                ]
+            metric_ids = self.source_metric_ids[vertex['id']]
+            if not metric_ids:
+                return None
+            values = self.get_rest_json(f"{path}?get={requests.utils.quote(','.join(metric_ids), safe=',')}")
+            if values is None:
+                return None
+            return sum(float(m.get('value') or 0) for m in values)
+        except Exception as e:
+            logger.warning(f"解析顶点 {vertex['id']} 的Source指标失败: {e}")
+            return None
     
     def check_job_metrics(self):
-        """检查作业指标"""
+        """检查作业指标: 作业详情中各顶点的累计读写计数，按采样差值计算吞吐量并检测Source停滞"""
         try:
-            response = requests.get(f"{FLINK_REST_URL}/jobs/{JOB_ID}/vertices", timeout=30)
-            if response.status_code == 200:
-                vertices = response.json().get('vertices', [])
-                
-                total_records = 0
-                total_bytes = 0
-                
-                for vertex in vertices:
-                    metrics = vertex.get('metrics', {})
-                    records = metrics.get('read-records', 0)
-                    bytes_read = metrics.get('read-bytes', 0)
-                    
-                    total_records += records
-                    total_bytes += bytes_read
-                
-                logger.info(f"数据指标: 读取记录数={total_records}, 读取字节数={total_bytes}")
-                
-                return {
-                    'total_records': total_records,
-                    'total_bytes': total_bytes
-                }
-            else:
-                logger.warning(f"指标获取失败: {response.status_code}")
-                return {}
+            vertices = []
+            total_records = 0
+            total_bytes = 0
+            
+            source_records = 0
+            for vertex in self.job_vertices:
+                metrics = dict(vertex.get('metrics', {}))
+                total_records += metrics.get('read-records', 0)
+                total_bytes += metrics.get('read-bytes', 0)
+                if vertex.get('name', '').startswith('Source'):
+                    records_out = self.source_records_out(vertex)
+                    if records_out is not None:
+                        metrics['write-records'] = records_out
+                    source_records += metrics.get('write-records', 0)
+                vertices.append({**vertex, 'metrics': metrics})
+            self.metric_records_total.set(
+                self.registry.continuous(JOB_NAME, self.job_id, 'source_records_out', source_records))
+            
+            now = time.time()
+            self.throughput.add_vertices(vertices, now)
+            throughput = self.throughput.summary(now)
+            rate = format_rate(throughput['records_per_second'], throughput['bytes_per_second'])
+            logger.info(f"数据指标: 读取记录数={total_records}, 读取字节数={total_bytes}, Source吞吐量: {rate}")
+            
+            self.check_stall(throughput, now)
+            
+            return {
+                'total_records': total_records,
+                'total_bytes': total_bytes,
+                'throughput': throughput,
+                'stalled': self.stalled,
+                'throughput_samples': self.throughput.snapshot()
+            }
                 
         except Exception as e:
             logger.error(f"指标检查异常: {e}")
             return {}
     
-    def run_monitor(self):
-        """执行监控"""
-        logger.info(f"开始监控user_interests CDC作业: {JOB_ID}")
+    def check_stall(self, throughput, now):
+        """Source停滞告警: 只在Source已经空闲足够长时间后才查询MySQL源表的写入时间"""
+        was_stalled = self.stalled
+        idle_seconds = throughput['idle_seconds']
+        if idle_seconds >= self.throughput.stall_seconds and self.freshness_probe is not None:
+            issues = self.throughput.evaluate(now, self.freshness_probe.last_write_time())
+            if issues and not was_stalled:
+                rate = format_rate(throughput['records_per_second'], throughput['bytes_per_second'])
+                self.send_alert(f"user_interests CDC作业Source停滞\n{issues[0][1]}\n当前吞吐量: {rate}\n"
+                                f"作业ID: {self.job_id}", is_error=True)
+            self.stalled = bool(issues) or (was_stalled and idle_seconds > 0)
+        elif idle_seconds == 0 and was_stalled:
+            self.stalled = False
+            rate = format_rate(throughput['records_per_second'], throughput['bytes_per_second'])
+            self.send_alert(f"user_interests CDC作业Source已恢复输出\n当前吞吐量: {rate}\n作业ID: {self.job_id}", is_error=False)
+    
+    def init_metrics(self):
+        """Prometheus指标（守护进程在 --metrics-port 上提供）"""
+        self.metrics = MetricsRegistry()
+        self.metric_job_running = self.metrics.gauge('user_interests_job_running', '作业是否为RUNNING')
+        self.metric_records_rate = self.metrics.gauge('user_interests_source_records_per_second',
+                                                      'Source每秒输出记录数')
+        self.metric_records_total = self.metrics.counter('user_interests_source_records_total',
+                                                         'Source累计输出记录数（作业重启后从上一个实例的终值继续累计）')
+        self.metric_delay = self.metrics.gauge('user_interests_replication_delay_seconds',
+                                               'MySQL高水位与Doris高水位之差（秒）')
+        self.metric_missing_rows = self.metrics.gauge('user_interests_missing_rows',
+                                                      '最近主键范围内MySQL有而Doris没有的行数')
+        self.metric_probe_seconds = self.metrics.gauge('user_interests_freshness_probe_seconds',
+                                                       '一次端到端延迟探测的耗时（秒）')
+    
+    def check_freshness(self):
+        """
+        端到端延迟探测，距离上次探测不足freshness_interval时返回上次的结果；
+        延迟超过阈值时告警，恢复后发送恢复通知
+        """
+        last = self.last_status.get('freshness') or {}
+        if self.freshness_probe is None or time.time() - last.get('checked_at', 0) < self.freshness_interval:
+            return last
+        try:
+            freshness = self.freshness_probe.probe()
+        except Exception as e:
+            logger.error(f"端到端延迟探测失败: {e}")
+            return last
+        freshness['checked_at'] = time.time()
+        
+        delay = freshness['delay_seconds']
+        logger.info(f"端到端延迟: {delay if delay is not None else '未知'}秒 "
+                    f"(MySQL高水位: {freshness['mysql_high_water']}, Doris高水位: {freshness['doris_high_water']}, "
+                    f"最近主键范围行数: MySQL={freshness.get('mysql_rows')}, Doris={freshness.get('doris_rows')}, "
+                    f"耗时{freshness['probe_seconds']}秒)")
+        
+        was_delayed = last.get('delayed', False)
+        freshness['delayed'] = delay is not None and delay > self.max_delay_seconds
+        if freshness['delayed'] and not was_delayed:
+            message = (f"user_interests MySQL到Doris端到端延迟过高\n延迟: {delay / 60:.1f}分钟\n"
+                       f"MySQL高水位: {freshness['mysql_high_water']}\nDoris高水位: {freshness['doris_high_water']}\n"
+                       f"最近{self.freshness_probe.tail_rows}个主键中未同步: {freshness.get('missing_rows', '未知')}行")
+            self.send_alert(message, is_error=True)
+        elif was_delayed and not freshness['delayed'] and delay is not None:
+            self.send_alert(f"user_interests MySQL到Doris端到端延迟已恢复\n当前延迟: {delay:.0f}秒", is_error=False)
+        
+        if delay is not None:
+            self.metric_delay.set(delay)
+        if 'missing_rows' in freshness:
+            self.metric_missing_rows.set(freshness['missing_rows'])
+        self.metric_probe_seconds.set(freshness['probe_seconds'])
+        return freshness
+    
+    def check_once(self):
+        """执行一次检查，更新内存中的状态，返回本次状态（集群不可访问时返回None）"""
+        logger.info(f"开始监控user_interests CDC作业: {JOB_NAME}")
         
         # 检查Flink集群
         if not self.check_flink_cluster():
             message = "Flink集群连接失败，请检查集群状态"
             self.send_alert(message, is_error=True)
-            return
+            self.record_history({}, {}, {})
+            return None
         
         # 检查作业状态
         job_status = self.check_job_status()
         
-        # 检查作业指标
-        metrics = self.check_job_metrics()
+        # 检查作业指标（只有RUNNING时计数才有意义）
+        metrics = self.check_job_metrics() if job_status.get('job_state') == 'RUNNING' else {}
+        
+        # MySQL到Doris端到端延迟（按freshness_interval探测，作业异常时同样需要）
+        freshness = self.check_freshness()
+        
+        self.metric_job_running.set(1 if job_status.get('job_state') == 'RUNNING' else 0)
+        if (metrics.get('throughput') or {}).get('records_per_second') is not None:
+            self.metric_records_rate.set(metrics['throughput']['records_per_second'])
+        
+        self.record_history(job_status, metrics, freshness)
         
         # 合并状态信息
         current_status = {
             **job_status,
             **metrics,
+            'freshness': freshness,
             'check_time': datetime.datetime.now().isoformat()
         }
         
-        # 保存状态
-        self.save_status(current_status)
-        
+        self.last_status = current_status
         logger.info("监控检查完成")
+        return current_status
+    
+    def record_history(self, job_status, metrics, freshness):
+        """本次检查的数值追加到状态历史，端到端延迟只在本次重新探测时记录"""
+        if self.history is None:
+            return
+        throughput = metrics.get('throughput') or {}
+        values = {
+            'job_running': 1 if job_status.get('job_state') == 'RUNNING' else 0,
+            'records_per_second': throughput.get('records_per_second'),
+            'bytes_per_second': throughput.get('bytes_per_second'),
+            'stalled': int(metrics['stalled']) if 'stalled' in metrics else None,
+        }
+        if freshness.get('checked_at') != (self.last_status.get('freshness') or {}).get('checked_at'):
+            values.update({
+                'delay_seconds': freshness.get('delay_seconds'),
+                'missing_rows': freshness.get('missing_rows'),
+                'probe_seconds': freshness.get('probe_seconds'),
+            })
+        try:
+            self.history.record(JOB_NAME, values)
+        except Exception as e:
+            logger.warning(f"写入状态历史失败: {e}")
+    
+    def run_monitor(self):
+        """执行一次监控并保存状态（cron单次模式）"""
+        current_status = self.check_once()
+        if current_status is not None:
+            self.save_status(current_status)
+        # 下次运行从本次的计数终值继续累计
+        self.registry.flush()
+    
+    def stop(self, signum=None, frame=None):
+        """停止守护进程（SIGTERM/SIGINT）"""
+        logger.info(f"收到停止信号{f' {signum}' if signum else ''}，准备退出")
+        self.stop_event.set()
+    
+    def run_daemon(self, snapshot_interval=300, metrics_port=None):
+        """
+        守护进程: 状态保存在内存中，按自适应间隔检查
+
+        Args:
+            snapshot_interval: 状态文件的写入间隔（秒），作业状态变化时立即写入
+            metrics_port: Prometheus指标端口，None表示不提供
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if metrics_port:
+            start_metrics_server(self.metrics, metrics_port)
+        logger.info(f"user_interests CDC监控守护进程已启动 (基础间隔: {self.poller.base_interval}秒, "
+                    f"状态写入间隔: {snapshot_interval}秒)")
+        
+        last_snapshot = time.time()
+        while not self.stop_event.is_set():
+            last_state = self.last_status.get('job_state')
+            try:
+                current_status = self.check_once()
+            except Exception as e:
+                logger.error(f"监控过程中发生异常: {e}")
+                current_status = None
+            
+            state = current_status['job_state'] if current_status else 'ERROR'
+            self.poller.record(JOB_NAME, state)
+            
+            if current_status and (state != last_state or time.time() - last_snapshot >= snapshot_interval):
+                self.save_status(current_status)
+                self.registry.flush()
+                last_snapshot = time.time()
+            
+            self.stop_event.wait(self.poller.sleep_seconds(idle_interval=self.poller.max_interval))
+        
+        if self.last_status:
+            self.save_status(self.last_status)
+        self.registry.save()
+        if self.freshness_probe is not None:
+            self.freshness_probe.close()
+        self.alerts.close()
+        logger.info("user_interests CDC监控守护进程已停止")
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='user_interests CDC作业监控')
+    parser.add_argument('--daemon', action='store_true', help='以守护进程方式持续监控（默认执行一次检查，供cron调用）')
+    parser.add_argument('--interval', type=int, default=60, help='守护进程的基础检查间隔（秒）')
+    parser.add_argument('--fast-interval', type=int, default=5, help='作业处于过渡状态时的检查间隔（秒）')
+    parser.add_argument('--max-interval', type=int, default=180, help='作业稳定运行时的最大检查间隔（秒）')
+    parser.add_argument('--snapshot-interval', type=int, default=300, help='守护进程写入状态文件的间隔（秒）')
+    parser.add_argument('--stall-minutes', type=int, default=10, help='Source持续没有输出多少分钟且源表仍有写入时告警')
+    parser.add_argument('--env', default='prod', choices=['prod', 'test', 'dev'], help='MySQL源表和Doris连接使用的环境配置')
+    parser.add_argument('--freshness-interval', type=int, default=300, help='MySQL/Doris端到端延迟的探测间隔（秒）')
+    parser.add_argument('--max-delay-minutes', type=int, default=15, help='端到端延迟超过多少分钟时告警')
+    parser.add_argument('--metrics-port', type=int, default=9262, help='守护进程的Prometheus指标端口，0表示不提供')
+    parser.add_argument('--history-days', type=int, default=7, help='状态历史中原始采样的保留天数（1分钟/1小时汇总另行保留）')
+    args = parser.parse_args()
+    
+    setup_logging()
     try:
-        monitor = UserInterestsMonitor()
-        monitor.run_monitor()
+        monitor = UserInterestsMonitor(fast_interval=args.fast_interval, check_interval=args.interval,
+                                       max_interval=args.max_interval, stall_minutes=args.stall_minutes,
+                                       env=args.env, freshness_interval=args.freshness_interval,
+                                       max_delay_minutes=args.max_delay_minutes, history_days=args.history_days)
+        if args.daemon:
+            monitor.run_daemon(snapshot_interval=args.snapshot_interval, metrics_port=args.metrics_port or None)
+        else:
+            monitor.run_monitor()
     except Exception as e:
         logger.error(f"监控脚本异常: {e}")
         sys.exit(1)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多表并发增量同步引擎
+====================
+
+从 configs/environments/{env}.yaml 的 incremental_sync.tables 读取同步表列表，
+用SchemaDetector检测真实表结构并生成每张表的增量同步SQL，
+通过有界线程池并发执行，同时限制同一MySQL实例上的并发数。
+
+新增同步表只需要在环境配置中追加一项，不再复制整份同步脚本。
+
+使用示例:
+python3 multi_table_sync.py --env prod --mode watermark
+python3 multi_table_sync.py --env prod --tables content_audit_record --hours-back 24
+python3 multi_table_sync.py --env prod --mode watermark --schedule
+"""
+
+import os
+import sys
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import yaml
+
+from mysql_incremental_sync import MySQLIncrementalSync, SyncTable, DEFAULT_LEDGER_PATH
+from watermark_ledger import WatermarkLedger
+
+# 环境配置和SchemaDetector所在目录 flink_app/configs
+CONFIGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'configs')
+sys.path.insert(0, CONFIGS_DIR)
+
+
+class MultiTableSyncEngine:
+    """多表并发增量同步引擎"""
+
+    def __init__(self, env: str = 'prod', use_watermark: bool = False,
+                 ledger_path: str = DEFAULT_LEDGER_PATH, partitioned_read: bool = False,
+                 submit_backend: str = 'sql-client', table_names: Optional[List[str]] = None):
+        """
+        初始化同步引擎
+
+        Args:
+            env: 环境名称 (prod, test, dev)
+            use_watermark: 是否启用水位模式
+            ledger_path: 水位账本文件路径（所有表共享一个账本）
+            partitioned_read: 是否按主键范围分区并行读取
+            submit_backend: 作业提交方式，sql-client 或 gateway
+            table_names: 只同步指定的表，默认同步配置中的全部表
+        """
+        # 设置日志（先于SchemaDetector导入，保证日志同时写入文件）
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('/home/ubuntu/work/script/mysql_sync.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+        self.env_config_path = os.path.join(CONFIGS_DIR, 'environments', f'{env}.yaml')
+        with open(self.env_config_path, 'r', encoding='utf-8') as f:
+            self.env_config = yaml.safe_load(f)
+
+        sync_config = self.env_config.get('incremental_sync', {})
+        self.max_workers = sync_config.get('max_workers', 4)
+        self.per_host_concurrency = sync_config.get('per_host_concurrency', 2)
+        self.table_configs = [
+            t for t in sync_config.get('tables', [])
+            if not table_names or t['source_table'] in table_names
+        ]
+
+        self.sync_options = {
+            'use_watermark': use_watermark,
+            # 所有表共享一个账本实例: 账本的锁在并发提交的表之间串行化读-改-写
+            'ledger': WatermarkLedger(ledger_path),
+            'partitioned_read': partitioned_read,
+            'submit_backend': submit_backend,
+            'stream_load_threshold': sync_config.get('stream_load_threshold', 20000)
+        }
+        self.host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._syncs: Optional[List[MySQLIncrementalSync]] = None
+
+    def resolve_mysql_config(self, table_config: Dict) -> Dict:
+        """解析表的MySQL连接配置（与SchemaDetector相同: 优先使用表专用连接）"""
+        mysql_config = self.env_config['sources']['mysql']
+        table_name = table_config['source_table']
+        if table_name in mysql_config:
+            config = mysql_config[table_name]
+            database = config['database']
+        else:
+            config = mysql_config
+            database = mysql_config['databases'][table_config.get('source_database', 'content')]
+        return {
+            'host': config['host'],
+            'port': config['port'],
+            'user': config['username'],
+            'password': config['password'],
+            'database': database
+        }
+
+    def build_table(self, table_config: Dict) -> SyncTable:
+        """根据配置和检测到的表结构构造同步表定义"""
+        from schema_detector import SchemaDetector
+
+        mysql_config = self.resolve_mysql_config(table_config)
+        table_name = table_config['source_table']
+        schema = SchemaDetector(self.env_config_path).detect_table_schema(table_name, mysql_config['database'])
+        fields = schema['source_fields']
+
+        # SchemaDetector连接失败时会返回默认结构，这里必须确认关键字段存在，避免生成错误的SQL
+        key_column = table_config.get('key_column', 'id')
+        cursor_column = table_config.get('cursor_column', 'update_time')
+        field_names = [f['name'] for f in fields]
+        missing = [c for c in (key_column, cursor_column) if c not in field_names]
+        if missing:
+            raise ValueError(f"{table_name}表结构中缺少字段: {', '.join(missing)}")
+
+        doris_config = self.env_config['sinks']['doris']
+        target_database = doris_config['databases'][table_config.get('target_database', 'ods')]
+        return SyncTable(
+            name=table_name,
+            fields=fields,
+            mysql_config=mysql_config,
+            doris_config={
+                'fenodes': doris_config['fenodes'],
+                'username': doris_config['username'],
+                'password': doris_config['password'],
+                'query_port': doris_config.get('query_port', 9030)
+            },
+            target_table=f"{target_database}.{table_config['target_table']}",
+            key_column=key_column,
+            cursor_column=cursor_column,
+            hours_back=table_config.get('hours_back', 1),
+            extra=table_config
+        )
+
+    def get_syncs(self) -> List[MySQLIncrementalSync]:
+        """构造每张表的同步器（只检测一次表结构，gateway会话在多次运行间复用）"""
+        if self._syncs is None:
+            self._syncs = []
+            for table_config in self.table_configs:
+                try:
+                    table = self.build_table(table_config)
+                except Exception as e:
+                    self.logger.error(f"同步表配置无效，跳过: {table_config.get('source_table')}, 错误: {str(e)}")
+                    continue
+                self._syncs.append(MySQLIncrementalSync(table=table, **self.sync_options))
+                host = table.mysql_config['host']
+                if host not in self.host_semaphores:
+                    self.host_semaphores[host] = threading.BoundedSemaphore(self.per_host_concurrency)
+            self.logger.info(f"已加载{len(self._syncs)}张同步表: {', '.join(s.table_name for s in self._syncs)}")
+        return self._syncs
+
+    def run_table_sync(self, sync: MySQLIncrementalSync, hours_back: Optional[int]) -> bool:
+        """在MySQL实例并发限制内执行单表同步"""
+        with self.host_semaphores[sync.mysql_config['host']]:
+            return sync.run_sync_job(hours_back=hours_back or sync.table.hours_back)
+
+    def run_all(self, hours_back: Optional[int] = None) -> Dict[str, bool]:
+        """
+        并发执行所有表的增量同步
+
+        Args:
+            hours_back: 回溯小时数，默认使用每张表配置的hours_back
+
+        Returns:
+            表名 -> 是否成功
+        """
+        syncs = self.get_syncs()
+
+        # 按MySQL实例轮流排列任务，避免线程池被同一个实例的任务占满而其他实例空闲
+        by_host: Dict[str, List[MySQLIncrementalSync]] = OrderedDict()
+        for sync in syncs:
+            by_host.setdefault(sync.mysql_config['host'], []).append(sync)
+        ordered = []
+        while any(by_host.values()):
+            for queue in by_host.values():
+                if queue:
+                    ordered.append(queue.pop(0))
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='table-sync') as executor:
+            futures = {sync.table_name: executor.submit(self.run_table_sync, sync, hours_back) for sync in ordered}
+            for table_name, future in futures.items():
+                try:
+                    results[table_name] = future.result()
+                except Exception as e:
+                    self.logger.error(f"{table_name}同步异常: {str(e)}")
+                    results[table_name] = False
+
+        failed = [name for name, ok in results.items() if not ok]
+        self.logger.info(f"多表同步完成: 成功{len(results) - len(failed)}张, 失败{len(failed)}张"
+                         + (f" ({', '.join(failed)})" if failed else ""))
+        return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='多表并发增量同步 MySQL -> Doris')
+    parser.add_argument('--env', default='prod', choices=['prod', 'test', 'dev'], help='环境配置')
+    parser.add_argument('--mode', choices=['window', 'watermark'], default='window',
+                        help='window: 按回溯时间窗口同步; watermark: 按持久化水位增量同步')
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH, help='水位账本文件路径')
+    parser.add_argument('--partitioned', action='store_true', help='按主键范围分区并行读取MySQL')
+    parser.add_argument('--backend', choices=['sql-client', 'gateway'], default='sql-client',
+                        help='作业提交方式: sql-client 或 复用SQL Gateway会话')
+    parser.add_argument('--tables', help='只同步指定的表，逗号分隔')
+    parser.add_argument('--hours-back', type=int, help='回溯小时数，默认使用表配置')
+    parser.add_argument('--schedule', action='store_true', help='常驻调度: 每小时第5分钟增量同步，每天02:00回溯24小时')
+    args = parser.parse_args()
+
+    engine = MultiTableSyncEngine(
+        env=args.env,
+        use_watermark=(args.mode == 'watermark'),
+        ledger_path=args.ledger,
+        partitioned_read=args.partitioned,
+        submit_backend=args.backend,
+        table_names=args.tables.split(',') if args.tables else None
+    )
+    if args.schedule:
+        from sync_scheduler import SyncScheduler
+        SyncScheduler(
+            engine.get_syncs(),
+            max_jitter_seconds=engine.env_config.get('incremental_sync', {}).get('max_jitter_seconds', 300),
+            per_host_concurrency=engine.per_host_concurrency
+        ).start()
+    else:
+        results = engine.run_all(hours_back=args.hours_back)
+        sys.exit(0 if results and all(results.values()) else 1)
@@ -7,6 +7,7 @@
 -- =====================================================
 
 -- Flink执行配置
+SET 'pipeline.name' = 'mysql2doris_user_interests_prod';
 SET 'parallelism.default' = '4';
 
 -- 检查点配置
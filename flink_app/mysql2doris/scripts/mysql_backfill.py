@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MySQL历史数据分片回填
+=====================
+
+把任意时间范围按估算行数切分成多个分片，每个分片是一个独立的Flink作业，
+可配置同时运行的分片数。每个分片完成后记录到进度账本，
+进程崩溃或分片失败后重新执行同一命令，只会继续执行未完成的分片。
+
+使用示例:
+python3 mysql_backfill.py --env prod --table content_audit_record \
+    --start "2025-05-01 00:00:00" --end "2025-05-15 00:00:00" --concurrency 2
+"""
+
+import os
+import sys
+import json
+import math
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from mysql_incremental_sync import MySQLIncrementalSync, content_audit_record_table
+
+# 回填进度账本默认存放在项目logs目录
+DEFAULT_PROGRESS_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs', 'backfill')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+logger = logging.getLogger(__name__)
+
+
+class BackfillProgress:
+    """回填进度账本: 记录分片计划和每个分片的完成状态（原子写入）"""
+
+    def __init__(self, progress_path: str):
+        self.progress_path = progress_path
+        self._lock = threading.Lock()
+        self.data: Dict = {}
+        os.makedirs(os.path.dirname(os.path.abspath(progress_path)), exist_ok=True)
+        if os.path.exists(progress_path):
+            with open(progress_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def exists(self) -> bool:
+        """是否已有分片计划（续跑）"""
+        return bool(self.data.get('slices'))
+
+    def _dump(self):
+        """原子写入账本：先写唯一的临时文件并fsync，再rename覆盖"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.progress_path)),
+                                        prefix=f".{os.path.basename(self.progress_path)}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.progress_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def init_plan(self, table_name: str, slices: List[Dict]):
+        """保存新的分片计划"""
+        with self._lock:
+            self.data = {
+                'table': table_name,
+                'created_at': datetime.now().strftime(TIME_FORMAT),
+                'slices': [
+                    {'start': s['start'], 'end': s['end'], 'estimated_rows': s['estimated_rows'], 'status': 'pending'}
+                    for s in slices
+                ]
+            }
+            self._dump()
+
+    def pending_slices(self) -> List[Dict]:
+        """未完成的分片"""
+        return [s for s in self.data.get('slices', []) if s['status'] != 'done']
+
+    def mark(self, index: int, status: str):
+        """更新分片状态"""
+        with self._lock:
+            entry = self.data['slices'][index]
+            entry['status'] = status
+            entry['updated_at'] = datetime.now().strftime(TIME_FORMAT)
+            self._dump()
+
+
+class MySQLBackfill:
+    """按估算行数分片、可续跑的历史数据回填"""
+
+    def __init__(self, sync: MySQLIncrementalSync, progress_dir: str = DEFAULT_PROGRESS_DIR,
+                 max_rows_per_slice: int = 500000, max_slice_hours: int = 24, concurrency: int = 2):
+        """
+        初始化回填器
+
+        Args:
+            sync: 目标表的同步器
+            progress_dir: 进度账本目录
+            max_rows_per_slice: 每个分片的最大估算行数（保证单个分片在30分钟超时内完成）
+            max_slice_hours: 每个分片的最大时间跨度（小时）
+            concurrency: 同时运行的分片数
+        """
+        self.sync = sync
+        self.progress_dir = progress_dir
+        self.max_rows_per_slice = max_rows_per_slice
+        self.max_slice_hours = max_slice_hours
+        self.concurrency = concurrency
+
+    def estimate_hourly_rows(self, start: datetime, end: datetime) -> List[Tuple[datetime, int]]:
+        """按天查询 [start, end) 内每小时的行数，单次查询只扫描一天的索引范围"""
+        ts = self.sync.table.cursor_column
+        counts: Dict[datetime, int] = {}
+        connection = self.sync.get_mysql_connection()
+        try:
+            with connection.cursor() as cursor:
+                day_start = start
+                while day_start < end:
+                    day_end = min(day_start + timedelta(days=1), end)
+                    cursor.execute(
+                        f"SELECT DATE_FORMAT({ts}, '%%Y-%%m-%%d %%H:00:00') AS hour_start, COUNT(*) "
+                        f"FROM {self.sync.table_name} WHERE {ts} >= %s AND {ts} < %s GROUP BY hour_start",
+                        (day_start, day_end)
+                    )
+                    for hour_start, rows in cursor.fetchall():
+                        counts[datetime.strptime(hour_start, TIME_FORMAT)] = int(rows)
+                    day_start = day_end
+        finally:
+            connection.close()
+
+        hourly = []
+        hour = start.replace(minute=0, second=0, microsecond=0)
+        while hour < end:
+            hourly.append((hour, counts.get(hour, 0)))
+            hour += timedelta(hours=1)
+        return hourly
+
+    def plan_slices(self, start: datetime, end: datetime) -> List[Dict]:
+        """
+        按估算行数切分时间范围:
+        相邻小时合并到不超过max_rows_per_slice，单小时超出时均匀拆成多个子区间
+        """
+        slices = []
+        current_start, current_rows = start, 0
+
+        def close_slice(slice_end: datetime):
+            nonlocal current_start, current_rows
+            if slice_end > current_start:
+                slices.append({'start': current_start, 'end': slice_end, 'estimated_rows': current_rows})
+            current_start, current_rows = slice_end, 0
+
+        for hour_start, rows in self.estimate_hourly_rows(start, end):
+            hour_begin = max(hour_start, start)
+            hour_end = min(hour_start + timedelta(hours=1), end)
+
+            if rows > self.max_rows_per_slice:
+                close_slice(hour_begin)
+                parts = math.ceil(rows / self.max_rows_per_slice)
+                step = (hour_end - hour_begin) / parts
+                for i in range(parts):
+                    current_rows = math.ceil(rows / parts)
+                    close_slice(hour_end if i == parts - 1 else hour_begin + step * (i + 1))
+                continue
+
+            too_many_rows = current_rows + rows > self.max_rows_per_slice
+            too_long = hour_end - current_start > timedelta(hours=self.max_slice_hours)
+            if too_many_rows or too_long:
+                close_slice(hour_begin)
+            current_rows += rows
+
+        close_slice(end)
+        return [
+            {'start': s['start'].strftime(TIME_FORMAT + '.%f'), 'end': s['end'].strftime(TIME_FORMAT + '.%f'),
+             'estimated_rows': s['estimated_rows']}
+            for s in slices
+        ]
+
+    def progress_path(self, start: datetime, end: datetime) -> str:
+        """同一张表同一时间范围使用同一个进度账本，重复执行即续跑"""
+        name = f"{self.sync.table_name}_{start.strftime('%Y%m%d%H%M%S')}_{end.strftime('%Y%m%d%H%M%S')}.json"
+        return os.path.join(self.progress_dir, name)
+
+    def run(self, start: datetime, end: datetime) -> bool:
+        """执行回填，返回是否所有分片都已完成"""
+        progress = BackfillProgress(self.progress_path(start, end))
+        if progress.exists():
+            logger.info(f"发现回填进度账本，继续执行未完成分片: {progress.progress_path}")
+        else:
+            slices = self.plan_slices(start, end)
+            progress.init_plan(self.sync.table_name, slices)
+            logger.info(f"回填分片计划: {self.sync.table_name} [{start}, {end}) 共{len(slices)}个分片")
+
+        all_slices = progress.data['slices']
+        pending = [(i, s) for i, s in enumerate(all_slices) if s['status'] != 'done']
+        logger.info(f"待执行分片: {len(pending)}/{len(all_slices)}，并发数: {self.concurrency}")
+
+        def run_slice(index: int, entry: Dict) -> bool:
+            progress.mark(index, 'running')
+            ok = self.sync.run_range_sync(
+                datetime.strptime(entry['start'], TIME_FORMAT + '.%f'),
+                datetime.strptime(entry['end'], TIME_FORMAT + '.%f')
+            )
+            progress.mark(index, 'done' if ok else 'failed')
+            return ok
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='backfill') as executor:
+            results = list(executor.map(lambda item: run_slice(*item), pending))
+
+        remaining = len(progress.pending_slices())
+        message = (f"{self.sync.table_name} [{start}, {end}) 本次执行{len(results)}个分片，"
+                   f"成功{sum(results)}个，剩余未完成{remaining}个")
+        if remaining:
+            logger.error(f"回填未完成: {message}")
+            self.sync.send_alert("MySQL历史回填未完成", f"{message}\n重新执行同一命令即可续跑")
+        else:
+            logger.info(f"回填完成: {message}")
+            self.sync.send_alert("MySQL历史回填完成", message, is_error=False)
+        return remaining == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MySQL历史数据分片回填到Doris（可续跑）')
+    parser.add_argument('--env', choices=['prod', 'test', 'dev'],
+                        help='从环境配置的incremental_sync.tables加载表定义；不指定时使用content_audit_record默认定义')
+    parser.add_argument('--table', default='content_audit_record', help='回填的源表')
+    parser.add_argument('--start', required=True, help='开始时间，例如 "2025-05-01 00:00:00"')
+    parser.add_argument('--end', required=True, help='结束时间（不包含）')
+    parser.add_argument('--concurrency', type=int, default=2, help='同时运行的分片数')
+    parser.add_argument('--max-rows-per-slice', type=int, default=500000, help='每个分片的最大估算行数')
+    parser.add_argument('--max-slice-hours', type=int, default=24, help='每个分片的最大时间跨度（小时）')
+    parser.add_argument('--partitioned', action='store_true', help='分片内按主键范围分区并行读取')
+    parser.add_argument('--backend', choices=['sql-client', 'gateway'], default='sql-client',
+                        help='作业提交方式: sql-client 或 复用SQL Gateway会话')
+    parser.add_argument('--progress-dir', default=DEFAULT_PROGRESS_DIR, help='进度账本目录')
+    args = parser.parse_args()
+
+    if args.env:
+        from multi_table_sync import MultiTableSyncEngine
+        engine = MultiTableSyncEngine(env=args.env, partitioned_read=args.partitioned,
+                                      submit_backend=args.backend, table_names=[args.table])
+        syncs = engine.get_syncs()
+        if not syncs:
+            print(f"错误: 环境配置中没有可用的同步表 {args.table}")
+            sys.exit(1)
+        sync = syncs[0]
+    elif args.table == 'content_audit_record':
+        sync = MySQLIncrementalSync(partitioned_read=args.partitioned, submit_backend=args.backend,
+                                    table=content_audit_record_table())
+    else:
+        print("错误: 非默认表需要通过 --env 从环境配置加载表定义")
+        sys.exit(1)
+
+    backfill = MySQLBackfill(
+        sync,
+        progress_dir=args.progress_dir,
+        max_rows_per_slice=args.max_rows_per_slice,
+        max_slice_hours=args.max_slice_hours,
+        concurrency=args.concurrency
+    )
+    completed = backfill.run(datetime.strptime(args.start, TIME_FORMAT), datetime.strptime(args.end, TIME_FORMAT))
+    sys.exit(0 if completed else 1)
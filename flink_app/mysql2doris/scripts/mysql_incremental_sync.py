@@ -2,18 +2,154 @@
 # -*- coding: utf-8 -*-
 
 import os
+import sys
+import math
 import time
+import re
+import uuid
+import queue
 import logging
+import argparse
+import tempfile
+import threading
 import subprocess
-import schedule
+from collections import deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import requests
+import pymysql
+
+from watermark_ledger import WatermarkLedger
+from sync_history import SyncHistoryStore, DEFAULT_HISTORY_PATH
+from doris_stream_load import DorisStreamLoader
+
+# 共享组件目录 flink_app/common
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+from flink_sql_gateway import FlinkSqlGatewayClient, SqlGatewaySubmitUnknown
+from lark_alert import AlertDispatcher
+
+# sql-client提交成功后输出: [INFO] ... Job ID: <32位十六进制>
+JOB_ID_PATTERN = re.compile(r'Job ID:\s*([0-9a-f]{32})')
+
+# 水位账本默认存放在项目logs目录
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), '..', 'logs', 'sync_watermarks.json')
+
+
+def sql_literal(value: str) -> str:
+    """转义Flink SQL字符串字面量中的单引号"""
+    return value.replace("'", "''")
+
+
+@dataclass
+class SyncTable:
+    """增量同步表定义（字段来自SchemaDetector的source_fields）"""
+    name: str
+    fields: List[Dict]
+    mysql_config: Dict
+    doris_config: Dict
+    target_table: str
+    key_column: str = 'id'
+    cursor_column: str = 'update_time'
+    hours_back: int = 1
+    extra: Dict = field(default_factory=dict)
+
+
+def content_audit_record_table() -> SyncTable:
+    """content_audit_record表的默认同步定义"""
+    field_types = [
+        ('id', 'BIGINT'),
+        ('content_id', 'BIGINT'),
+        ('source', 'STRING'),
+        ('language', 'STRING'),
+        ('push_time', 'TIMESTAMP(3)'),
+        ('submit_time', 'BIGINT'),
+        ('ai_audit_result', 'INT'),
+        ('ai_audit_time', 'BIGINT'),
+        ('ai_audit_channel', 'INT'),
+        ('ai_audit_id', 'BIGINT'),
+        ('manual_audit_result', 'INT'),
+        ('manual_audit_time', 'BIGINT'),
+        ('manual_audit_channel', 'INT'),
+        ('manual_audit_id', 'BIGINT'),
+        ('create_time', 'TIMESTAMP(3)'),
+        ('update_time', 'TIMESTAMP(3)'),
+    ]
+    return SyncTable(
+        name="content_audit_record",
+        fields=[{'name': name, 'flink_type': flink_type} for name, flink_type in field_types],
+        mysql_config={
+            'host': "xme-prod-rds-content.chkycqw22fzd.ap-southeast-1.rds.amazonaws.com",
+            'port': 3306,
+            'user': "content-ro",
+            'password': "k5**^k12o",
+            'database': "content_data_20250114"
+        },
+        doris_config={
+            'fenodes': "10.10.41.243:8030",
+            'username': "root",
+            'password': "doris@123",
+            'query_port': 9030
+        },
+        target_table="test_flink.content_audit_record_sync"
+    )
+
 
 class MySQLIncrementalSync:
-    def __init__(self):
+    def __init__(self, use_watermark: bool = False, ledger_path: str = DEFAULT_LEDGER_PATH,
+                 partitioned_read: bool = False, submit_backend: str = 'sql-client',
+                 table: Optional[SyncTable] = None, history_path: str = DEFAULT_HISTORY_PATH,
+                 stream_load_threshold: int = 20000, ledger: Optional[WatermarkLedger] = None):
+        """
+        初始化增量同步器
+        
+        Args:
+            table: 同步表定义，默认content_audit_record
+            history_path: 运行历史库路径
+            stream_load_threshold: 窗口行数不超过该值时不启动Flink作业，直接Stream Load写入（0表示关闭）
+            use_watermark: 是否启用水位模式（按持久化游标增量读取，而不是按回溯时间窗口）
+            ledger_path: 水位账本文件路径
+            ledger: 共享的水位账本，多表并发同步时由引擎传入同一个实例，优先于ledger_path
+            partitioned_read: 是否按主键范围分区并行读取JDBC源
+            submit_backend: 作业提交方式，sql-client（每次启动sql-client.sh）或 gateway（复用SQL Gateway会话）
+        """
         self.flink_sql_client = "/opt/flink/bin/sql-client.sh"
         self.sync_sql_template = "/home/ubuntu/work/script/mysql_content_audit_to_doris.sql"
         self.webhook_url = "https://open.larksuite.com/open-apis/bot/v2/hook/3bb8fac6-6a02-498e-804f-48b1b38a6089"
+        self.alerts = AlertDispatcher.shared(self.webhook_url)
+        self.flink_rest_url = "http://localhost:8081"
+        self.job_timeout = 1800  # 30分钟超时
+        
+        # 作业提交方式: gateway模式下复用一个长期存活的SQL Gateway会话
+        self.submit_backend = submit_backend
+        self.gateway = FlinkSqlGatewayClient("http://localhost:8083") if submit_backend == 'gateway' else None
+        
+        # 源表配置
+        self.table = table or content_audit_record_table()
+        self.table_name = self.table.name
+        self.mysql_config = self.table.mysql_config
+        
+        # 运行历史: 记录每次运行的窗口、耗时和读写量
+        self.history = SyncHistoryStore(history_path)
+        # Source和Sink链接为一个顶点时按算子级指标统计读写量:
+        # (作业ID, 顶点ID) -> 算子指标ID，作业ID -> 运行期间最近一次采样（作业结束后算子指标可能不再更新）
+        self.operator_metric_ids: Dict[Tuple[str, str], Dict[str, List[str]]] = {}
+        self.job_metrics: Dict[str, Dict] = {}
+        
+        # 水位模式配置
+        self.use_watermark = use_watermark
+        self.ledger = ledger or WatermarkLedger(ledger_path)
+        # 水位上界相对当前时间的安全延迟，避免漏掉尚未提交的事务
+        self.watermark_safety_seconds = 60
+        
+        # 主键范围分区读取配置
+        self.partitioned_read = partitioned_read
+        self.rows_per_partition = 200000  # 每个分区期望读取的行数
+        self.max_read_partitions = 8      # 分区数上限（与集群可用slot数一致）
+        
+        # 小窗口直接Stream Load写入
+        self.stream_load_threshold = stream_load_threshold
+        self.stream_load_batch_rows = 5000
         
         # 设置日志
         logging.basicConfig(
@@ -26,229 +162,688 @@ class MySQLIncrementalSync:
         )
         self.logger = logging.getLogger(__name__)
     
-    def send_alert(self, title: str, message: str, is_error: bool = True):
-        """发送告警到飞书"""
+    def send_alert(self, title: str, message: str, is_error: bool = True, dedup_key: Optional[str] = None):
+        """告警入队，由后台线程批量发送到飞书，相同告警在抑制时间内只发送一次"""
+        self.alerts.send(title, message, is_error, dedup_key)
+    
+    def get_mysql_connection(self):
+        """获取MySQL连接"""
+        return pymysql.connect(
+            charset='utf8mb4',
+            connect_timeout=30,
+            read_timeout=60,
+            **self.mysql_config
+        )
+    
+    def plan_partitions(self, where_clause: str) -> Optional[Dict]:
+        """
+        规划主键范围分区: 先查询窗口内的MIN/MAX(主键)和估算行数，再决定分区数
+        
+        Returns:
+            {'lower': int, 'upper': int, 'num': int, 'estimated_rows': int}，无需分区时返回None
+        """
+        connection = self.get_mysql_connection()
         try:
-            payload = {
-                "msg_type": "post",
-                "content": {
-                    "post": {
-                        "zh_cn": {
-                            "title": title,
-                            "content": [
-                                [
-                                    {
-                                        "tag": "text",
-                                        "text": message
-                                    }
-                                ],
-                                [
-                                    {
-                                        "tag": "text",
-                                        "text": f"时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                                    }
-                                ]
-                            ]
-                        }
-                    }
-                }
-            }
-            
-            response = requests.post(self.webhook_url, json=payload, timeout=10)
-            if response.status_code == 200:
-                self.logger.info(f"告警发送成功: {title}")
-            else:
-                self.logger.error(f"告警发送失败: {response.status_code}")
+            with connection.cursor(pymysql.cursors.DictCursor) as cursor:
+                key = self.table.key_column
+                cursor.execute(f"SELECT MIN({key}) AS min_id, MAX({key}) AS max_id FROM {self.table_name} WHERE {where_clause}")
+                id_range = cursor.fetchone()
+                if not id_range or id_range['min_id'] is None:
+                    return None
                 
-        except Exception as e:
-            self.logger.error(f"发送告警失败: {str(e)}")
+                # 使用执行计划的估算行数，避免对大窗口做COUNT(*)
+                cursor.execute(f"EXPLAIN SELECT {key} FROM {self.table_name} WHERE {where_clause}")
+                plan = cursor.fetchone() or {}
+        finally:
+            connection.close()
+        
+        lower, upper = int(id_range['min_id']), int(id_range['max_id'])
+        estimated_rows = int(plan.get('rows') or (upper - lower + 1))
+        num = math.ceil(estimated_rows / self.rows_per_partition)
+        num = max(1, min(num, self.max_read_partitions, upper - lower + 1))
+        
+        self.logger.info(f"分区读取规划: {self.table_name} 主键范围[{lower}, {upper}], 估算行数{estimated_rows}, 分区数{num}")
+        if num <= 1:
+            return None
+        return {'lower': lower, 'upper': upper, 'num': num, 'estimated_rows': estimated_rows}
     
-    def create_incremental_sql(self, hours_back: int = 1):
-        """创建增量同步SQL文件"""
+    def create_incremental_sql(self, hours_back: int = 1, where_clause: Optional[str] = None,
+                               window_desc: Optional[str] = None, job_name: Optional[str] = None):
+        """
+        创建增量同步SQL文件
+        
+        Args:
+            hours_back: 回溯小时数（未指定where_clause时使用）
+            where_clause: 自定义的源表过滤条件（水位模式使用）
+            window_desc: 写入SQL注释中的窗口描述
+            job_name: Flink作业名称（pipeline.name），用于从REST API查找作业
+        """
         now = datetime.now()
-        start_time = now - timedelta(hours=hours_back)
+        table = self.table
+        job_name = job_name or self.new_job_name()
+        if where_clause is None:
+            start_time = now - timedelta(hours=hours_back)
+            where_clause = f"{table.cursor_column} >= '{start_time.strftime('%Y-%m-%d %H:%M:%S')}'"
+            window_desc = f"最近{hours_back}小时的数据"
+        
+        source_query = f"(SELECT * FROM {table.name} WHERE {where_clause}) AS recent_records"
+        
+        # 主键范围分区读取: 每个分区一个reader，分散到所有slot上
+        partition_settings = ""
+        partition_options = ""
+        partitions = self.plan_partitions(where_clause) if self.partitioned_read else None
+        if partitions:
+            partition_settings = f"""
+-- 按主键范围分区并行读取 (估算{partitions['estimated_rows']}行)
+SET 'parallelism.default' = '{partitions['num']}';
+"""
+            partition_options = f""",
+    'scan.partition.column' = '{table.key_column}',
+    'scan.partition.num' = '{partitions['num']}',
+    'scan.partition.lower-bound' = '{partitions['lower']}',
+    'scan.partition.upper-bound' = '{partitions['upper']}'"""
+        
+        # 根据表字段生成DDL，partition_day从游标字段提取
+        field_names = [f['name'] for f in table.fields]
+        source_columns = "".join(f"    `{f['name']}` {f['flink_type']},\n" for f in table.fields)
+        sink_columns = "".join(f"    `{f['name']}` {f['flink_type']},\n" for f in table.fields)
+        select_columns = "".join(f"    `{name}`,\n" for name in field_names)
+        doris = table.doris_config
         
         sql_content = f"""
--- MySQL content_audit_record 增量同步 - {now.strftime('%Y-%m-%d %H:%M:%S')}
+-- MySQL {table.name} 增量同步 - {now.strftime('%Y-%m-%d %H:%M:%S')}
 
+-- 提交后立即返回作业ID，由Flink REST API跟踪作业结果
+SET 'table.dml-sync' = 'false';
+SET 'pipeline.name' = '{job_name}';
+{partition_settings}
 -- 设置checkpoint配置
 SET 'execution.checkpointing.interval' = '60s';
 SET 'execution.checkpointing.mode' = 'EXACTLY_ONCE';
 SET 'state.backend' = 'filesystem';
 SET 'state.checkpoints.dir' = 'file:///home/ubuntu/work/script/flink/checkpoints';
 
--- 增量数据源 (最近{hours_back}小时的数据)
-CREATE TABLE mysql_content_audit_record_incremental (
-    id BIGINT,
-    content_id BIGINT,
-    source STRING,
-    language STRING,
-    push_time TIMESTAMP(3),
-    submit_time BIGINT,
-    ai_audit_result INT,
-    ai_audit_time BIGINT,
-    ai_audit_channel INT,
-    ai_audit_id BIGINT,
-    manual_audit_result INT,
-    manual_audit_time BIGINT,
-    manual_audit_channel INT,
-    manual_audit_id BIGINT,
-    create_time TIMESTAMP(3),
-    update_time TIMESTAMP(3),
-    partition_day AS CAST(DATE_FORMAT(update_time, 'yyyy-MM-dd') AS DATE),
-    PRIMARY KEY (id) NOT ENFORCED
+-- 增量数据源 ({window_desc})
+CREATE TABLE mysql_{table.name}_incremental (
+{source_columns}    partition_day AS CAST(DATE_FORMAT(`{table.cursor_column}`, 'yyyy-MM-dd') AS DATE),
+    PRIMARY KEY (`{table.key_column}`) NOT ENFORCED
 ) WITH (
     'connector' = 'jdbc',
-    'url' = 'jdbc:mysql://xme-prod-rds-content.chkycqw22fzd.ap-southeast-1.rds.amazonaws.com:3306/content_data_20250114?useSSL=false&serverTimezone=UTC',
-    'table-name' = '(SELECT * FROM content_audit_record WHERE update_time >= \\'{start_time.strftime('%Y-%m-%d %H:%M:%S')}\\') AS recent_records',
-    'username' = 'content-ro',
-    'password' = 'k5**^k12o',
+    'url' = 'jdbc:mysql://{self.mysql_config['host']}:{self.mysql_config['port']}/{self.mysql_config['database']}?useSSL=false&serverTimezone=UTC',
+    'table-name' = '{sql_literal(source_query)}',
+    'username' = '{self.mysql_config['user']}',
+    'password' = '{sql_literal(self.mysql_config['password'])}',
     'driver' = 'com.mysql.cj.jdbc.Driver',
-    'scan.fetch-size' = '1000'
+    'scan.fetch-size' = '1000'{partition_options}
 );
 
 -- Doris目标表
-CREATE TABLE doris_content_audit_record_sink (
-    id BIGINT,
-    content_id BIGINT,
-    source STRING,
-    language STRING,
-    push_time TIMESTAMP(3),
-    submit_time BIGINT,
-    ai_audit_result INT,
-    ai_audit_time BIGINT,
-    ai_audit_channel INT,
-    ai_audit_id BIGINT,
-    manual_audit_result INT,
-    manual_audit_time BIGINT,
-    manual_audit_channel INT,
-    manual_audit_id BIGINT,
-    create_time TIMESTAMP(3),
-    update_time TIMESTAMP(3),
-    partition_day DATE
+CREATE TABLE doris_{table.name}_sink (
+{sink_columns}    partition_day DATE
 ) WITH (
     'connector' = 'doris',
-    'fenodes' = '10.10.41.243:8030',
-    'table.identifier' = 'test_flink.content_audit_record_sync',
-    'username' = 'root',
-    'password' = 'doris@123',
+    'fenodes' = '{doris['fenodes']}',
+    'table.identifier' = '{table.target_table}',
+    'username' = '{doris['username']}',
+    'password' = '{sql_literal(doris['password'])}',
     'sink.properties.format' = 'json',
     'sink.enable-2pc' = 'false',
     'sink.buffer-flush.max-rows' = '5000',
     'sink.buffer-flush.interval' = '10s',
     'sink.max-retries' = '3',
-    'sink.properties.columns' = 'id, content_id, source, language, push_time, submit_time, ai_audit_result, ai_audit_time, ai_audit_channel, ai_audit_id, manual_audit_result, manual_audit_time, manual_audit_channel, manual_audit_id, create_time, update_time, partition_day',
-    'sink.label-prefix' = 'content_audit_incremental_{{{{ now.format('yyyyMMddHHmmss') }}}}'
+    'sink.properties.columns' = '{', '.join(field_names + ['partition_day'])}',
+    'sink.label-prefix' = '{table.name}_incremental_{now.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}'
 );
 
 -- 执行增量同步
-INSERT INTO doris_content_audit_record_sink
+INSERT INTO doris_{table.name}_sink
 SELECT 
-    id,
-    content_id,
-    source,
-    language,
-    push_time,
-    submit_time,
-    ai_audit_result,
-    ai_audit_time,
-    ai_audit_channel,
-    ai_audit_id,
-    manual_audit_result,
-    manual_audit_time,
-    manual_audit_channel,
-    manual_audit_id,
-    create_time,
-    update_time,
-    CASE 
-        WHEN update_time IS NOT NULL THEN partition_day
+{select_columns}    CASE 
+        WHEN `{table.cursor_column}` IS NOT NULL THEN partition_day
         ELSE CURRENT_DATE
     END AS partition_day
-FROM mysql_content_audit_record_incremental;
+FROM mysql_{table.name}_incremental;
 """
         
-        sql_file = f"/tmp/mysql_incremental_sync_{now.strftime('%Y%m%d_%H%M%S')}.sql"
-        with open(sql_file, 'w', encoding='utf-8') as f:
+        # 同一张表可能有多个窗口并发执行（回填），文件名和label前缀都必须唯一
+        fd, sql_file = tempfile.mkstemp(
+            prefix=f"mysql_incremental_sync_{table.name}_{now.strftime('%Y%m%d_%H%M%S')}_",
+            suffix='.sql', dir='/tmp'
+        )
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             f.write(sql_content)
         
         return sql_file
     
-    def run_sync_job(self, hours_back: int = 1):
-        """执行增量同步作业"""
+    def execute_sql_file(self, sql_file: str, job_name: Optional[str] = None) -> Tuple[bool, str, List[str]]:
+        """
+        提交SQL文件并通过Flink REST API等待作业结束
+        
+        Args:
+            sql_file: SQL文件路径
+            job_name: 作业名称，sql-client输出中没有作业ID时按名称查找
+        
+        Returns:
+            (是否成功, 错误信息, 作业ID列表)
+        """
+        deadline = time.time() + self.job_timeout
+        job_ids = []
+        if self.gateway:
+            try:
+                job_ids = self.gateway.submit_file(sql_file)
+            except SqlGatewaySubmitUnknown as e:
+                # INSERT可能已经被接受，再用sql-client提交会重复写入同一个窗口，只按作业名称确认
+                job_id = self.wait_for_job_id(job_name) if job_name else None
+                if not job_id:
+                    return False, f"SQL Gateway提交结果未知，且未找到作业 {job_name}，不重复提交: {str(e)}", e.job_ids
+                self.logger.warning(f"SQL Gateway提交结果未知，按作业名称找到作业: {job_id}")
+                job_ids = e.job_ids + [job_id] if job_id not in e.job_ids else e.job_ids
+            except Exception as e:
+                # INSERT发送之前失败（会话、SET、建表），作业没有提交
+                self.logger.warning(f"SQL Gateway提交失败，回退到sql-client: {str(e)}")
+        
+        if not job_ids:
+            success, error, job_ids = self.submit_with_sql_client(sql_file, job_name, deadline)
+            if not success:
+                return False, error, job_ids
+        
+        for job_id in job_ids:
+            success, error = self.wait_for_job(job_id, deadline)
+            if not success:
+                return False, error, job_ids
+        return True, "", job_ids
+    
+    def submit_with_sql_client(self, sql_file: str, job_name: Optional[str],
+                               deadline: float) -> Tuple[bool, str, List[str]]:
+        """
+        通过sql-client提交作业，逐行读取输出，一旦输出作业ID立即返回
+        
+        输出只保留最后200行用于错误信息，不在内存中堆积全部输出
+        """
+        process = subprocess.Popen(
+            [self.flink_sql_client, '-f', sql_file],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        lines: queue.Queue = queue.Queue()
+        
+        def read_output():
+            for line in process.stdout:
+                lines.put(line)
+            lines.put(None)
+        
+        threading.Thread(target=read_output, daemon=True).start()
+        
+        tail = deque(maxlen=200)
+        job_ids = []
+        finished = False
+        while not finished:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                process.kill()
+                self.cancel_job(job_ids[0] if job_ids else (job_name and self.find_job_id(job_name)))
+                raise subprocess.TimeoutExpired(process.args, self.job_timeout)
+            try:
+                line = lines.get(timeout=min(remaining, 5))
+            except queue.Empty:
+                continue
+            if line is None:
+                finished = True
+                continue
+            tail.append(line)
+            self.logger.debug(f"sql-client: {line.rstrip()}")
+            match = JOB_ID_PATTERN.search(line)
+            if match:
+                job_ids.append(match.group(1))
+                self.logger.info(f"作业已通过sql-client提交: {match.group(1)}")
+        
+        returncode = process.wait()
+        if returncode != 0 or any('[ERROR]' in line for line in tail):
+            return False, ''.join(tail), job_ids
+        if not job_ids and job_name:
+            job_id = self.find_job_id(job_name)
+            if job_id:
+                job_ids.append(job_id)
+        if not job_ids:
+            return False, "sql-client未输出作业ID: " + ''.join(tail), []
+        return True, "", job_ids
+    
+    def cancel_job(self, job_id: Optional[str]):
+        """取消作业，避免超时后作业继续在集群中运行"""
+        if not job_id:
+            return
         try:
-            self.logger.info(f"开始执行增量同步，回溯{hours_back}小时")
+            response = requests.patch(f"{self.flink_rest_url}/jobs/{job_id}?mode=cancel", timeout=30)
+            if response.status_code in [200, 202]:
+                self.logger.warning(f"作业 {job_id} 已取消")
+            else:
+                self.logger.error(f"取消作业 {job_id} 失败: {response.status_code}")
+        except Exception as e:
+            self.logger.error(f"取消作业 {job_id} 异常: {str(e)}")
+    
+    def wait_for_job(self, job_id: str, deadline: Optional[float] = None) -> Tuple[bool, str]:
+        """通过Flink REST API等待作业结束，定期输出已读取的行数，超时后取消作业"""
+        deadline = deadline or time.time() + self.job_timeout
+        last_progress = time.time()
+        while time.time() < deadline:
+            details = None
+            try:
+                response = requests.get(f"{self.flink_rest_url}/jobs/{job_id}", timeout=30)
+                details = response.json() if response.status_code == 200 else None
+            except Exception as e:
+                self.logger.warning(f"查询作业状态失败: {str(e)}")
+            state = details.get('state') if details else None
+            if state == 'RUNNING':
+                # 运行期间持续采样，批作业结束后算子级指标可能已经不可查询
+                self.collect_job_metrics(job_id, details)
+            
+            if state == 'FINISHED':
+                self.logger.info(f"作业 {job_id} 执行完成")
+                return True, ""
+            if state in ['FAILED', 'CANCELED']:
+                return False, f"作业 {job_id} 状态: {state}"
+            if time.time() - last_progress >= 60:
+                metrics = self.job_metrics.get(job_id, {})
+                self.logger.info(f"作业 {job_id} 状态: {state}, 已读取{metrics.get('rows_read', '-')}行, "
+                                 f"已写入{metrics.get('rows_written', '-')}行")
+                last_progress = time.time()
+            time.sleep(5)
+        
+        self.cancel_job(job_id)
+        raise subprocess.TimeoutExpired(f"flink job {job_id}", self.job_timeout)
+    
+    def new_job_name(self) -> str:
+        """生成唯一的Flink作业名称"""
+        return f"mysql_incremental_{self.table_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    
+    def find_job_id(self, job_name: str) -> Optional[str]:
+        """按作业名称从Flink REST API查找作业ID"""
+        try:
+            response = requests.get(f"{self.flink_rest_url}/jobs/overview", timeout=30)
+            if response.status_code == 200:
+                for job in response.json().get('jobs', []):
+                    if job.get('name') == job_name:
+                        return job['jid']
+        except Exception as e:
+            self.logger.warning(f"查找作业ID失败: {str(e)}")
+        return None
+    
+    def wait_for_job_id(self, job_name: str, attempts: int = 5, interval: float = 2) -> Optional[str]:
+        """按作业名称查找作业ID，作业提交后可能要稍后才出现在作业列表中"""
+        for attempt in range(attempts):
+            job_id = self.find_job_id(job_name)
+            if job_id or attempt == attempts - 1:
+                return job_id
+            time.sleep(interval)
+        return None
+    
+    def collect_job_metrics(self, job_id: str, details: Optional[Dict] = None) -> Dict:
+        """
+        从作业顶点指标汇总读写量
+        
+        读取量取Source顶点的输出，写入量取最后一个顶点的输入；
+        Source与Sink链接成一个顶点时（JDBC到Doris的INSERT通常如此）顶点级计数始终为0，
+        改为读取算子级指标: Source算子的numRecordsOut和Sink Writer的numRecordsIn
+        """
+        if details is None:
+            try:
+                response = requests.get(f"{self.flink_rest_url}/jobs/{job_id}", timeout=30)
+                if response.status_code != 200:
+                    return self.job_metrics.get(job_id, {})
+                details = response.json()
+            except Exception as e:
+                self.logger.warning(f"获取作业指标失败: {str(e)}")
+                return self.job_metrics.get(job_id, {})
+        vertices = details.get('vertices', [])
+        
+        if len(vertices) >= 2:
+            sources = [v for v in vertices if v.get('name', '').startswith('Source')]
+            others = [v for v in vertices if not v.get('name', '').startswith('Source')]
+            metrics = {
+                'rows_read': sum(v.get('metrics', {}).get('write-records', 0) for v in sources),
+                'bytes_read': sum(v.get('metrics', {}).get('write-bytes', 0) for v in sources),
+                'rows_written': sum(v.get('metrics', {}).get('read-records', 0) for v in others[-1:]),
+                'bytes_written': sum(v.get('metrics', {}).get('read-bytes', 0) for v in others[-1:])
+            }
+        else:
+            metrics = self.collect_operator_metrics(job_id, vertices)
+        
+        # 计数只增不减，作业结束后取不到或回退时保留运行期间的最近一次采样
+        last = self.job_metrics.get(job_id, {})
+        metrics = {key: max(value, last.get(key) or 0) for key, value in metrics.items() if value is not None}
+        metrics = {**last, **metrics}
+        self.job_metrics[job_id] = metrics
+        return metrics
+    
+    def collect_operator_metrics(self, job_id: str, vertices: List[Dict]) -> Dict:
+        """链接顶点内Source算子输出和Sink Writer输入的记录数（各subtask之和），取不到时为None"""
+        totals = {'rows_read': None, 'rows_written': None}
+        for vertex in vertices:
+            path = f"{self.flink_rest_url}/jobs/{job_id}/vertices/{vertex['id']}/metrics"
+            try:
+                ids = self.operator_metric_ids.get((job_id, vertex['id']))
+                if ids is None:
+                    response = requests.get(path, timeout=30)
+                    available = [m['id'] for m in response.json()] if response.status_code == 200 else []
+                    ids = {
+                        'rows_read': [m for m in available if m.endswith('.numRecordsOut') and '.Source__' in m],
+                        'rows_written': [m for m in available if m.endswith('.numRecordsIn') and '.Sink__' in m
+                                         and 'Committer' not in m],
+                    }
+                    # 作业刚启动时算子指标可能尚未注册，取到后才缓存
+                    if ids['rows_read'] or ids['rows_written']:
+                        self.operator_metric_ids[(job_id, vertex['id'])] = ids
+                wanted = ids['rows_read'] + ids['rows_written']
+                if not wanted:
+                    continue
+                response = requests.get(path, params={'get': ','.join(wanted)}, timeout=30)
+                if response.status_code != 200:
+                    continue
+                values = {m['id']: float(m.get('value') or 0) for m in response.json()}
+            except Exception as e:
+                self.logger.warning(f"获取作业{job_id}的算子指标失败: {str(e)}")
+                continue
+            for key in totals:
+                found = [values[m] for m in ids[key] if m in values]
+                if found:
+                    totals[key] = (totals[key] or 0) + int(sum(found))
+        return totals
+    
+    def forget_job_metrics(self, job_id: str):
+        """作业结束并记录运行历史后清理指标缓存"""
+        self.job_metrics.pop(job_id, None)
+        for key in [k for k in self.operator_metric_ids if k[0] == job_id]:
+            del self.operator_metric_ids[key]
+    
+    def count_window_rows(self, where_clause: str, limit: int) -> int:
+        """统计窗口内的行数，最多数到limit+1行（只需判断是否超过阈值）"""
+        connection = self.get_mysql_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM (SELECT 1 FROM {self.table_name} "
+                               f"WHERE {where_clause} LIMIT {limit + 1}) AS window_rows")
+                return int(cursor.fetchone()[0])
+        finally:
+            connection.close()
+    
+    def stream_load_window(self, where_clause: str, label_prefix: str) -> Dict:
+        """不启动Flink作业，用服务端游标读取窗口数据，按批Stream Load写入Doris"""
+        table = self.table
+        field_names = [f['name'] for f in table.fields]
+        loader = DorisStreamLoader(table.doris_config, table.target_table,
+                                   field_names + ['partition_day'], batch_rows=self.stream_load_batch_rows)
+        
+        def rows(cursor):
+            for row in cursor:
+                # 与Flink作业一致: partition_day取游标字段日期，为空时取当天
+                cursor_value = row.get(table.cursor_column)
+                row['partition_day'] = (cursor_value or datetime.now()).strftime('%Y-%m-%d')
+                yield row
+        
+        columns = ', '.join(f"`{name}`" for name in field_names)
+        connection = self.get_mysql_connection()
+        try:
+            with connection.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                cursor.execute(f"SELECT {columns} FROM {self.table_name} WHERE {where_clause} "
+                               f"ORDER BY {table.key_column}")
+                return loader.load_rows(rows(cursor), label_prefix, table.key_column)
+        finally:
+            connection.close()
+    
+    def run_sql_window(self, mode: str, where_clause: Optional[str], window_desc: Optional[str],
+                       window_start: datetime, window_end: datetime, hours_back: int = 1) -> Tuple[bool, str]:
+        """
+        同步一个窗口，结果记录到运行历史
+        
+        窗口行数不超过stream_load_threshold时直接Stream Load写入，否则生成并执行Flink作业
+        
+        Returns:
+            (是否成功, 错误信息)；超时时记录历史后继续抛出TimeoutExpired
+        """
+        if where_clause is None:
+            where_clause = f"{self.table.cursor_column} >= '{window_start.strftime('%Y-%m-%d %H:%M:%S')}'"
+            window_desc = f"最近{hours_back}小时的数据"
+        
+        started_at = datetime.now()
+        start = time.time()
+        status, error, job_id, metrics = 'failed', '', None, {}
+        try:
+            threshold = self.stream_load_threshold
+            if threshold > 0 and self.count_window_rows(where_clause, threshold) <= threshold:
+                mode = f"{mode}:stream_load"
+                self.logger.info(f"{self.table_name}窗口行数不超过{threshold}，使用Stream Load直接写入")
+                label_prefix = (f"{self.table_name}_{mode.replace(':', '_')}_"
+                                f"{window_start.strftime('%Y%m%d%H%M%S%f')}_{window_end.strftime('%Y%m%d%H%M%S%f')}")
+                metrics = self.stream_load_window(where_clause, label_prefix)
+                status = 'success'
+                return True, ""
             
-            # 创建增量同步SQL
-            sql_file = self.create_incremental_sql(hours_back)
+            job_name = self.new_job_name()
+            sql_file = self.create_incremental_sql(hours_back, where_clause=where_clause,
+                                                   window_desc=window_desc, job_name=job_name)
+            job_ids = []
+            try:
+                success, error, job_ids = self.execute_sql_file(sql_file, job_name)
+            finally:
+                if os.path.exists(sql_file):
+                    os.remove(sql_file)
+                job_id = job_ids[0] if job_ids else self.find_job_id(job_name)
+                metrics = self.collect_job_metrics(job_id) if job_id else {}
+                if job_id:
+                    self.forget_job_metrics(job_id)
+            status = 'success' if success else 'failed'
+            return success, error
+        except subprocess.TimeoutExpired:
+            status, error = 'timeout', f"执行时间超过{self.job_timeout}秒"
+            raise
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            duration = time.time() - start
+            try:
+                self.history.record_run(
+                    self.table_name, mode, window_start, window_end, started_at, duration,
+                    status, job_id=job_id, metrics=metrics, error=error
+                )
+            except Exception as e:
+                self.logger.warning(f"记录运行历史失败: {str(e)}")
+            self.logger.info(f"{self.table_name}运行耗时{duration:.1f}秒, 状态: {status}, "
+                             f"读取{metrics.get('rows_read', '-')}行, 写入{metrics.get('rows_written', '-')}行")
+    
+    def run_sync_job(self, hours_back: int = 1) -> bool:
+        """执行增量同步作业，返回是否成功"""
+        if self.use_watermark:
+            return self.run_watermark_sync(hours_back)
+        
+        try:
+            self.logger.info(f"开始执行增量同步，回溯{hours_back}小时")
             
-            # 执行Flink SQL
-            cmd = f"{self.flink_sql_client} -f {sql_file}"
-            result = subprocess.run(
-                cmd, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                timeout=1800  # 30分钟超时
+            # 创建并执行增量同步SQL
+            now = datetime.now()
+            success, error = self.run_sql_window(
+                'window', None, None, now - timedelta(hours=hours_back), now, hours_back=hours_back
             )
             
-            if result.returncode == 0:
+            if success:
                 self.logger.info("增量同步执行成功")
                 self.send_alert(
                     "MySQL增量同步成功", 
-                    f"content_audit_record表增量同步完成，回溯{hours_back}小时", 
+                    f"{self.table_name}表增量同步完成，回溯{hours_back}小时", 
                     is_error=False
                 )
             else:
-                self.logger.error(f"增量同步执行失败: {result.stderr}")
+                self.logger.error(f"增量同步执行失败: {error}")
                 self.send_alert(
                     "MySQL增量同步失败", 
-                    f"执行失败: {result.stderr[:500]}"
+                    f"{self.table_name}执行失败: {error[:500]}"
                 )
             
-            # 清理临时文件
-            if os.path.exists(sql_file):
-                os.remove(sql_file)
+            return success
                 
         except subprocess.TimeoutExpired:
             self.logger.error("增量同步执行超时")
-            self.send_alert("MySQL增量同步超时", "执行时间超过30分钟")
+            self.send_alert("MySQL增量同步超时", f"{self.table_name}执行时间超过30分钟")
         except Exception as e:
             self.logger.error(f"增量同步异常: {str(e)}")
-            self.send_alert("MySQL增量同步异常", f"异常信息: {str(e)}")
+            self.send_alert("MySQL增量同步异常", f"{self.table_name}异常信息: {str(e)}")
+        return False
+    
+    def fetch_high_water_mark(self, lower_time: datetime, upper_time: datetime) -> Optional[Dict]:
+        """
+        查询本次同步的水位上界: 时间窗口内 (游标时间, 主键) 最大的一行
+        
+        Args:
+            lower_time: 窗口下界（包含）
+            upper_time: 窗口上界（不包含）
+        """
+        ts, key = self.table.cursor_column, self.table.key_column
+        connection = self.get_mysql_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT {ts}, {key} FROM {self.table_name} "
+                    f"WHERE {ts} >= %s AND {ts} < %s "
+                    f"ORDER BY {ts} DESC, {key} DESC LIMIT 1",
+                    (lower_time, upper_time)
+                )
+                row = cursor.fetchone()
+        finally:
+            connection.close()
+        
+        if not row:
+            return None
+        return {'update_time': row[0], 'id': row[1]}
+    
+    def build_cursor_predicate(self, cursor: Optional[Dict], lower_time: datetime, high: Dict) -> str:
+        """
+        构造 (cursor, high] 区间的过滤条件
+        游标时间字段上的范围条件保证查询可以走索引，主键用于区分同一时间戳的多行
+        """
+        ts, key = self.table.cursor_column, self.table.key_column
+        high_time = str(high['update_time'])
+        conditions = [
+            f"{ts} >= '{lower_time}'",
+            f"{ts} <= '{high_time}'",
+            f"({ts} < '{high_time}' OR {key} <= {int(high['id'])})"
+        ]
+        if cursor:
+            conditions.append(f"({ts} > '{cursor['update_time']}' OR {key} > {int(cursor['id'])})")
+        return " AND ".join(conditions)
+    
+    def run_watermark_sync(self, hours_back: int = 1) -> bool:
+        """
+        水位模式增量同步: 只读取上次成功水位之后的数据，作业成功后才推进水位
+        
+        Args:
+            hours_back: 首次运行（账本中没有该表水位）时的回溯小时数
+        """
+        try:
+            cursor = self.ledger.get(self.table_name)
+            upper_time = datetime.now() - timedelta(seconds=self.watermark_safety_seconds)
+            if cursor:
+                lower_time = cursor['update_time']
+                self.logger.info(f"开始执行水位增量同步，当前水位: ({cursor['update_time']}, {cursor['id']})")
+            else:
+                lower_time = upper_time - timedelta(hours=hours_back)
+                self.logger.info(f"账本中没有{self.table_name}的水位，首次同步回溯{hours_back}小时")
+            
+            high = self.fetch_high_water_mark(lower_time, upper_time)
+            if high is None or (cursor and (high['update_time'], high['id']) <= (cursor['update_time'], cursor['id'])):
+                self.logger.info("水位之后没有新数据，跳过本次同步")
+                return True
+            
+            where_clause = self.build_cursor_predicate(cursor, lower_time, high)
+            window_desc = f"水位区间 ({lower_time}, {high['update_time']}]"
+            success, error = self.run_sql_window('watermark', where_clause, window_desc, lower_time, high['update_time'])
+            if not success:
+                self.logger.error(f"水位增量同步执行失败，水位保持不变: {error}")
+                self.send_alert(
+                    "MySQL增量同步失败",
+                    f"{self.table_name}水位同步执行失败，水位保持不变: {error[:500]}"
+                )
+                return False
+            
+            self.ledger.commit(self.table_name, high['update_time'], high['id'])
+            self.logger.info("水位增量同步执行成功")
+            self.send_alert(
+                "MySQL增量同步成功",
+                f"{self.table_name}表水位同步完成，水位推进至 ({high['update_time']}, {high['id']})",
+                is_error=False
+            )
+            return True
+            
+        except subprocess.TimeoutExpired:
+            self.logger.error("水位增量同步执行超时，水位保持不变")
+            self.send_alert("MySQL增量同步超时", f"{self.table_name}执行时间超过30分钟，水位保持不变")
+        except Exception as e:
+            self.logger.error(f"水位增量同步异常: {str(e)}")
+            self.send_alert("MySQL增量同步异常", f"{self.table_name}异常信息: {str(e)}")
+        return False
+    
+    def run_range_sync(self, start_time: datetime, end_time: datetime) -> bool:
+        """
+        同步指定时间区间 [start_time, end_time) 的数据（历史回填使用）
+        
+        成功时只记录日志，失败时发送告警，由调用方汇总通知
+        """
+        ts = self.table.cursor_column
+        window_desc = f"[{start_time}, {end_time})"
+        try:
+            self.logger.info(f"开始同步{self.table_name}区间 {window_desc}")
+            where_clause = f"{ts} >= '{start_time}' AND {ts} < '{end_time}'"
+            success, error = self.run_sql_window('range', where_clause, f"区间 {window_desc}", start_time, end_time)
+            if success:
+                self.logger.info(f"{self.table_name}区间 {window_desc} 同步成功")
+                return True
+            
+            self.logger.error(f"{self.table_name}区间 {window_desc} 同步失败: {error}")
+            self.send_alert("MySQL区间同步失败", f"{self.table_name}区间 {window_desc} 执行失败: {error[:500]}")
+        except subprocess.TimeoutExpired:
+            self.logger.error(f"{self.table_name}区间 {window_desc} 同步超时")
+            self.send_alert("MySQL区间同步超时", f"{self.table_name}区间 {window_desc} 执行时间超过30分钟")
+        except Exception as e:
+            self.logger.error(f"{self.table_name}区间 {window_desc} 同步异常: {str(e)}")
+            self.send_alert("MySQL区间同步异常", f"{self.table_name}区间 {window_desc} 异常信息: {str(e)}")
+        return False
     
     def run_hourly_sync(self):
         """每小时增量同步"""
         self.run_sync_job(hours_back=1)
     
     def run_daily_sync(self):
-        """每日全量同步（回溯24小时）"""
+        """每日全量同步（回溯24小时）；水位模式下与每小时同步相同，只读取水位之后的数据"""
         self.run_sync_job(hours_back=24)
     
     def start_scheduler(self):
-        """启动定时调度器"""
-        self.logger.info("启动MySQL增量同步调度器...")
-        
-        # 每小时的第5分钟执行增量同步
-        schedule.every().hour.at(":05").do(self.run_hourly_sync)
-        
-        # 每天凌晨2点执行全量同步
-        schedule.every().day.at("02:00").do(self.run_daily_sync)
-        
-        # 立即执行一次
-        self.logger.info("执行初始化同步...")
-        self.run_hourly_sync()
-        
-        while True:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # 每分钟检查一次
-            except KeyboardInterrupt:
-                self.logger.info("调度器被手动停止")
-                break
-            except Exception as e:
-                self.logger.error(f"调度器异常: {str(e)}")
-                time.sleep(300)  # 异常时等待5分钟后继续
+        """启动定时调度器（每小时第5分钟增量同步，每天凌晨2点回溯24小时）"""
+        from sync_scheduler import SyncScheduler
+        SyncScheduler([self]).start()
 
 if __name__ == "__main__":
-    sync = MySQLIncrementalSync()
-    sync.start_scheduler() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='MySQL content_audit_record 增量同步到Doris')
+    parser.add_argument('--mode', choices=['window', 'watermark'], default='window',
+                        help='window: 按回溯时间窗口同步; watermark: 按持久化水位增量同步')
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER_PATH, help='水位账本文件路径')
+    parser.add_argument('--partitioned', action='store_true', help='按主键范围分区并行读取MySQL')
+    parser.add_argument('--backend', choices=['sql-client', 'gateway'], default='sql-client',
+                        help='作业提交方式: sql-client 或 复用SQL Gateway会话')
+    parser.add_argument('--once', action='store_true', help='只执行一次同步后退出')
+    parser.add_argument('--hours-back', type=int, default=1, help='回溯小时数（水位模式下仅首次运行使用）')
+    parser.add_argument('--stream-load-threshold', type=int, default=20000,
+                        help='窗口行数不超过该值时直接Stream Load写入Doris，0表示始终使用Flink作业')
+    args = parser.parse_args()
+    
+    sync = MySQLIncrementalSync(
+        use_watermark=(args.mode == 'watermark'),
+        ledger_path=args.ledger,
+        partitioned_read=args.partitioned,
+        submit_backend=args.backend,
+        stream_load_threshold=args.stream_load_threshold
+    )
+    if args.once:
+        sync.run_sync_job(hours_back=args.hours_back)
+    else:
+        sync.start_scheduler() 
\ No newline at end of file
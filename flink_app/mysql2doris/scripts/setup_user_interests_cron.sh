@@ -1,6 +1,6 @@
 #!/bin/bash
 # user_interests CDC作业监控定时任务设置脚本
-# 作业ID: 275a6f22da1f5bdf896b9341028b2de0
+# 作业名称: mysql2doris_user_interests_prod（监控按名称解析当前作业ID）
 
 set -e
 
@@ -78,5 +78,5 @@ echo ""
 echo "=== 设置完成 ==="
 echo "✅ user_interests CDC监控已启动"
 echo "📊 Flink Web UI: http://localhost:8081"
-echo "📋 作业ID: 275a6f22da1f5bdf896b9341028b2de0"
+echo "📋 作业名称: mysql2doris_user_interests_prod"
 echo "🔍 监控日志: tail -f $PROJECT_DIR/logs/user_interests_monitor_$(date +%Y%m%d).log" 
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/bin/bash
+# user_interests CDC监控守护进程启动器（代替每5分钟一次的cron任务）
+# 使用方式: ./start_user_interests_monitor.sh [start|stop|restart|status]
+
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+PROJECT_DIR="$(cd "$SCRIPT_DIR/.." && pwd)"
+MONITOR_SCRIPT="$SCRIPT_DIR/monitor_user_interests.py"
+PID_FILE="$PROJECT_DIR/logs/user_interests_monitor.pid"
+LOG_FILE="$PROJECT_DIR/logs/user_interests_daemon.log"
+
+mkdir -p "$PROJECT_DIR/logs"
+
+case "$1" in
+    start)
+        if [ -f "$PID_FILE" ]; then
+            PID=$(cat "$PID_FILE")
+            if ps -p $PID > /dev/null 2>&1; then
+                echo "监控守护进程已在运行 (PID: $PID)"
+                exit 1
+            else
+                rm -f "$PID_FILE"
+            fi
+        fi
+
+        # cron任务和守护进程同时运行会重复告警
+        if crontab -l 2>/dev/null | grep -q "monitor_user_interests.py"; then
+            echo "⚠️  检测到user_interests监控cron任务，请先删除，避免重复检查和告警:"
+            echo "crontab -l | grep -v monitor_user_interests.py | crontab -"
+        fi
+
+        echo "启动user_interests CDC监控守护进程..."
+        cd "$PROJECT_DIR"
+        nohup python3 "$MONITOR_SCRIPT" --daemon > "$LOG_FILE" 2>&1 &
+        PID=$!
+        echo $PID > "$PID_FILE"
+        echo "监控守护进程已启动 (PID: $PID)"
+        echo "监控日志: $PROJECT_DIR/logs/user_interests_monitor_$(date +%Y%m%d).log"
+        ;;
+
+    stop)
+        if [ -f "$PID_FILE" ]; then
+            PID=$(cat "$PID_FILE")
+            if ps -p $PID > /dev/null 2>&1; then
+                echo "停止监控守护进程 (PID: $PID)..."
+                # SIGTERM: 保存状态文件、发送完剩余告警后退出
+                kill $PID
+                for i in $(seq 1 30); do
+                    ps -p $PID > /dev/null 2>&1 || break
+                    sleep 1
+                done
+                rm -f "$PID_FILE"
+                echo "监控守护进程已停止"
+            else
+                echo "监控守护进程未运行"
+                rm -f "$PID_FILE"
+            fi
+        else
+            echo "监控守护进程未运行"
+        fi
+        ;;
+
+    restart)
+        $0 stop
+        sleep 2
+        $0 start
+        ;;
+
+    status)
+        if [ -f "$PID_FILE" ]; then
+            PID=$(cat "$PID_FILE")
+            if ps -p $PID > /dev/null 2>&1; then
+                echo "监控守护进程正在运行 (PID: $PID)"
+                echo "最近的日志:"
+                tail -5 "$PROJECT_DIR/logs/user_interests_monitor_$(date +%Y%m%d).log"
+            else
+                echo "监控守护进程未运行 (PID文件存在但进程不存在)"
+                rm -f "$PID_FILE"
+            fi
+        else
+            echo "监控守护进程未运行"
+        fi
+        ;;
+
+    *)
+        echo "使用方式: $0 {start|stop|restart|status}"
+        echo ""
+        echo "  start   - 启动监控守护进程"
+        echo "  stop    - 停止监控守护进程"
+        echo "  restart - 重启监控守护进程"
+        echo "  status  - 查看监控守护进程状态"
+        exit 1
+        ;;
+esac
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量同步运行历史
+================
+
+每次同步运行（窗口、耗时、读写行数/字节数、结果）记录到本地SQLite，
+report命令按表、按天输出耗时p50/p95和rows/sec，
+在单次运行超出每小时调度间隔之前发现容量退化。
+
+使用示例:
+python3 sync_history.py report --days 14
+python3 sync_history.py report --table content_audit_record --days 30
+"""
+
+import os
+import sqlite3
+import argparse
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+# 运行历史默认存放在项目logs目录
+DEFAULT_HISTORY_PATH = os.path.join(os.path.dirname(__file__), '..', 'logs', 'sync_history.db')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """线性插值百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class SyncHistoryStore:
+    """同步运行历史（SQLite）"""
+
+    def __init__(self, db_path: str = DEFAULT_HISTORY_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    table_name TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    window_start TEXT,
+                    window_end TEXT,
+                    started_at TEXT NOT NULL,
+                    duration_seconds REAL NOT NULL,
+                    job_id TEXT,
+                    rows_read INTEGER,
+                    rows_written INTEGER,
+                    bytes_read INTEGER,
+                    bytes_written INTEGER,
+                    status TEXT NOT NULL,
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sync_runs_table_time ON sync_runs (table_name, started_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # 多个同步线程共享一个库文件，每次操作使用独立连接
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def record_run(self, table_name: str, mode: str, window_start: Optional[datetime],
+                   window_end: Optional[datetime], started_at: datetime, duration_seconds: float,
+                   status: str, job_id: Optional[str] = None, metrics: Optional[Dict] = None,
+                   error: Optional[str] = None):
+        """记录一次同步运行"""
+        metrics = metrics or {}
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """INSERT INTO sync_runs (table_name, mode, window_start, window_end, started_at,
+                       duration_seconds, job_id, rows_read, rows_written, bytes_read, bytes_written, status, error)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    table_name, mode,
+                    str(window_start) if window_start else None,
+                    str(window_end) if window_end else None,
+                    started_at.strftime(TIME_FORMAT), round(duration_seconds, 3), job_id,
+                    metrics.get('rows_read'), metrics.get('rows_written'),
+                    metrics.get('bytes_read'), metrics.get('bytes_written'),
+                    status, (error or '')[:1000] or None
+                )
+            )
+
+    def report(self, days: int = 7, table_name: Optional[str] = None) -> List[Dict]:
+        """
+        按表、按天汇总: 运行次数、失败次数、耗时p50/p95、rows/sec p50
+
+        rows/sec 使用写入行数（没有写入指标时使用读取行数）除以运行耗时
+        """
+        since = (datetime.now() - timedelta(days=days)).strftime(TIME_FORMAT)
+        sql = ("SELECT table_name, substr(started_at, 1, 10) AS day, duration_seconds, "
+               "COALESCE(rows_written, rows_read) AS rows, status FROM sync_runs WHERE started_at >= ?")
+        params = [since]
+        if table_name:
+            sql += " AND table_name = ?"
+            params.append(table_name)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY table_name, day", params).fetchall()
+
+        groups: Dict = {}
+        for name, day, duration, row_count, status in rows:
+            group = groups.setdefault((name, day), {'durations': [], 'rates': [], 'runs': 0, 'failed': 0})
+            group['runs'] += 1
+            if status != 'success':
+                group['failed'] += 1
+                continue
+            group['durations'].append(duration)
+            if row_count is not None and duration > 0:
+                group['rates'].append(row_count / duration)
+
+        return [
+            {
+                'table_name': name,
+                'day': day,
+                'runs': g['runs'],
+                'failed': g['failed'],
+                'duration_p50': percentile(g['durations'], 50),
+                'duration_p95': percentile(g['durations'], 95),
+                'rows_per_sec_p50': percentile(g['rates'], 50)
+            }
+            for (name, day), g in groups.items()
+        ]
+
+
+def print_report(report: List[Dict]):
+    """以表格形式输出报告"""
+    def fmt(value, digits=1):
+        return '-' if value is None else f"{value:.{digits}f}"
+
+    header = f"{'表名':<32}{'日期':<12}{'运行':>6}{'失败':>6}{'耗时p50(s)':>12}{'耗时p95(s)':>12}{'rows/s p50':>12}"
+    print(header)
+    print('-' * len(header))
+    for r in report:
+        print(f"{r['table_name']:<32}{r['day']:<12}{r['runs']:>6}{r['failed']:>6}"
+              f"{fmt(r['duration_p50']):>12}{fmt(r['duration_p95']):>12}{fmt(r['rows_per_sec_p50'], 0):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='增量同步运行历史')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report_parser = subparsers.add_parser('report', help='输出耗时和吞吐报告')
+    report_parser.add_argument('--days', type=int, default=7, help='统计最近N天')
+    report_parser.add_argument('--table', help='只统计指定表')
+    report_parser.add_argument('--db', default=DEFAULT_HISTORY_PATH, help='运行历史库路径')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        print_report(SyncHistoryStore(args.db).report(days=args.days, table_name=args.table))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量同步调度器
+==============
+
+基于asyncio的定时调度，替代 schedule + time.sleep 的阻塞循环:
+- 同一张表同一时间只有一个同步在运行，每小时/每日任务互不阻塞其他表
+- 运行期间错过的调度点、进程重启前错过的调度点合并为一次补偿运行，
+  补偿运行的回溯窗口覆盖上次成功以来的全部时间
+- 每张表的触发时间加上固定的随机偏移，避免所有表同时在 :05 查询MySQL
+
+调度状态（每个任务最后一次成功的调度点）原子写入 logs/sync_scheduler_state.json。
+"""
+
+import os
+import json
+import math
+import random
+import asyncio
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from mysql_incremental_sync import MySQLIncrementalSync
+
+# 调度状态默认存放在项目logs目录
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), '..', 'logs', 'sync_scheduler_state.json')
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScheduleSpec:
+    """调度规则: 每小时的第minute分钟，或每天的hour:minute"""
+    name: str
+    every: str  # 'hour' 或 'day'
+    minute: int
+    hours_back: int
+    hour: int = 0
+
+    @property
+    def period(self) -> timedelta:
+        return timedelta(hours=1) if self.every == 'hour' else timedelta(days=1)
+
+    def previous_fire(self, now: datetime) -> datetime:
+        """now之前（含）最近一次调度点"""
+        if self.every == 'hour':
+            fire = now.replace(minute=self.minute, second=0, microsecond=0)
+        else:
+            fire = now.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        return fire if fire <= now else fire - self.period
+
+
+# 与原 schedule 配置一致: 每小时第5分钟回溯1小时，每天02:00回溯24小时
+DEFAULT_SPECS = [
+    ScheduleSpec(name='hourly', every='hour', minute=5, hours_back=1),
+    ScheduleSpec(name='daily', every='day', hour=2, minute=0, hours_back=24),
+]
+
+
+class SchedulerState:
+    """调度状态: 每个 表/任务 最后一次成功的调度点（原子写入）"""
+
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        self.data: Dict[str, str] = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def get(self, key: str) -> Optional[datetime]:
+        value = self.data.get(key)
+        return datetime.strptime(value, TIME_FORMAT) if value else None
+
+    def set(self, key: str, fire_time: datetime):
+        with self._lock:
+            self.data[key] = fire_time.strftime(TIME_FORMAT)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.state_path)),
+                                            prefix=f".{os.path.basename(self.state_path)}.")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.data, f, ensure_ascii=False, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.state_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+
+class SyncScheduler:
+    """多表增量同步调度器（每表单实例运行、错过调度点合并补偿、触发时间抖动）"""
+
+    def __init__(self, syncs: List[MySQLIncrementalSync], specs: Optional[List[ScheduleSpec]] = None,
+                 state_path: str = DEFAULT_STATE_PATH, max_jitter_seconds: int = 300,
+                 max_catchup_hours: int = 72, per_host_concurrency: Optional[int] = None,
+                 run_on_start: bool = True):
+        """
+        初始化调度器
+
+        Args:
+            syncs: 各表的同步器
+            specs: 调度规则，默认每小时 + 每日02:00
+            state_path: 调度状态文件路径
+            max_jitter_seconds: 每张表触发时间的最大偏移（秒）
+            max_catchup_hours: 补偿运行的最大回溯小时数，更早的缺口需要用mysql_backfill.py回填
+            per_host_concurrency: 同一MySQL实例上同时运行的同步数，None表示不限制
+            run_on_start: 没有调度状态的表启动时立即执行一次每小时同步
+        """
+        self.syncs = syncs
+        self.specs = specs or DEFAULT_SPECS
+        self.state = SchedulerState(state_path)
+        self.max_jitter_seconds = max_jitter_seconds
+        self.max_catchup_hours = max_catchup_hours
+        self.per_host_concurrency = per_host_concurrency
+        self.run_on_start = run_on_start
+        # 同步作业是阻塞调用（等待Flink作业结束），放到线程池执行
+        self.executor = ThreadPoolExecutor(max_workers=max(len(syncs) * len(self.specs), 1),
+                                           thread_name_prefix='sync-scheduler')
+        self.table_locks: Dict[str, asyncio.Lock] = {}
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def jitter(self, table_name: str) -> timedelta:
+        """每张表固定的触发偏移，重启后保持不变"""
+        return timedelta(seconds=random.Random(table_name).uniform(0, self.max_jitter_seconds))
+
+    def catchup_hours(self, spec: ScheduleSpec, last_fire: Optional[datetime], fire: datetime) -> int:
+        """
+        计算本次运行的回溯小时数
+
+        上次成功之后错过了调度点时，回溯窗口扩大到覆盖 上次成功 ~ 现在 的全部时间
+        """
+        if last_fire is None or fire - last_fire <= spec.period:
+            return spec.hours_back
+        missed_hours = math.ceil((fire - last_fire).total_seconds() / 3600)
+        return min(missed_hours + spec.hours_back, self.max_catchup_hours)
+
+    async def run_once(self, sync: MySQLIncrementalSync, spec: ScheduleSpec):
+        """在表锁内执行一次（可能是合并后的）同步"""
+        key = f"{sync.table_name}:{spec.name}"
+        async with self.table_locks[sync.table_name]:
+            # 等待锁期间可能又错过了调度点，取最新的调度点作为本次运行的调度点，合并为一次
+            fire = spec.previous_fire(datetime.now())
+            last_fire = self.state.get(key)
+            if last_fire and last_fire >= fire:
+                return
+            hours_back = self.catchup_hours(spec, last_fire, fire)
+            if last_fire and fire - last_fire > spec.period:
+                missed = int((fire - last_fire) / spec.period) - 1
+                logger.warning(f"{key} 错过{missed}个调度点(上次成功: {last_fire})，合并为一次补偿运行，回溯{hours_back}小时")
+                if hours_back >= self.max_catchup_hours:
+                    sync.send_alert(
+                        "MySQL增量同步补偿不完整",
+                        f"{key} 上次成功于{last_fire}，超出最大补偿窗口{self.max_catchup_hours}小时，"
+                        f"请用mysql_backfill.py回填缺口"
+                    )
+
+            semaphore = self.host_semaphores.get(sync.mysql_config['host'])
+            loop = asyncio.get_running_loop()
+            if semaphore:
+                async with semaphore:
+                    success = await loop.run_in_executor(self.executor, sync.run_sync_job, hours_back)
+            else:
+                success = await loop.run_in_executor(self.executor, sync.run_sync_job, hours_back)
+
+            # 失败时不推进调度点，下一个调度点会扩大回溯窗口重新覆盖
+            if success:
+                self.state.set(key, fire)
+
+    async def table_loop(self, sync: MySQLIncrementalSync, spec: ScheduleSpec):
+        """单个 表/任务 的调度循环"""
+        key = f"{sync.table_name}:{spec.name}"
+        jitter = self.jitter(sync.table_name)
+        last_fire = self.state.get(key)
+        now = datetime.now()
+
+        try:
+            if last_fire and spec.previous_fire(now) > last_fire:
+                logger.info(f"{key} 重启前有未执行的调度点(上次成功: {last_fire})，立即补偿")
+                await self.run_once(sync, spec)
+            elif last_fire is None and spec.name == 'hourly' and self.run_on_start:
+                logger.info(f"{key} 执行初始化同步...")
+                await self.run_once(sync, spec)
+        except Exception as e:
+            logger.error(f"{key} 调度异常: {str(e)}")
+
+        while True:
+            next_fire = spec.previous_fire(datetime.now()) + spec.period + jitter
+            delay = (next_fire - datetime.now()).total_seconds()
+            logger.info(f"{key} 下次运行: {next_fire.strftime(TIME_FORMAT)}")
+            await asyncio.sleep(max(delay, 0))
+            try:
+                await self.run_once(sync, spec)
+            except Exception as e:
+                logger.error(f"{key} 调度异常: {str(e)}")
+
+    async def run(self):
+        """启动所有表的调度循环"""
+        for sync in self.syncs:
+            self.table_locks[sync.table_name] = asyncio.Lock()
+            host = sync.mysql_config['host']
+            if self.per_host_concurrency and host not in self.host_semaphores:
+                self.host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+
+        logger.info(f"启动MySQL增量同步调度器: {len(self.syncs)}张表, "
+                    f"任务: {', '.join(s.name for s in self.specs)}, 最大抖动{self.max_jitter_seconds}秒")
+        await asyncio.gather(*(self.table_loop(sync, spec) for sync in self.syncs for spec in self.specs))
+
+    def start(self):
+        """阻塞运行调度器直到手动停止"""
+        try:
+            asyncio.run(self.run())
+        except KeyboardInterrupt:
+            logger.info("调度器被手动停止")
+        finally:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量同步水位账本
+记录每张表最后一次成功同步的 (update_time, id) 游标，
+只有在Flink作业成功后才推进，进程崩溃不会丢失或提前推进水位。
+"""
+
+import json
+import os
+import tempfile
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WatermarkLedger:
+    """基于本地JSON文件的水位账本（原子写入）"""
+
+    def __init__(self, ledger_path: str):
+        self.ledger_path = ledger_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(ledger_path)), exist_ok=True)
+
+    def _load(self) -> Dict[str, Dict]:
+        """读取账本内容"""
+        if not os.path.exists(self.ledger_path):
+            return {}
+        try:
+            with open(self.ledger_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            # 账本损坏时不能静默当作空账本，否则会从头同步
+            raise RuntimeError(f"水位账本读取失败: {self.ledger_path}, 错误: {e}")
+
+    def _dump(self, data: Dict[str, Dict]):
+        """原子写入账本：先写唯一的临时文件并fsync，再rename覆盖"""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.ledger_path)),
+                                        prefix=f".{os.path.basename(self.ledger_path)}.")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.ledger_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get(self, table_name: str) -> Optional[Dict]:
+        """获取表的当前水位，返回 {'update_time': datetime, 'id': int} 或 None"""
+        with self._lock:
+            entry = self._load().get(table_name)
+        if not entry:
+            return None
+        return {
+            'update_time': datetime.fromisoformat(entry['update_time']),
+            'id': int(entry['id'])
+        }
+
+    def commit(self, table_name: str, update_time: datetime, row_id: int):
+        """推进表的水位（仅在同步作业成功后调用）"""
+        with self._lock:
+            data = self._load()
+            data[table_name] = {
+                'update_time': update_time.isoformat(sep=' '),
+                'id': int(row_id),
+                'committed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self._dump(data)
+        logger.info(f"水位已推进: {table_name} -> ({update_time}, {row_id})")